@@ -0,0 +1,428 @@
+from loaders.patient import Patient
+from loaders.config_loader import ConfigurationLoader
+from loaders.insert_loader import XmlTemplateLoader
+from loaders.patient_index import PatientIndex
+from loaders.patient_cache import cached_patient
+from loaders.patient_store import PatientStore
+from generators.gender import Gender
+from generators.scores import (get_midas, whodas_categories, get_whodas,
+                               get_afflictions, get_depression_score, get_personality_score)
+from generators.treatments import Treatments
+from template_writer import write_data, write_employer_note, generation_ledger, already_generated
+from brief import check_list, numbers_list, join_self_evaluation
+
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import os
+
+
+@dataclass
+class BatchResult:
+    row: int
+    patient: str
+    success: bool
+    output: str = ""
+    message: str = ""
+
+    # True, if the inserts for the diagnoses were cached by the worker, None if they were not needed
+    inserts_cached: bool | None = None
+
+
+def read_manifest(manifest_path: Path) -> list[dict[str, str]]:
+    """Reads a batch manifest. Files ending with .jsonl (or .json) are read as JSON lines, every other file
+    is read as semicolon or comma separated CSV with a header row.
+    :param manifest_path: Path to the manifest file
+    :return: List of rows, mapping column names onto their (string) values
+    :raises ValueError: if the manifest is empty
+    """
+
+    text: str = manifest_path.read_text(encoding="utf-8-sig")
+
+    if not text.strip():
+        raise ValueError(f"Manifest '{manifest_path}' ist leer")
+
+    if manifest_path.suffix.lower() in (".jsonl", ".json"):
+        return [{key: "" if value is None else str(value) for key, value in json.loads(line).items()}
+                for line in text.splitlines() if line.strip()]
+
+    # Excel exports in german locales separate by semicolon
+    dialect = csv.Sniffer().sniff(text.splitlines()[0], delimiters=",;\t")
+    return [{key.strip(): (value or "").strip() for key, value in row.items() if key}
+            for row in csv.DictReader(text.splitlines(), dialect=dialect)]
+
+
+# Maps manifest columns onto the blocks of --with-blocks and --omit-blocks, if their names differ
+column_blocks: dict[str, str] = {
+    "whodas_categories": "whodas-cats",
+}
+
+
+# Maps the values of the gender column onto the gender
+manifest_gender_values: dict[str, int] = {
+    "m": Gender.Male,
+    "w": Gender.Female,
+}
+
+
+def row_gender(row: dict[str, str]) -> int:
+    """Returns the gender of a manifest row, Gender.Male for "m" and Gender.Female for "w".
+    :raises ValueError: if the gender is missing or neither "m" nor "w"
+    """
+
+    value: str = row.get("gender", "")
+
+    if (gender := manifest_gender_values.get(value.lower())) is None:
+        raise ValueError(f"Ungültiger Wert in Spalte 'gender': '{value}', erwartet wird 'm' oder 'w'")
+
+    return gender
+
+
+def answer(configs: ConfigurationLoader, row: dict[str, str], column: str, fn, conv, default: str) -> str:
+    """Analogous to brief.ensure_input, but reads the answer from a manifest row instead of prompting the user.
+    :param configs: ConfigurationLoader, columns of blocks excluded by --omit-blocks or "without" are ignored
+    :param row: Manifest row
+    :param column: Name of the column to read
+    :param fn: Function to call on the converted value. Should return string or None.
+    :param conv: Function to convert the value before piping it to fn.
+    :param default: Text to use, if the column is missing or empty
+    :raises ValueError: if fn(conv(value)) returned None
+    """
+
+    value: str = row.get(column, "") if configs.include_block(column_blocks.get(column, column)) else ""
+
+    if value == "":
+        return default
+
+    # User has the possibility to skip this step
+    if value == "skip":
+        return ""
+
+    if (result := fn(conv(value))) is None:
+        raise ValueError(f"Ungültiger Wert in Spalte '{column}': {value}")
+
+    return result
+
+
+def find_admission_file(configs: ConfigurationLoader, index: PatientIndex, row: dict[str, str]) -> Path:
+    """Determines the admission file of a manifest row, either by its file column or by a unique name match."""
+
+    if file_name := row.get("file", ""):
+        admission_file: Path = Path(file_name)
+
+        # Relative paths are looked up in the database folder
+        if not admission_file.is_absolute():
+            admission_file = configs.paths["db"] / admission_file
+
+        if not admission_file.exists():
+            raise FileNotFoundError(f"Aufnahmebogen '{admission_file}' existiert nicht")
+
+        return admission_file
+
+    if not (name := row.get("name", "").lower()):
+        raise ValueError("Weder 'file' noch 'name' angegeben")
+
+    matches = index.search(name)
+    if len(matches) != 1:
+        raise LookupError(f"{len(matches)} Aufnahmebögen für '{name}' gefunden, "
+                          f"eindeutige Angabe über Spalte 'file' nötig")
+
+    return matches[0].docx_path
+
+
+# Loaded once for every worker process
+_worker_configs: ConfigurationLoader | None = None
+_worker_templates: XmlTemplateLoader | None = None
+_worker_index: PatientIndex | None = None
+_worker_overwrite: bool = False
+
+
+def _init_worker(configs: ConfigurationLoader, overwrite: bool = False):
+    """Loads configurations, templates and the admission file index once per worker process."""
+
+    global _worker_configs, _worker_templates, _worker_index, _worker_overwrite
+
+    _worker_configs = configs
+    _worker_overwrite = overwrite
+    _worker_templates = XmlTemplateLoader(configs.paths["inserts"])
+
+    # The index was already refreshed by run_batch
+    _worker_index = PatientIndex.open(configs.paths["index"], configs.paths["db"], refresh=False)
+
+
+def load_patient(configs: ConfigurationLoader, index: PatientIndex, row: dict[str, str]) -> Patient:
+    """Reads the patient of a manifest row from its admission file.
+    :raises ValueError: if the gender of the row is missing or invalid
+    """
+
+    gender: int = row_gender(row)
+
+    return cached_patient(find_admission_file(configs, index, row), Gender(gender), configs.paths["patients"])
+
+
+def generate_letter(configs: ConfigurationLoader, templates: XmlTemplateLoader, patient: Patient,
+                    row: dict[str, str], overwrite: bool = False) -> tuple[Path, bool]:
+    """Generates the letter for patient from the answers in a manifest row, as generate_brief would. Blocks, which
+    are not prompted for by generate_brief, get their default values.
+    :param overwrite: Overwrite the letter, if it exists in the output folder
+    :return: Path of the generated letter and False, if it was already generated from the same answers
+    :raises FileExistsError: if the letter exists and overwrite is False
+    :raises ValueError: if an answer is not valid
+    """
+
+    # Letters may have been edited since they were generated
+    if not overwrite and already_generated(configs, patient.file_name()):
+        raise FileExistsError(f"'{patient.file_name()}' wurde bereits generiert und wird nicht überschrieben")
+
+    # Patient body data
+    if configs.include_block("body-data"):
+        patient.height = row.get("height") or patient.height
+        patient.weight = row.get("weight") or patient.weight
+        patient.blood_pressure = row.get("blood_pressure") or patient.blood_pressure
+        patient.pulse = row.get("pulse") or patient.pulse
+
+    midas: str = answer(configs, row, "midas", get_midas, numbers_list, get_midas([30] * 5))
+    whodas: str = (answer(configs, row, "whodas_categories", whodas_categories, check_list,
+                          whodas_categories([True] * 6))
+                   + answer(configs, row, "whodas", get_whodas, numbers_list, get_whodas([30] * 3)))
+
+    treatments_value: str = row.get("treatments", "") if configs.include_block("treatments") else ""
+    treatments: Treatments = Treatments(check_list(treatments_value or "x" * 40))
+    if not treatments.valid():
+        raise ValueError(f"Ungültiger Wert in Spalte 'treatments': {treatments_value}")
+
+    treatments.set_medication(patient)
+
+    self_evaluation: str = join_self_evaluation(
+        answer(configs, row, "afflictions", get_afflictions, numbers_list, ""),
+        answer(configs, row, "bdi", get_depression_score, numbers_list, get_depression_score([1] * 19)),
+        answer(configs, row, "f45", get_personality_score, check_list, get_personality_score([True] * 15)))
+
+    written: bool = write_data(configs, patient, midas, whodas, str(treatments), self_evaluation, templates=templates)
+
+    return configs.paths["output"] / patient.file_name(), written
+
+
+def generate_row(row_nr: int, row: dict[str, str]) -> BatchResult:
+    """Generates a single letter from a manifest row. Runs inside a worker process."""
+
+    result: BatchResult = BatchResult(row_nr, row.get("file", "") or row.get("name", ""), False)
+
+    try:
+        # Retrieve data from admission file
+        patient: Patient = load_patient(_worker_configs, _worker_index, row)
+        result.patient = f"{patient.last_name}, {patient.first_name}"
+
+        hits, misses = _worker_templates.insert_hits, _worker_templates.insert_misses
+        output, written = generate_letter(_worker_configs, _worker_templates, patient, row, _worker_overwrite)
+
+        if (hits, misses) != (_worker_templates.insert_hits, _worker_templates.insert_misses):
+            result.inserts_cached = _worker_templates.insert_hits > hits
+
+        result.output = str(output)
+        result.success = True
+
+        if not written:
+            result.message = "unverändert"
+
+    except Exception as error:
+        result.message = f"{type(error).__name__}: {error}"
+
+    return result
+
+
+def write_report(report_path: Path, results: list[BatchResult]):
+    """Writes the results of a batch run as CSV file."""
+
+    with open(report_path, "w", encoding="utf-8", newline="") as report_file:
+        writer = csv.writer(report_file, delimiter=";")
+        writer.writerow(["row", "patient", "status", "output", "message"])
+
+        for result in results:
+            writer.writerow([result.row, result.patient, "ok" if result.success else "fehler",
+                             result.output, result.message])
+
+
+def run_batch(configs: ConfigurationLoader, manifest_path: Path, workers: int | None = None,
+              report_path: Path | None = None, overwrite: bool = False) -> list[BatchResult]:
+    """Generate letters for every row in manifest_path using a pool of worker processes. Rows of letters, which
+    already exist in the output folder, fail unless overwrite is set.
+    :param configs: ConfigurationLoader containing all needed paths and the blocks to read from the manifest
+    :param manifest_path: CSV or JSON lines file with one patient per row
+    :param workers: Number of worker processes, defaults to the number of cores
+    :param report_path: Path of the CSV report, defaults to <manifest>_report.csv
+    :param overwrite: Overwrite letters, which already exist
+    :return: List of results, ordered by manifest row
+    """
+
+    rows: list[dict[str, str]] = read_manifest(manifest_path)
+
+    # Refresh the index once, before it is loaded by the workers
+    PatientIndex.open(configs.paths["index"], configs.paths["db"])
+    workers = min(workers or os.cpu_count() or 1, max(len(rows), 1))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(configs, overwrite)) as executor:
+        results: list[BatchResult] = list(executor.map(generate_row, range(1, len(rows) + 1), rows,
+                                                       chunksize=max(1, len(rows) // (workers * 4))))
+
+    write_report(report_path or manifest_path.with_name(f"{manifest_path.stem}_report.csv"), results)
+
+    return results
+
+
+def in_range(date: datetime, date_range: tuple[datetime, datetime] | None) -> bool:
+    """Tests, if date lies within date_range, including both ends. Every date lies within None."""
+
+    return date_range is None or date_range[0] <= date <= date_range[1]
+
+
+def select_admission_files(configs: ConfigurationLoader, discharged: tuple[datetime, datetime] | None = None,
+                           admitted: tuple[datetime, datetime] | None = None,
+                           workers: int | None = None) -> list[Path]:
+    """Returns the admission files of all patients, who may have been discharged and admitted in the given ranges.
+    With a patient store, the store is brought up-to-date and both dates are looked up there. Otherwise, the
+    admission date is taken from the file names in the index. The discharge date is only known after the file
+    was parsed, so every file admitted before the end of discharged is returned.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param discharged: First and last discharge date to include
+    :param admitted: First and last admission date to include
+    :param workers: Number of worker processes for importing into the patient store
+    :return: Sorted paths of the admission files
+    """
+
+    if "store" in configs.paths:
+        with PatientStore(configs.paths["store"], configs.paths["patients"]) as store:
+            store.import_folder(configs.paths["db"], workers)
+
+            return sorted(match.docx_path for match in store.search(
+                admitted_from=admitted[0] if admitted else None, admitted_to=admitted[1] if admitted else None,
+                discharged_from=discharged[0] if discharged else None,
+                discharged_to=discharged[1] if discharged else None))
+
+    index: PatientIndex = PatientIndex.open(configs.paths["index"], configs.paths["db"])
+
+    # Patients are discharged after they were admitted
+    return sorted(index.search_path / name for name, (_, _, admission, *_) in index.entries.items()
+                  if in_range(datetime.fromordinal(admission), admitted)
+                  and (discharged is None or datetime.fromordinal(admission) <= discharged[1]))
+
+
+def manifest_genders(configs: ConfigurationLoader, manifest_path: Path) -> tuple[dict[Path, int], list[BatchResult]]:
+    """Reads the gender of patients from a batch manifest. Rows without gender are ignored.
+    :return: Maps absolute path of the admission file onto Gender.Male or Gender.Female, and the failed results
+        of rows, whose admission file could not be found or whose gender is invalid
+    """
+
+    index: PatientIndex = PatientIndex.open(configs.paths["index"], configs.paths["db"])
+    genders: dict[Path, int] = {}
+    failed: list[BatchResult] = []
+
+    for row_nr, row in enumerate(read_manifest(manifest_path), 1):
+        if not row.get("gender", ""):
+            continue
+
+        try:
+            genders[find_admission_file(configs, index, row).absolute()] = row_gender(row)
+
+        except Exception as error:
+            failed.append(BatchResult(row_nr, row.get("file", "") or row.get("name", ""), False,
+                                      message=f"{type(error).__name__}: {error}"))
+
+    return genders, failed
+
+
+def _init_employer_worker(configs: ConfigurationLoader):
+    """Employer notes only need the configurations, templates are loaded by write_employer_note."""
+
+    global _worker_configs
+
+    _worker_configs = configs
+
+
+def generate_employer_row(row_nr: int, admission_file: Path, gender: int | None,
+                          discharged: tuple[datetime, datetime] | None,
+                          admitted: tuple[datetime, datetime] | None) -> BatchResult | None:
+    """Generates the employer note of a single admission file. Runs inside a worker process.
+    :param gender: Gender of the patient, looked up in the ledger if None
+    :return: None, if the patient was not discharged or admitted in the given ranges
+    """
+
+    result: BatchResult = BatchResult(row_nr, admission_file.name, False)
+
+    try:
+        patient: Patient = cached_patient(admission_file, Gender(Gender.Female), _worker_configs.paths["patients"])
+
+        if not in_range(patient.discharge, discharged) or not in_range(patient.admission, admitted):
+            return None
+
+        result.patient = f"{patient.last_name}, {patient.first_name}"
+
+        # The gender is not part of the admission file, use the one of the letter or a previous employer note
+        if gender is None and (ledger := generation_ledger(_worker_configs)) is not None:
+            gender = ledger.known_gender([patient.file_name(), patient.employer_file_name()])
+
+        if gender is None:
+            raise LookupError("Geschlecht unbekannt, Angabe über Spalte 'gender' im Manifest nötig")
+
+        patient.gender = Gender(gender)
+
+        output, written = write_employer_note(_worker_configs, patient)
+        result.output = str(output)
+        result.success = True
+
+        if not written:
+            result.message = "unverändert"
+
+    except Exception as error:
+        result.message = f"{type(error).__name__}: {error}"
+
+    return result
+
+
+def run_employer_batch(configs: ConfigurationLoader, discharged: tuple[datetime, datetime] | None = None,
+                       admitted: tuple[datetime, datetime] | None = None, manifest_path: Path | None = None,
+                       workers: int | None = None, report_path: Path | None = None) -> list[BatchResult]:
+    """Generate employer notes for every patient discharged and admitted in the given ranges, using a pool of
+    worker processes.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param discharged: First and last discharge date to include
+    :param admitted: First and last admission date to include
+    :param manifest_path: CSV or JSON lines file with the columns file or name and gender. Patients, which are not
+        listed, get the gender of their letter or last employer note from the ledger.
+    :param workers: Number of worker processes, defaults to the number of cores
+    :param report_path: Path of the CSV report, defaults to employer_report.csv in the output folder
+    :return: List of results, ordered by file name of the admission file, followed by the manifest rows, whose
+        admission file could not be found
+    """
+
+    admission_files: list[Path] = select_admission_files(configs, discharged, admitted, workers)
+    genders, unmatched = manifest_genders(configs, manifest_path) if manifest_path else ({}, [])
+
+    arguments: list[tuple] = [(row_nr, admission_file, genders.get(admission_file.absolute()), discharged, admitted)
+                              for row_nr, admission_file in enumerate(admission_files, 1)]
+    workers = min(workers or os.cpu_count() or 1, max(len(arguments), 1))
+
+    # Writing a few notes is faster than starting worker processes
+    if workers == 1 or len(arguments) < 8:
+        _init_employer_worker(configs)
+        results: list[BatchResult | None] = [generate_employer_row(*row_arguments) for row_arguments in arguments]
+
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_employer_worker,
+                                 initargs=(configs,)) as executor:
+            results = list(executor.map(generate_employer_row, *zip(*arguments),
+                                        chunksize=max(1, len(arguments) // (workers * 4))))
+
+    selected: list[BatchResult] = [result for result in results if result is not None] + unmatched
+    for row_nr, result in enumerate(selected, 1):
+        result.row = row_nr
+
+    report_path = report_path or configs.paths["output"] / "employer_report.csv"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    write_report(report_path, selected)
+
+    return selected
@@ -0,0 +1,76 @@
+"""Compares the streaming admission parser with the previous regex based parser.
+
+    python -m bench.admission_parser
+"""
+from pathlib import Path
+from zipfile import ZipFile
+from tempfile import TemporaryDirectory
+import random
+import re
+import time
+import tracemalloc
+
+from loaders.patient import extract_text, Patient
+from loaders.admission_parser import read_cells
+
+from .synthetic import write_admission_file
+
+
+def read_cells_regex(admission_file: Path, wanted: set[int]) -> dict[int, str]:
+    """Previous implementation of Patient.load_from_file: read the whole document, match cells by regex."""
+
+    pattern: re.Pattern = re.compile(r"<w:tc>(.*?)</w:tc>")
+    cells: dict[int, str] = {}
+
+    with ZipFile(admission_file, "r") as zip_file:
+        with zip_file.open("word/document.xml") as docx_file:
+            for i, m in enumerate(pattern.finditer(docx_file.read().decode("utf-8"))):
+                if i in wanted:
+                    cells[i] = extract_text(m.group(1))
+
+                if i == max(wanted):
+                    break
+
+    return cells
+
+
+def measure(fn, admission_file: Path, repeat: int) -> tuple[float, int]:
+    """Returns median runtime in ms and peak traced memory in bytes of fn(admission_file)."""
+
+    wanted: set[int] = set(Patient.admission_cells)
+    timings: list[float] = []
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fn(admission_file, wanted)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(admission_file, wanted)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return sorted(timings)[repeat // 2] * 1000, peak
+
+
+def main():
+    rng: random.Random = random.Random(0)
+
+    with TemporaryDirectory() as folder:
+        for filler_rows, tracked_changes in [(0, False), (2000, False), (20000, True)]:
+            admission_file: Path = write_admission_file(Path(folder), rng, filler_rows, tracked_changes)
+            wanted: set[int] = set(Patient.admission_cells)
+
+            assert read_cells(admission_file, wanted) == read_cells_regex(admission_file, wanted)
+
+            with ZipFile(admission_file) as zip_file:
+                size: int = zip_file.getinfo("word/document.xml").file_size
+
+            print(f"document.xml: {size / 1024:.0f} KB, {filler_rows} filler rows, tracked changes: {tracked_changes}")
+            for name, fn in [("regex", read_cells_regex), ("streaming", read_cells)]:
+                runtime, peak = measure(fn, admission_file, 11)
+                print(f"\t{name:<10} {runtime:8.2f} ms {peak / 1024:10.0f} KB peak")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Compares the peak memory of writing a letter with the rendered document as one string and streamed in chunks.
+
+    python -m bench.letter_memory
+"""
+from pathlib import Path
+from zipfile import ZipFile
+from tempfile import TemporaryDirectory
+import random
+import time
+import tracemalloc
+
+from loaders.config_loader import ConfigurationLoader
+from loaders.insert_loader import XmlTemplateLoader
+from loaders.patient import Patient
+from loaders.document_template import load_template
+from generators.gender import Gender
+from template_writer import (write_data, patch_data, create_output_file, document_values, generate_header,
+                             patient_fields, document_fields, hook_pattern)
+
+from .synthetic import write_admission_file
+
+templates_path: Path = Path(__file__).parent.parent / "templates"
+
+
+def write_data_joined(configs: ConfigurationLoader, patient: Patient, *answers: str,
+                      templates: XmlTemplateLoader | None = None):
+    """Previous implementation of write_data: render the whole document into a string, then encode and write it."""
+
+    document_template = load_template(configs.paths["document"],
+                                      patient_fields | document_fields | templates.insert_names())
+    document_text: str = document_template.for_gender(patient.gender).render(
+        document_values(templates, patient, *answers))
+
+    create_output_file(configs.paths["output"] / patient.file_name(), configs.paths["docx"], document_text,
+                       generate_header(configs, patient), configs.compress_levels)
+
+
+def patch_data_joined(configs: ConfigurationLoader, patient: Patient, templates: XmlTemplateLoader):
+    """Previous implementation of patch_data: read the whole document, turn hooks into placeholders and format."""
+
+    file_path: Path = configs.paths["output"] / patient.file_name()
+
+    with ZipFile(file_path, "r") as zip_file:
+        document_text: str = (hook_pattern.sub(r"{\1}", zip_file.read("word/document.xml").decode("utf-8"))
+                              .format(**templates.get_inserts(list(patient.diagnosis.keys()))))
+        header_text: str = zip_file.read("word/header1.xml").decode("utf-8")
+
+    create_output_file(file_path.with_stem(f"{file_path.stem} patch"), configs.paths["docx"], document_text,
+                       header_text, configs.compress_levels)
+
+
+def measure(fn, repeat: int, *args, **kwargs) -> tuple[float, int]:
+    """Returns median runtime in ms and peak traced memory in bytes of fn(*args, **kwargs)."""
+
+    timings: list[float] = []
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fn(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return sorted(timings)[repeat // 2] * 1000, peak
+
+
+def main():
+    with TemporaryDirectory() as folder:
+        config_path: Path = Path(folder) / "config.txt"
+        config_path.write_text("\n".join(f"{key}={templates_path / name}" for key, name in [
+            ("docx", "template.docx"), ("header", "header1_template.xml"), ("document", "document_template.xml"),
+            ("inserts", "insert_template.xml"), ("employer", "employer_document_template.xml")]), encoding="utf-8")
+
+        configs: ConfigurationLoader = ConfigurationLoader(config_path)
+        configs.paths["output"] = Path(folder) / "output"
+        templates: XmlTemplateLoader = XmlTemplateLoader(configs.paths["inserts"])
+
+        patient: Patient = Patient(Gender(Gender.Female))
+        patient.load_from_file(write_admission_file(Path(folder), random.Random(0)))
+
+        # Free text entered by the user is the only part of a letter without a size limit
+        for paragraphs in (1, 1000, 20000):
+            answers: tuple[str, ...] = ("MIDAS {pat_nom}", "WHODAS {pat_nom}",
+                                        "Vorbehandlung in der Tagesklinik. " * paragraphs, "Selbstauskunft")
+
+            write_data(configs, patient, *answers, templates=templates)
+            with ZipFile(configs.paths["output"] / patient.file_name()) as zip_file:
+                size: int = zip_file.getinfo("word/document.xml").file_size
+
+            print(f"document.xml: {size / 1024:.0f} KB, {paragraphs} Sätze Vorbehandlung")
+
+            for name, fn in [("string", write_data_joined), ("chunks", write_data)]:
+                runtime, peak = measure(fn, 5, configs, patient, *answers, templates=templates)
+                print(f"\t{name:<12} {runtime:8.2f} ms {peak / 1024:10.0f} KB peak")
+
+            for name, fn in [("patch", patch_data_joined), ("patch chunks", patch_data)]:
+                runtime, peak = measure(fn, 5, configs, patient, templates)
+                print(f"\t{name:<12} {runtime:8.2f} ms {peak / 1024:10.0f} KB peak")
+
+
+if __name__ == '__main__':
+    main()
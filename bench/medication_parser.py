@@ -0,0 +1,100 @@
+"""Compares the single pass medication line parser with the previous regex, on random and on adversarial lines.
+
+    python -m bench.medication_parser
+"""
+import random
+import re
+import time
+
+from loaders.medication import parse_medication_line
+
+
+# Previous implementation of parse_medication_line, its runtime grows with the fourth power of the line length on
+# lines without times taken
+medication_pattern_regex: re.Pattern = re.compile(
+    r"([a-zA-Z)(\d\s\-]*?)\s+([\d,./]+)\s*(.*?)\s+([\d\s,./]+(?:-[\d\s,./]+)+)")
+
+# Characters of random lines, weighted towards the ones the regex distinguishes
+alphabet: str = "aZ0159 ,./-()\t ä%µ²x"
+
+
+def parse_medication_line_regex(line: str) -> tuple[str, str, str, str] | None:
+    if m := medication_pattern_regex.search(line):
+        return m.group(1), m.group(2), m.group(3), m.group(4)
+
+    return None
+
+
+def random_line(rng: random.Random, length: int) -> str:
+    """Returns a line of random characters, half of them with a realistic medication line appended."""
+
+    line: str = "".join(rng.choice(alphabet) for _ in range(rng.randrange(length + 1)))
+
+    if rng.random() < 0.5:
+        line += rng.choice(["", " "]) + f"Ibuprofen {rng.choice(['400', '1,5', '2.5/10'])} mg 1-0-{rng.randrange(3)}"
+
+    return line
+
+
+def adversarial_lines(length: int) -> dict[str, str]:
+    """Returns lines, on which the regex backtracks the most."""
+
+    return {
+        "Name ohne Dosis": "a " * (length // 2),
+        "Dosen ohne Einnahme": "1 " * (length // 2),
+        "Einheit ohne Einnahme": "a 1 " + "x " * (length // 2),
+        "Einnahme ohne Strich": "a 1 mg " + "1 " * (length // 2),
+    }
+
+
+def fuzz(count: int, seed: int = 0) -> int:
+    """Compares both parsers on count random lines.
+    :return: Number of lines parsed differently
+    """
+
+    rng: random.Random = random.Random(seed)
+    differences: int = 0
+
+    for _ in range(count):
+        line: str = random_line(rng, rng.choice([4, 12, 40]))
+
+        if parse_medication_line(line) != parse_medication_line_regex(line):
+            differences += 1
+            print(f"\tabweichend: {line!r}")
+
+    return differences
+
+
+def measure(fn, line: str, repeat: int) -> float:
+    """Returns median runtime in ms of fn(line)."""
+
+    timings: list[float] = []
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fn(line)
+        timings.append(time.perf_counter() - start)
+
+    return sorted(timings)[repeat // 2] * 1000
+
+
+def main():
+    print(f"{fuzz(50000)} von 50000 zufälligen Zeilen abweichend")
+
+    typical: str = "Ibuprofen 400 mg 1-0-1"
+    print(f"Übliche Zeile, {len(typical)} Zeichen")
+    for parser, fn in [("regex", parse_medication_line_regex), ("single pass", parse_medication_line)]:
+        print(f"\t{parser:<12} {measure(fn, typical, 1001) * 1000:10.2f} µs")
+
+    # The regex needs seconds for a line of 200 characters already
+    for length in [50, 100, 200]:
+        for name, line in adversarial_lines(length).items():
+            assert parse_medication_line(line) == parse_medication_line_regex(line)
+
+            print(f"{name}, {len(line)} Zeichen")
+            for parser, fn in [("regex", parse_medication_line_regex), ("single pass", parse_medication_line)]:
+                print(f"\t{parser:<12} {measure(fn, line, 3):10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Benchmark suite timing every stage of letter generation on synthetic admission files.
+
+    python -m bench.run --files 1000 [--db bench/db] [--samples 200] [--output results.json] [--compare old.json]
+
+Results are written as JSON to bench/results/, so runs can be compared over time.
+"""
+from pathlib import Path
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from statistics import median, mean
+import argparse
+import json
+import platform
+import random
+import time
+
+from loaders.config_loader import ConfigurationLoader
+from loaders.insert_loader import XmlTemplateLoader
+from loaders.patient import Patient
+from loaders.patient_index import PatientIndex
+from loaders.document_template import load_template
+from generators.gender import Gender
+from brief import get_patient_file_matches
+from template_writer import (create_output_file, document_values, generate_header,
+                             patient_fields, document_fields)
+
+from .synthetic import write_admission_file, last_names
+
+
+class StageTimer:
+    """Collects runtimes of named stages."""
+
+    def __init__(self):
+        self.timings: dict[str, list[float]] = {}
+
+    def run(self, stage: str, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs), add its runtime to stage and return its result."""
+
+        start: float = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.timings.setdefault(stage, []).append(time.perf_counter() - start)
+
+        return result
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {stage: {"runs": len(timings),
+                        "median_ms": median(timings) * 1000,
+                        "mean_ms": mean(timings) * 1000,
+                        "min_ms": min(timings) * 1000,
+                        "max_ms": max(timings) * 1000,
+                        "total_ms": sum(timings) * 1000}
+                for stage, timings in self.timings.items()}
+
+
+def prepare_db(db_path: Path, files: int, seed: int) -> list[Path]:
+    """Fill db_path with synthetic admission files. Files of previous runs with the same count and seed are reused."""
+
+    marker: Path = db_path / ".bench"
+    if marker.exists() and marker.read_text() == f"{files} {seed}":
+        return sorted(db_path.glob("*.docx"))
+
+    db_path.mkdir(parents=True, exist_ok=True)
+    for old_file in db_path.glob("*.docx"):
+        old_file.unlink()
+
+    rng: random.Random = random.Random(seed)
+    paths: list[Path] = []
+
+    for number in range(files):
+        paths.append(write_admission_file(db_path, rng, number=number))
+
+        if (number + 1) % 10000 == 0:
+            print(f"\t{number + 1} / {files} Aufnahmebögen generiert")
+
+    marker.write_text(f"{files} {seed}")
+    return sorted(paths)
+
+
+def run(configs: ConfigurationLoader, db_files: list[Path], samples: int, seed: int) -> dict[str, dict[str, float]]:
+    """Time every stage of letter generation for a sample of the admission files in configs.paths["db"]."""
+
+    timer: StageTimer = StageTimer()
+    rng: random.Random = random.Random(seed)
+    sample_files: list[Path] = rng.sample(db_files, min(samples, len(db_files)))
+
+    # Directory search: a full walk for every lookup
+    for name in rng.sample(last_names, 5):
+        timer.run("get_patient_file_matches", get_patient_file_matches, name.lower(), configs.paths["db"])
+
+    # Index: built once, then searched
+    configs.paths["index"].unlink(missing_ok=True)
+    index: PatientIndex = timer.run("patient_index_build", PatientIndex.open, configs.paths["index"],
+                                    configs.paths["db"])
+    timer.run("patient_index_load", PatientIndex.open, configs.paths["index"], configs.paths["db"])
+    for name in last_names:
+        timer.run("patient_index_search", index.search, name.lower())
+
+    # Insert templates without and with cache
+    cache_file: Path = configs.paths["index"].with_name("insert_template.cache")
+    for _ in range(10):
+        cache_file.unlink(missing_ok=True)
+        timer.run("xml_template_loader_cold", XmlTemplateLoader, configs.paths["inserts"], cache_file)
+    for _ in range(10):
+        templates: XmlTemplateLoader = timer.run("xml_template_loader_warm", XmlTemplateLoader,
+                                                 configs.paths["inserts"], cache_file)
+
+    document_template = timer.run("document_template_compile", load_template, configs.paths["document"],
+                                  patient_fields | document_fields | templates.insert_names())
+
+    for admission_file in sample_files:
+        patient: Patient = Patient(Gender(rng.choice([Gender.Male, Gender.Female])))
+        timer.run("load_from_file", patient.load_from_file, admission_file)
+
+        timer.run("get_inserts", templates.get_inserts, list(patient.diagnosis.keys()))
+
+        values: dict = timer.run("document_values", document_values, templates, patient,
+                                 "MIDAS {pat_nom}", "WHODAS {pat_nom}", "Vorbehandlungen", "Selbstauskunft")
+        document_text: str = timer.run("render_document", document_template.for_gender(patient.gender).render,
+                                         values)
+        header_text: str = timer.run("generate_header", generate_header, configs, patient)
+
+        timer.run("create_output_file", create_output_file, configs.paths["output"] / patient.file_name(),
+                  configs.paths["docx"], document_text, header_text, configs.compress_levels)
+
+    return timer.summary()
+
+
+def main():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="bench", description=__doc__,
+                                                              formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000, help="Anzahl synthetischer Aufnahmebögen")
+    parser.add_argument("--samples", type=int, default=200, help="Anzahl der Briefe, die generiert werden")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", type=Path, default=Path("bench/db"),
+                        help="Ordner der synthetischen Aufnahmebögen, wird zwischen Läufen wiederverwendet")
+    parser.add_argument("--output", type=Path, default=None, help="JSON-Datei für die Ergebnisse")
+    parser.add_argument("--compare", type=Path, default=None, help="Ergebnisse eines früheren Laufs zum Vergleich")
+    args = parser.parse_args()
+
+    configs: ConfigurationLoader = ConfigurationLoader(Path("./config.txt"))
+
+    print(f"Generiere {args.files} Aufnahmebögen in {args.db}")
+    db_files: list[Path] = prepare_db(args.db, args.files, args.seed)
+
+    with TemporaryDirectory() as temp_folder:
+        configs.paths["db"] = args.db
+        configs.paths["output"] = Path(temp_folder) / "output"
+        configs.paths["index"] = Path(temp_folder) / "patient_index.json"
+
+        stages: dict[str, dict[str, float]] = run(configs, db_files, args.samples, args.seed)
+
+    results: dict = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "files": args.files,
+        "samples": args.samples,
+        "seed": args.seed,
+        "stages": stages
+    }
+
+    output_path: Path = args.output or Path("bench/results") / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    previous: dict[str, dict[str, float]] = (json.loads(args.compare.read_text(encoding="utf-8"))["stages"]
+                                             if args.compare else {})
+
+    for stage, timings in stages.items():
+        line: str = f"\t{stage:<28} {timings['median_ms']:10.3f} ms (Median, {timings['runs']} Läufe)"
+
+        if stage in previous:
+            line += f", vorher {previous[stage]['median_ms']:10.3f} ms"
+
+        print(line)
+
+    print(f"Ergebnisse gespeichert in {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+from pathlib import Path
+from datetime import datetime, timedelta
+from zipfile import ZipFile, ZIP_DEFLATED
+from xml.sax.saxutils import escape
+import random
+
+
+last_names: list[str] = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz",
+                         "Hoffmann", "Schäfer", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Schröder", "Neumann",
+                         "Schwarz", "Zimmermann", "Braun", "Krüger", "Hofmann", "Hartmann", "Lange", "Schmitt",
+                         "Werner", "Schmitz", "Krause", "Meier", "Lehmann", "Schmid", "Schulze", "Maier", "Köhler",
+                         "Herrmann", "König", "Walter", "Mayer", "Huber", "Kaiser", "Fuchs", "Peters", "Lang",
+                         "Scholz", "Möller", "Weiß", "Jung", "Hahn", "Schubert", "Müller-Lüdenscheidt"]
+
+first_names: list[str] = ["Anna", "Max", "Paul", "Marie", "Sophie", "Felix", "Emma", "Leon", "Mia", "Jonas", "Hannah",
+                          "Lukas", "Lea", "Elias", "Lena", "Noah", "Laura", "Finn", "Julia", "Ben"]
+
+diagnoses: dict[int, list[str]] = {
+    36: ["Migräne ohne Aura G43.0", "Migräne mit Aura G43.1", "Chronische Migräne G43.8",
+         "Kopfschmerz vom Spannungstyp G44.2", "Clusterkopfschmerz G44.0", "Status migraenosus G43.2"],
+    39: ["Medikamentenübergebrauchskopfschmerz G44.4", "Schädlicher Gebrauch von Analgetika F55.2"],
+    42: ["Mittelgradige depressive Episode F32.1", "Chronische Schmerzstörung F45.41", "Angststörung F41.1"],
+    45: ["Lumbago M54.5", "Zervikalneuralgie M54.2", "Fibromyalgie M79.70", "Rückenschmerzen M54.9",
+         "Arterielle Hypertonie I10.90"],
+}
+
+current_medication: list[str] = ["Amitriptylin 25 mg 0-0-1", "Topiramat 50mg 1-0-1", "Metoprolol 47,5 mg 1-0-1/2",
+                                 "Ramipril 5 mg 1-0-0-0", "Candesartan 8 mg 1 - 0 - 0", "L-Thyroxin 75 µg 1-0-0",
+                                 "Pantoprazol 40 mg 1-0-0", "Vitamin D nach Bedarf"]
+
+former_medication: list[str] = ["Ibuprofen", "Sumatriptan (wirkungslos)", "Paracetamol", "Metamizol", "Naproxen",
+                                "Flunarizin", "Propranolol (Schwindel)", "Valproat", "Erenumab"]
+
+
+def cell(paragraphs: list[str], tracked_changes: bool = False) -> str:
+    """Returns a table cell as Word would write it, with one run per paragraph."""
+
+    runs: list[str] = []
+    for text in paragraphs:
+        run: str = (f'<w:r><w:rPr><w:rFonts w:ascii="Arial" w:hAnsi="Arial"/><w:sz w:val="20"/></w:rPr>'
+                    f'<w:t xml:space="preserve">{escape(text)}</w:t></w:r>')
+
+        if tracked_changes:
+            run = (f'<w:ins w:id="1" w:author="Station" w:date="2024-01-01T00:00:00Z">{run}</w:ins>'
+                   f'<w:del w:id="2" w:author="Station" w:date="2024-01-01T00:00:00Z"><w:r>'
+                   f'<w:delText>{escape(text)}</w:delText></w:r></w:del>')
+
+        runs.append(f'<w:p w:rsidR="00A1B2C3"><w:pPr><w:spacing w:after="0"/></w:pPr>{run}</w:p>')
+
+    return f'<w:tc><w:tcPr><w:tcW w:w="3000" w:type="dxa"/></w:tcPr>{"".join(runs)}</w:tc>'
+
+
+def admission_cells(rng: random.Random, last_name: str, first_name: str, admission: datetime) -> dict[int, list[str]]:
+    """Returns the paragraphs of every cell, which is read by Patient.load_from_file."""
+
+    birth_date: datetime = datetime(rng.randint(1940, 2004), rng.randint(1, 12), rng.randint(1, 28))
+
+    cells: dict[int, list[str]] = {
+        0: [f"{last_name}, {first_name}"],
+        1: [birth_date.strftime("%d.%m.%Y"), "GKV"],
+        4: [f"{rng.choice(['Haupt', 'Bahnhof', 'Garten'])}str. {rng.randint(1, 120)}, "
+            f"{rng.randint(10000, 99999)} Musterstadt"],
+        8: [rng.choice(["Lehrerin", "Industriemechaniker", "Rentner", "Pflegekraft", "Student"])],
+        19: [f"Arzt: {rng.choice(last_names)}"],
+        20: [f"Psych.: {rng.choice(last_names)}"],
+        23: [admission.strftime("%d.%m.%Y")],
+        25: [(admission + timedelta(days=rng.randint(7, 21))).strftime("%d.%m.%Y")],
+        31: [rng.choice(["Keine bekannt", "Penicillin", "Pollen & Nüsse", "Kontrastmittel <Jod>"])],
+        52: ["Schmerzmedikation"] + rng.sample(current_medication, 2),
+        55: ["Weitere Medikation"] + rng.sample(current_medication, 3),
+        58: ["Akutmedikation", ", ".join(rng.sample(former_medication, 3))],
+        59: ["Basismedikation", ", ".join(rng.sample(former_medication, 2)), "Botox (2019)"],
+    }
+
+    for index, options in diagnoses.items():
+        cells[index] = ["Diagnosen"] + rng.sample(options, rng.randint(0, min(3, len(options))))
+
+    return cells
+
+
+def admission_document(cells: dict[int, list[str]], filler_rows: int = 0, tracked_changes: bool = False) -> bytes:
+    """Builds word/document.xml of an admission file. The form is a table with 3 cells per row, followed by an
+    optional large table of filler_rows rows, e.g. embedded lab results."""
+
+    cell_count: int = max(cells) + 13
+    rows: list[str] = [
+        "<w:tr>" + "".join(cell(cells.get(i, [f"Feld {i}"])) for i in range(start, min(start + 3, cell_count)))
+        + "</w:tr>"
+        for start in range(0, cell_count, 3)]
+
+    filler: list[str] = [
+        "<w:tr>" + "".join(cell([f"Befund {row}.{column}", "Lorem ipsum dolor sit amet " * 4], tracked_changes)
+                           for column in range(4)) + "</w:tr>"
+        for row in range(filler_rows)]
+
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            f'<w:tbl>{"".join(rows)}</w:tbl>'
+            '<w:p><w:r><w:t>Befunde</w:t></w:r></w:p>'
+            f'<w:tbl>{"".join(filler)}</w:tbl>'
+            '<w:sectPr/></w:body></w:document>').encode("utf-8")
+
+
+def write_admission_file(folder: Path, rng: random.Random, filler_rows: int = 0,
+                         tracked_changes: bool = False, number: int | None = None) -> Path:
+    """Writes a random synthetic admission file, named like the files in the db folder. number is appended to the
+    file name to keep names unique, a random number is used if it is omitted."""
+
+    last_name: str = rng.choice(last_names)
+    first_name: str = rng.choice(first_names)
+    admission: datetime = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 700))
+
+    number = rng.randrange(10 ** 6) if number is None else number
+    path: Path = folder / f"{last_name}, {first_name} {admission.strftime('%d%m%Y')} {number}.docx"
+
+    with ZipFile(path, "w", ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("word/document.xml", admission_document(
+            admission_cells(rng, last_name, first_name, admission), filler_rows, tracked_changes))
+
+    return path
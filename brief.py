@@ -1,24 +1,20 @@
 from loaders.patient import Patient
 from loaders.config_loader import ConfigurationLoader
+from loaders.patient_index import PatientData, PatientIndex, parse_file_name
+from loaders.patient_cache import cached_patient
+from loaders.patient_store import PatientStore
 from generators.gender import Gender
 from generators.scores import (get_midas, whodas_categories, get_whodas,
                                get_afflictions, get_depression_score, get_personality_score)
 from generators.treatments import Treatments
-from template_writer import write_data, patch_data, write_employer_note
+from template_writer import (patch_data, write_employer_note, prepare_document, finish_document, PreparedDocument,
+                             already_generated)
+import profiler
 
 from pathlib import Path
-import re
-from datetime import datetime
 from operator import attrgetter
-from dataclasses import dataclass
-
-
-@dataclass
-class PatientData:
-    last_name: str
-    first_name: str
-    admission: datetime
-    docx_path: Path
+from concurrent.futures import ThreadPoolExecutor, Future
+import copy
 
 
 def check_list(text: str) -> list[bool]:
@@ -42,12 +38,12 @@ def numbers_list(text: str) -> list[int]:
 
 
 def get_patient_file_matches(patient_surname: str, search_path: Path) -> list[PatientData]:
-    """Searches through search_path for all matches of patient_surname in admission files.
+    """Searches through search_path for all matches of patient_surname in admission files. This walks the whole
+    folder, PatientIndex.search should be preferred for repeated lookups.
     :param patient_surname: the surname of the patient to search
     :param search_path: the path of the admission files to search
     :return a sorted list of PatientData objects"""
 
-    name_pattern: re.Pattern = re.compile(r"(.*?), (.*?) (\d{8})")
     matches: list[PatientData] = []
 
     # Only look through docx-files
@@ -57,10 +53,8 @@ def get_patient_file_matches(patient_surname: str, search_path: Path) -> list[Pa
             continue
 
         # Extract information from file name
-        if found_match := name_pattern.match(docx_path.name):
-            last_name, first_name, admission = found_match.groups()
-            matches.append(
-                PatientData(last_name, first_name, datetime.strptime(admission, "%d%m%Y"), docx_path))
+        if parsed := parse_file_name(docx_path.name):
+            matches.append(PatientData(*parsed, docx_path))
 
     # Sort and return results
     matches.sort(key=attrgetter('last_name', 'first_name', 'admission'), reverse=True)
@@ -68,6 +62,18 @@ def get_patient_file_matches(patient_surname: str, search_path: Path) -> list[Pa
     return matches
 
 
+def search_admission_files(configs: ConfigurationLoader, patient_surname: str) -> list[PatientData]:
+    """Searches the patient store for patient_surname, if it is configured. Otherwise, the admission file index is
+    used. Either is brought up-to-date with the db folder first."""
+
+    if "store" in configs.paths:
+        with PatientStore(configs.paths["store"], configs.paths["patients"]) as store:
+            store.import_folder(configs.paths["db"])
+            return store.search_name(patient_surname)
+
+    return PatientIndex.open(configs.paths["index"], configs.paths["db"]).search(patient_surname)
+
+
 def ui_get_patient_file(matches: list[PatientData]) -> Path | None:
     """Helper function to retrieve the definitive Filepath for the selected patient. Prompts user for choice, if
     multiple files are possible matches"""
@@ -102,11 +108,13 @@ def get_patient_by_input_name(configs: ConfigurationLoader) -> Patient | None:
     """Tries to read patient data from the database by provided user input
     """
 
+    patient_surname: str = input("Nachname des Patienten: ").lower()
+
+    with profiler.stage("directory search"):
+        matches: list[PatientData] = search_admission_files(configs, patient_surname)
+
     # If there were multiple matches, prompt user to select correct file
-    patient_file: Path = ui_get_patient_file(
-        get_patient_file_matches(
-            input("Nachname des Patienten: ").lower(),
-            configs.paths["db"]))
+    patient_file: Path = ui_get_patient_file(matches)
 
     # Abort, if no file could be found
     if patient_file is None:
@@ -114,12 +122,31 @@ def get_patient_by_input_name(configs: ConfigurationLoader) -> Patient | None:
         return None
 
     # Retrieve data from admission file and determine gender
-    patient: Patient = Patient(Gender(Gender.Male if input("Geschlecht: ").lower() == "m" else Gender.Female))
-    patient.load_from_file(patient_file)
+    gender: Gender = Gender(Gender.Male if input("Geschlecht: ").lower() == "m" else Gender.Female)
+
+    # Admission files already read for the letter are not parsed again for the employer note or a patch
+    with profiler.stage("admission parse"):
+        patient: Patient = cached_patient(patient_file, gender, configs.paths["patients"])
 
     return patient
 
 
+def join_self_evaluation(*evaluations: str) -> str:
+    """Joins the self evaluation texts (afflictions, depression, personality), omitting skipped ones."""
+
+    return ". ".join(filter(lambda x: x != "", evaluations))
+
+
+def default_input(fn, value) -> str:
+    """Analogous to ensure_input for blocks, which are not prompted for: Returns fn(value), timed like user input.
+    :param fn: Function pointer to call on the default value. Should return string.
+    :param value: Default value of the block
+    """
+
+    with profiler.stage("score text generation"):
+        return fn(value)
+
+
 def ensure_input(fn, conv, prompt) -> str:
     """Loop until user gave a valid input. An input is valid, if fn(conv(input)) is not None.
     :param fn: Function pointer to call on the user input. Should return string or None.
@@ -135,7 +162,10 @@ def ensure_input(fn, conv, prompt) -> str:
         if user_input == "skip":
             return ""
 
-        if (result := fn(conv(user_input))) is not None:
+        with profiler.stage("score text generation"):
+            result: str | None = fn(conv(user_input))
+
+        if result is not None:
             return result
 
 
@@ -147,14 +177,18 @@ def generate_brief(configs: ConfigurationLoader):
         return
 
     # Make sure not to overwrite existing files
-    if (configs.paths["output"] / patient.file_name()).exists():
+    if already_generated(configs, patient.file_name()):
 
         # Should we patch the file?
         if "ja" == input(
                 f"Eine Datei '{patient.file_name()}' wurde bereits generiert. "
                 f"Soll die gefundene Datei gepatcht werden (ja/nein)? "):
 
-            patch_data(configs, patient)
+            if (patch_path := patch_data(configs, patient)) is None:
+                print(f"Die Datei '{patient.file_name()}' wurde nicht gefunden, es wurde nichts gepatcht.")
+                return
+
+            profiler.write_trace(patch_path)
 
             print("Datei wurde gepatcht. Bereits generierte Inhalte wurden NICHT verändert.\n"
                   "\t* Bereits generierte Inhalte müssen ggf. manuell angepasst werden\n"
@@ -167,7 +201,30 @@ def generate_brief(configs: ConfigurationLoader):
                 "Soll die gefundene Datei überschrieben werden (Daten gehen UNWIEDERBRINGLICH verloren) (ja/nein)? "):
             return
 
+    # Load templates and render everything, which does not depend on the answers below, while the user types
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        preparation: Future[PreparedDocument] = executor.submit(prepare_document, configs, copy.deepcopy(patient))
+
+        if not generate_from_input(configs, patient, preparation):
+            print("Der Brief wurde bereits mit denselben Eingaben und Schablonen generiert und bleibt unverändert.")
+
+    profiler.write_trace(configs.paths["output"] / patient.file_name())
+
+
+def check_preparation(preparation: Future[PreparedDocument]):
+    """Raises the error of preparation, if it already failed, so the user does not answer the remaining prompts in
+    vain. Does not wait for preparation to finish."""
+
+    if preparation.done() and (error := preparation.exception()) is not None:
+        raise error
+
+
+def generate_from_input(configs: ConfigurationLoader, patient: Patient, preparation: Future[PreparedDocument]) -> bool:
+    """Prompts the user for every configured block and writes the letter prepared by preparation.
+    :return: False, if the letter was already generated from the same answers and was not written again"""
+
     # Patient body data
+    check_preparation(preparation)
     if configs.include_block("body-data"):
         patient.height = input("Größe (in cm ohne Einheit): ")
         patient.weight = input("Gewicht (in kg ohne Einheit): ")
@@ -175,20 +232,23 @@ def generate_brief(configs: ConfigurationLoader):
         patient.pulse = input("Puls (in /Min.): ")
 
     # Prompt user for MIDAS-score
+    check_preparation(preparation)
     midas: str = (ensure_input(get_midas, numbers_list, "MIDAS-Score [5 Zahlen]: ")
                   if configs.include_block("midas")
-                  else get_midas([30] * 5))
+                  else default_input(get_midas, [30] * 5))
 
     # Prompt user for WHODAS-2.0 score
+    check_preparation(preparation)
     whodas: str = (ensure_input(whodas_categories, check_list, "WHODAS-Kategorien [6 x]: ")
                    if configs.include_block("whodas-cats")
-                   else whodas_categories([True] * 6))
+                   else default_input(whodas_categories, [True] * 6))
 
     whodas += (ensure_input(get_whodas, numbers_list, "WHODAS-Score [3 Zahlen]: ")
                if configs.include_block("whodas")
-               else get_whodas([30] * 3))
+               else default_input(get_whodas, [30] * 3))
 
     # Prompt user for list (x or any other char) of previous treatments
+    check_preparation(preparation)
     while True:
         treatments: Treatments = Treatments(
             check_list(input("Vorbehandlungen [40 x]: "))
@@ -199,29 +259,32 @@ def generate_brief(configs: ConfigurationLoader):
             break
 
     # Prompt user for afflictions
+    check_preparation(preparation)
     eval_afflictions: str = (ensure_input(get_afflictions, numbers_list, "Beschwerden Selbstauskunft (Zahlen): ")
                              if configs.include_block("afflictions")
                              else "")
 
     # Prompt user for depression score (BDI-II like)
+    check_preparation(preparation)
     eval_depression: str = (ensure_input(get_depression_score, numbers_list, "Depression-Score [19 Zahlen]: ")
                             if configs.include_block("bdi")
-                            else get_depression_score([1] * 19))
+                            else default_input(get_depression_score, [1] * 19))
 
     # Prompt user for chronic-pain personality test
+    check_preparation(preparation)
     eval_personality: str = (ensure_input(get_personality_score, check_list, "Personality-Score [15 x]: ")
                              if configs.include_block("f45")
-                             else get_personality_score([True] * 15))
+                             else default_input(get_personality_score, [True] * 15))
 
     # Apply medication from patient data (from admission file) to list of previous treatments.
     treatments.set_medication(patient)
 
-    # Generate letter from data
-    write_data(configs, patient,
-               midas, whodas, str(treatments),
-               ". ".join(filter(lambda x: x != "", [eval_afflictions, eval_depression, eval_personality])))
+    # Generate letter from data, only the answers are left to fill in
+    return finish_document(configs, preparation.result(), patient,
+                           midas, whodas, str(treatments),
+                           join_self_evaluation(eval_afflictions, eval_depression, eval_personality))
 
 
 def generate_employer_note(configs: ConfigurationLoader):
     if patient := get_patient_by_input_name(configs):
-        write_employer_note(configs, patient)
+        profiler.write_trace(write_employer_note(configs, patient)[0])
@@ -0,0 +1,192 @@
+from loaders.config_loader import ConfigurationLoader
+
+from pathlib import Path
+from dataclasses import dataclass
+from zipfile import ZipFile, ZIP_DEFLATED
+import os
+import re
+
+
+# Tags, comments and processing instructions of xml text
+tag_pattern: re.Pattern = re.compile(r"<!--.*?-->|<\?.*?\?>|<[^>]*>", re.DOTALL)
+
+# Opening tags of elements, whose whitespace is part of the document text
+text_element_pattern: re.Pattern = re.compile(r"<w:(t|delText|instrText)(\s[^>]*)?>")
+
+# Attribute values and whitespace between attributes of a tag
+attribute_pattern: re.Pattern = re.compile(r'"[^"]*"|\'[^\']*\'|\s+')
+
+# Whitespace containing a line break at the start or end of a text outside of text elements, i.e. indentation
+indentation_pattern: re.Pattern = re.compile(r"^\s*\n\s*|\s*\n\s*$")
+
+# Revision ids saved by word, they are neither needed for rendering nor for editing
+rsid_patterns: list[re.Pattern] = [
+    re.compile(r'\sw:rsid\w*="[^"]*"'),
+    re.compile(r"<w:rsids>.*?</w:rsids>|<w:rsids/>", re.DOTALL),
+    re.compile(r'<w:rsid w:val="[^"]*"/>'),
+    re.compile(r'<w:proofErr w:type="[^"]*"/>'),
+]
+
+# Run containing nothing but formatting and text
+run_pattern: re.Pattern = re.compile(r'<w:r>(?P<props><w:rPr>(?:(?!</w:rPr>).)*</w:rPr>|<w:rPr/>|)'
+                                     r'<w:t(?P<space> xml:space="preserve")?>(?P<text>[^<]*)</w:t></w:r>', re.DOTALL)
+
+# Members of the docx template, which are minified
+docx_xml_suffixes: tuple[str, ...] = (".xml", ".rels")
+
+
+@dataclass
+class BuildResult:
+    source: Path
+    target: Path
+    source_size: int
+    target_size: int
+
+
+def normalize_tag(tag: str) -> str:
+    """Collapses whitespace between the attributes of tag, attribute values are kept."""
+
+    if tag.startswith("<!--"):
+        return tag
+
+    tag = attribute_pattern.sub(lambda m: " " if m.group(0).isspace() else m.group(0), tag)
+    return tag.replace(" />", "/>").replace(" >", ">").replace(" ?>", "?>")
+
+
+def remove_indentation(text: str) -> str:
+    """Removes indentation and line breaks between tags and collapses whitespace inside tags. Text of <w:t>,
+    <w:delText> and <w:instrText> is kept unchanged, as is every text outside of them, which is not whitespace
+    around a line break."""
+
+    parts: list[str] = []
+    position: int = 0
+    in_text: bool = False
+
+    for m in tag_pattern.finditer(text):
+        between: str = text[position:m.start()]
+        parts.append(between if in_text else indentation_pattern.sub("", between))
+
+        tag: str = m.group(0)
+        parts.append(normalize_tag(tag))
+
+        if text_element_pattern.fullmatch(tag):
+            in_text = True
+
+        elif in_text and tag.startswith("</"):
+            in_text = False
+
+        position = m.end()
+
+    parts.append(indentation_pattern.sub("", text[position:]) if not in_text else text[position:])
+
+    return "".join(parts)
+
+
+def strip_rsids(text: str) -> str:
+    """Removes revision ids and proofing marks."""
+
+    for pattern in rsid_patterns:
+        text = pattern.sub("", text)
+
+    return text
+
+
+def mergeable(space: str, previous_text: str, text: str) -> bool:
+    """Tests, if the text of a run can be appended to the text of the previous run. Word drops whitespace at the
+    start and end of a text without xml:space="preserve". Such texts are only merged, if no whitespace or
+    {placeholder}, whose value may start or end with whitespace, would move from the edge into the merged text."""
+
+    return bool(space) or not (previous_text[-1:].isspace() or previous_text.endswith("}")
+                               or text[0:1].isspace() or text.startswith("{"))
+
+
+def merge_runs(text: str) -> str:
+    """Merges adjacent runs with identical formatting, which contain nothing but text. Runs are only merged, if
+    whitespace is handled the same way in both of them."""
+
+    parts: list[str] = []
+    position: int = 0
+
+    # Formatting, whitespace attribute and texts of the run being merged
+    current: tuple[str, str, list[str]] | None = None
+
+    def flush():
+        if current is not None:
+            parts.append(f"<w:r>{current[0]}<w:t{current[1]}>{''.join(current[2])}</w:t></w:r>")
+
+    for m in run_pattern.finditer(text):
+        props, space = m.group("props"), m.group("space") or ""
+
+        if (current is not None and m.start() == position and (props, space) == current[0:2]
+                and mergeable(space, current[2][-1], m.group("text"))):
+            current[2].append(m.group("text"))
+
+        else:
+            flush()
+            parts.append(text[position:m.start()])
+            current = (props, space, [m.group("text")])
+
+        position = m.end()
+
+    flush()
+    parts.append(text[position:])
+
+    return "".join(parts)
+
+
+def minify_xml(text: str) -> str:
+    """Returns text without indentation, revision ids and proofing marks, with adjacent runs of identical
+    formatting merged. The rendered document is unchanged, including all whitespace inside text elements and every
+    {placeholder}."""
+
+    return merge_runs(strip_rsids(remove_indentation(text)))
+
+
+def minify_docx(source: Path, target: Path):
+    """Writes a copy of the docx file source to target, with every xml member minified."""
+
+    with ZipFile(source, "r") as source_zip, ZipFile(target, "w", ZIP_DEFLATED) as target_zip:
+        for info in source_zip.infolist():
+            content: bytes = source_zip.read(info)
+
+            if info.filename.endswith(docx_xml_suffixes):
+                content = minify_xml(content.decode("utf-8")).encode("utf-8")
+
+            target_zip.writestr(info, content, ZIP_DEFLATED)
+
+
+def build_templates(configs: ConfigurationLoader, target_folder: Path) -> list[BuildResult]:
+    """
+    Write minified copies of every template into target_folder, keeping their file names. Point the paths in
+    config.txt to the copies to use them.
+    :param configs: ConfigurationLoader containing the paths of the templates
+    :param target_folder: Folder to write the copies to, must not be the folder of the templates
+    :return: Sizes of every template before and after minifying
+    """
+
+    results: list[BuildResult] = []
+    target_folder.mkdir(parents=True, exist_ok=True)
+
+    for name in ("document", "employer", "header", "inserts", "docx"):
+        source: Path = configs.paths[name]
+        target: Path = target_folder / source.name
+
+        if target.resolve() == source.resolve():
+            raise ValueError(f"{source} würde von sich selbst überschrieben")
+
+        temp_path: Path = target.with_name(f"~{target.name}.tmp")
+
+        try:
+            if name == "docx":
+                minify_docx(source, temp_path)
+            else:
+                temp_path.write_bytes(minify_xml(source.read_bytes().decode("utf-8")).encode("utf-8"))
+
+            os.replace(temp_path, target)
+
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+        results.append(BuildResult(source, target, source.stat().st_size, target.stat().st_size))
+
+    return results
@@ -0,0 +1,169 @@
+"""Scores questionnaires of many patients at once. Values are passed as NumPy arrays of shape (patients × items),
+corrections and numeric scores are computed with vectorized operations. Texts are built from the option tables of
+generators.scores and equal the texts of the functions scoring a single patient.
+
+Requires NumPy, which is only needed for this module."""
+
+from .scores import (midas_options, whodas_options, whodas_conclusion, afflictions, hidden_afflictions,
+                     depression_options, personality_options)
+
+from dataclasses import dataclass
+import numpy as np
+
+
+# Maximum number of days of each MIDAS item, the score covers the last 3 months
+midas_max_days: int = 92
+
+# MIDAS items as text before and after the number of days
+_midas_parts: list[tuple[str, str]] = [tuple(line.split("#", 1)) for line in midas_options]
+
+
+def _depression_points() -> np.ndarray:
+    """Returns the BDI-II points of every box of every item. Box 1 means no complaints, items with six options list
+    two options (e.g. more or less sleep) for every level of severity."""
+
+    points: np.ndarray = np.zeros((len(depression_options), max(map(len, depression_options)) + 2), dtype=np.int64)
+
+    for item, options in enumerate(depression_options):
+        points[item, 2:len(options) + 2] = np.arange(len(options)) // (len(options) // 3) + 1
+
+    return points
+
+
+# Points of every box (columns) of every BDI-II item (rows)
+depression_points: np.ndarray = _depression_points()
+
+
+@dataclass
+class ScoreBatch:
+    # Item values after correction, shape (patients × items)
+    values: np.ndarray
+
+    # Numeric score of every patient
+    scores: np.ndarray
+
+    # True for every patient, whose values were corrected
+    corrected: np.ndarray
+
+    # Generated text of every patient, still containing the gender placeholders
+    texts: list[str]
+
+
+def item_values(values, items: int, name: str, allow_sum: bool = False, boolean: bool = False) -> np.ndarray:
+    """Validates values and returns them as 2-dimensional array with one row per patient.
+    :param values: Array like of shape (patients × items), a single patient may be passed as 1-dimensional array
+    :param items: Number of items of the score
+    :param name: Name of the score, used for error messages
+    :param allow_sum: Accept and drop an additional last column containing the sum of the items
+    :param boolean: Values are checkmarks instead of non-negative integers
+    :raises ValueError: if values do not have the right shape or type
+    """
+
+    array: np.ndarray = np.asarray(values)
+
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+
+    if array.ndim != 2 or array.shape[1] not in ((items, items + 1) if allow_sum else (items,)):
+        raise ValueError(f"{name}: {items} Werte pro Patient erwartet, Form {np.shape(values)} erhalten")
+
+    array = array[:, 0:items]
+
+    if boolean:
+        if array.dtype != np.bool_ and not (np.issubdtype(array.dtype, np.integer) and np.isin(array, (0, 1)).all()):
+            raise ValueError(f"{name}: Nur Häkchen (True/False) erlaubt")
+
+        return array.astype(np.bool_)
+
+    if not np.issubdtype(array.dtype, np.integer) or (array < 0).any():
+        raise ValueError(f"{name}: Nur ganze Zahlen ab 0 erlaubt")
+
+    return array.astype(np.int64)
+
+
+def midas_scores(numbers) -> ScoreBatch:
+    """Scores the first 5 items of the MIDAS of every patient, a sum in a sixth column is ignored. Work and
+    household items are corrected as pairs, if their sum reaches 92 days, and every item is capped at 92 days."""
+
+    values: np.ndarray = item_values(numbers, len(midas_options), "MIDAS", allow_sum=True)
+    corrected: np.ndarray = np.zeros(len(values), dtype=np.bool_)
+
+    # Days with missed work or household and days with reduced productivity can not exceed 92 days together
+    for a, b in ((0, 1), (2, 3)):
+        exceeded: np.ndarray = values[:, a] + values[:, b] >= midas_max_days
+        capped: np.ndarray = np.minimum(values[:, a], midas_max_days)
+
+        values[:, a] = np.where(exceeded, capped, values[:, a])
+        values[:, b] = np.where(exceeded, midas_max_days - capped, values[:, b])
+        corrected |= exceeded
+
+    corrected |= values[:, 4] > midas_max_days
+    values[:, 4] = np.minimum(values[:, 4], midas_max_days)
+
+    scores: np.ndarray = values.sum(axis=1)
+
+    texts: list[str] = [
+        ("!!! Eingabewerte waren nicht MIDAS kompatibel, Korrektur wurde versucht !!!\n" if changed else "")
+        + f"Im MIDAS-Score erreicht {{pat_nom}} einen Wert von {score}, "
+          f"einer sehr schweren Beeinträchtigung entsprechend. "
+        + " ".join([f"{before}{nr}{after}" for (before, after), nr in zip(_midas_parts, row) if nr != 0])
+        for row, score, changed in zip(values.tolist(), scores.tolist(), corrected.tolist())]
+
+    return ScoreBatch(values, scores, corrected, texts)
+
+
+def whodas_scores(numbers) -> ScoreBatch:
+    """Scores the three day counts of the WHODAS-2.0 of every patient. The score is the sum of the days."""
+
+    values: np.ndarray = item_values(numbers, 3, "WHODAS-2.0")
+
+    texts: list[str] = [" ".join([option.replace("#", str(days))
+                                  for option, days in zip(whodas_options, row) if days > 0]) + whodas_conclusion
+                        for row in values.tolist()]
+
+    return ScoreBatch(values, values.sum(axis=1), np.zeros(len(values), dtype=np.bool_), texts)
+
+
+def affliction_scores(checks) -> ScoreBatch:
+    """Scores the self evaluation of afflictions. checks has one column per affliction, the score is the number
+    of checked afflictions."""
+
+    values: np.ndarray = item_values(checks, len(afflictions), "Beschwerden", boolean=True)
+    displayed: np.ndarray = np.array([i + 1 not in hidden_afflictions for i in range(len(afflictions))])
+
+    texts: list[str] = ["In der Selbstauskunft beschreibt {pat_nom} das häufige Auftreten von "
+                        + ", ".join([afflictions[i] for i in np.flatnonzero(row)])
+                        for row in values & displayed]
+
+    return ScoreBatch(values, values.sum(axis=1), np.zeros(len(values), dtype=np.bool_), texts)
+
+
+def depression_scores(numbers) -> ScoreBatch:
+    """Scores the simplified BDI-II. Numbers are the checked box of each item, where 1 is the first box. A sum in
+    an additional last column is ignored, as are boxes which do not exist. The score is the sum of the BDI-II
+    points of all items."""
+
+    values: np.ndarray = item_values(numbers, len(depression_options), "BDI-II", allow_sum=True)
+
+    # Boxes without an option count 0 points, their text is omitted
+    boxes: np.ndarray = np.where(values < depression_points.shape[1], values, 0)
+    scores: np.ndarray = depression_points[np.arange(len(depression_options)), boxes].sum(axis=1)
+
+    texts: list[str] = ["Es ist eine depressive Störung vorbeschrieben. Aktuell beschreibt "
+                        "{pat_nom} in der Selbstauskunft, {pron_nom} "
+                        + ", ".join([s[i - 2] for s, i in zip(depression_options, row) if 0 <= i - 2 < len(s)])
+                        for row in values.tolist()]
+
+    return ScoreBatch(values, scores, np.zeros(len(values), dtype=np.bool_), texts)
+
+
+def personality_scores(choices) -> ScoreBatch:
+    """Scores the personality statements, the score is the number of checked statements."""
+
+    values: np.ndarray = item_values(choices, len(personality_options), "Persönlichkeit", boolean=True)
+
+    texts: list[str] = ["Insgesamt gibt {pat_nom} an, "
+                        + ", ".join([personality_options[i] for i in np.flatnonzero(row)])
+                        for row in values]
+
+    return ScoreBatch(values, values.sum(axis=1), np.zeros(len(values), dtype=np.bool_), texts)
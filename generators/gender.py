@@ -29,6 +29,7 @@ class Gender:
     }
 
     def __init__(self, gender: int):
+        self.gender: int = Gender.Female if gender == Gender.Female else Gender.Male
         self.gender_dict = Gender._gender_dict_female if gender == Gender.Female else Gender._gender_dict_male
 
     def apply(self, text: str) -> str:
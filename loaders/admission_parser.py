@@ -0,0 +1,109 @@
+from pathlib import Path
+from zipfile import ZipFile
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+
+# Bytes of word/document.xml decompressed and parsed at once
+chunk_size: int = 64 * 1024
+
+
+class _AllCellsRead(Exception):
+    """Raised from inside the expat handlers to stop parsing, once every wanted cell was read."""
+
+
+class _CellReader:
+    """Expat handlers collecting the text of table cells. Text is collected as extract_text would: runs are
+    joined per paragraph, non-empty paragraphs are joined by newlines."""
+
+    def __init__(self, wanted: set[int]):
+        self.wanted: set[int] = wanted
+        self.cells: dict[int, str] = {}
+
+        # Number of cells started so far
+        self.cell_count: int = 0
+
+        # Open cells as (index, finished paragraphs, runs of the current paragraph), None for unwanted cells
+        self.open_cells: list[tuple[int, list[str], list[str]] | None] = []
+
+        # Number of open cells, whose text is collected
+        self.collecting: int = 0
+
+        self.in_text: bool = False
+
+    def start_element(self, name: str, _attributes: dict):
+        if name == "w:t":
+            self.in_text = self.collecting > 0
+
+        elif name == "w:tc":
+            if self.cell_count in self.wanted:
+                self.open_cells.append((self.cell_count, [], []))
+                self.collecting += 1
+            else:
+                self.open_cells.append(None)
+
+            self.cell_count += 1
+
+    def end_element(self, name: str):
+        if name == "w:t":
+            self.in_text = False
+
+        elif name == "w:p" and self.collecting:
+            for cell in self.open_cells:
+                if cell is not None:
+                    cell[1].append("".join(cell[2]))
+                    cell[2].clear()
+
+        elif name == "w:tc" and self.open_cells:
+            if (cell := self.open_cells.pop()) is None:
+                return
+
+            index, paragraphs, runs = cell
+            paragraphs.append("".join(runs))
+            self.cells[index] = "\n".join(filter(bool, paragraphs))
+            self.collecting -= 1
+
+            if len(self.cells) == len(self.wanted):
+                raise _AllCellsRead()
+
+    def character_data(self, data: str):
+        if not self.in_text:
+            return
+
+        # Keep text xml-escaped, as it is inserted into xml templates later
+        data = escape(data)
+
+        for cell in self.open_cells:
+            if cell is not None:
+                cell[2].append(data)
+
+
+def read_cells(admission_file: Path, wanted: set[int]) -> dict[int, str]:
+    """Reads the text of the table cells with the indices in wanted from an admission file. word/document.xml is
+    decompressed and parsed in chunks, reading stops as soon as the last wanted cell was closed. Cells are counted
+    in document order, text of nested cells is included in the text of their parent cell.
+    :param admission_file: Path to the *.docx admission file
+    :param wanted: Indices of the cells to read
+    :return: Maps cell index onto its text. Cells missing from the document are omitted.
+    """
+
+    reader: _CellReader = _CellReader(wanted)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = reader.start_element
+    parser.EndElementHandler = reader.end_element
+    parser.CharacterDataHandler = reader.character_data
+
+    with ZipFile(admission_file, "r") as zip_file:
+        with zip_file.open("word/document.xml") as docx_file:
+            try:
+                while chunk := docx_file.read(chunk_size):
+                    parser.Parse(chunk, False)
+
+                parser.Parse(b"", True)
+
+            except _AllCellsRead:
+                pass
+
+    return reader.cells
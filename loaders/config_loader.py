@@ -4,6 +4,9 @@ import re
 
 
 class ConfigurationLoader:
+    # Paths without default, they are only present in paths if configured
+    optional_paths: frozenset[str] = frozenset({"store", "ledger"})
+
     def __init__(self, config_path: Path):
         """Load paths and configurations from config_path.
         """
@@ -19,6 +22,9 @@ class ConfigurationLoader:
             "document": Path(r"./templates/document_template.xml"),
             "inserts": Path(r"./templates/insert_template.xml"),
             "employer": Path(r"./templates/employer_document_template.xml"),
+            "index": Path(r"./patient_index.json"),
+            "patients": Path(r"./patient_cache/"),
+            "drugs": Path(r"./templates/drug_dictionary.txt"),
         }
 
         # Default: prompt user for all blocks
@@ -33,6 +39,12 @@ class ConfigurationLoader:
             "f45": True
         }
 
+        # Maps docx member names onto zlib compression levels, e.g. "compression=word/document.xml:9"
+        self.compress_levels: dict[str, int] = {}
+
+        # Shared secret, which clients of --serve have to send, e.g. "token=..."
+        self.token: str | None = None
+
         # Iterate over configurations
         for m in configuration_pattern.finditer(config_path.read_text(encoding='utf-8')):
 
@@ -45,8 +57,18 @@ class ConfigurationLoader:
                 values: list[str] = [strip_fn(s) for s in value.split()]
                 self.set_blocks(values, [False] * len(values))
 
+            # Process compression levels of generated docx files
+            elif key == "compression":
+                for member in value.split():
+                    name, _, level = member.rpartition(":")
+                    self.compress_levels[name] = int(level)
+
+            # Process the token of the server
+            elif key == "token":
+                self.token = value or None
+
             # Otherwise overwrite paths
-            elif key in self.paths:
+            elif key in self.paths or key in ConfigurationLoader.optional_paths:
                 self.paths[key] = Path(value)
 
             # Notify about unknown key?
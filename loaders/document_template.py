@@ -0,0 +1,130 @@
+from pathlib import Path
+from string import Formatter
+from typing import Mapping, Iterator
+
+from generators.gender import Gender
+
+
+class TemplateError(Exception):
+    """Raised if a document template contains placeholders which can not be filled in."""
+
+
+class CompiledTemplate:
+    """Document template parsed into literal chunks and placeholder slots. Rendering only joins the chunks with the
+    values of the slots, instead of parsing the whole template text again with str.format."""
+
+    def __init__(self, text: str, source: str = "<template>"):
+        """Split text into literal chunks and placeholders, as str.format would.
+        :param text: Template text containing {placeholder} fields
+        :param source: Name of the template, used for error messages
+        :raises TemplateError: if a placeholder uses conversions, format specs or attribute access
+        """
+
+        self.source: str = source
+
+        # Literal chunks, every second one is replaced by a placeholder value
+        self.chunks: list[str] = []
+
+        # Maps index in chunks onto placeholder name
+        self.slots: list[tuple[int, str]] = []
+
+        try:
+            for literal, field_name, format_spec, conversion in Formatter().parse(text):
+                self.chunks.append(literal)
+
+                if field_name is None:
+                    continue
+
+                if format_spec or conversion or not field_name.isidentifier():
+                    raise TemplateError(f"Nicht unterstützter Platzhalter in {source}: {{{field_name}}}")
+
+                self.slots.append((len(self.chunks), field_name))
+                self.chunks.append("")
+
+        except ValueError as error:
+            raise TemplateError(f"Ungültige Schablone {source}: {error}") from error
+
+        self.fields: frozenset[str] = frozenset(name for _, name in self.slots)
+
+        # Maps Gender.Male / Gender.Female onto the variant with all gender placeholders filled in
+        self._gender_variants: dict[int, CompiledTemplate] = {}
+
+    def validate(self, known_fields: set[str] | frozenset[str]):
+        """Makes sure, every placeholder of the template will be filled in.
+        :param known_fields: Names of all values, which are available when rendering
+        :raises TemplateError: listing all unknown placeholders
+        """
+
+        if unknown := self.fields - known_fields:
+            raise TemplateError(f"Unbekannte Platzhalter in {self.source}: "
+                                + ", ".join(f"{{{name}}}" for name in sorted(unknown)))
+
+    def render(self, values: Mapping[str, object]) -> str:
+        """Fill every placeholder with its value from values and join all chunks."""
+
+        chunks: list[str] = self.chunks.copy()
+
+        for i, name in self.slots:
+            chunks[i] = str(values[name])
+
+        return "".join(chunks)
+
+    def render_chunks(self, values: Mapping[str, object]) -> Iterator[str]:
+        """Yields the chunks of render(values) one by one, so the rendered document is never held in memory."""
+
+        slots: dict[int, str] = dict(self.slots)
+
+        for i, chunk in enumerate(self.chunks):
+            yield str(values[slots[i]]) if i in slots else chunk
+
+    def bind(self, values: Mapping[str, object]) -> "CompiledTemplate":
+        """Returns a new template with the placeholders in values replaced by their values. All other placeholders
+        are kept."""
+
+        chunks: list[str] = [chunk.replace("{", "{{").replace("}", "}}") for chunk in self.chunks]
+
+        for i, name in self.slots:
+            chunks[i] = str(values[name]).replace("{", "{{").replace("}", "}}") if name in values else f"{{{name}}}"
+
+        return CompiledTemplate("".join(chunks), self.source)
+
+    def for_gender(self, gender: Gender) -> "CompiledTemplate":
+        """Returns the variant of the template with the placeholders of gender.gender_dict filled in. Each variant is
+        only rendered once."""
+
+        if (variant := self._gender_variants.get(gender.gender)) is None:
+            variant = self._gender_variants[gender.gender] = self.bind(gender.gender_dict)
+
+        return variant
+
+
+# Maps template path onto (mtime, size, compiled template)
+_compiled_templates: dict[Path, tuple[int, int, CompiledTemplate]] = {}
+
+
+def load_template(template_path: Path, known_fields: set[str] | frozenset[str] | None = None) -> CompiledTemplate:
+    """Returns the compiled template from template_path. Templates are only compiled again, if their file changed.
+    :param template_path: Path to the xml template
+    :param known_fields: If provided, the template is validated against these names
+    :raises TemplateError: if the template can not be compiled or contains unknown placeholders
+    """
+
+    stat = template_path.stat()
+    cached = _compiled_templates.get(template_path)
+
+    if cached is not None and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+        template: CompiledTemplate = cached[2]
+
+    else:
+        template = CompiledTemplate(template_path.read_bytes().decode("utf-8"), template_path.name)
+
+        # Gender text does not depend on the patient, render both variants once
+        for gender in (Gender.Male, Gender.Female):
+            template.for_gender(Gender(gender))
+
+        _compiled_templates[template_path] = (stat.st_mtime_ns, stat.st_size, template)
+
+    if known_fields is not None:
+        template.validate(known_fields)
+
+    return template
@@ -0,0 +1,256 @@
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
+from typing import BinaryIO, Iterable
+import threading
+import struct
+import zlib
+import os
+
+
+# Compression level used for members without a configured level
+default_compress_level: int = 6
+
+# Flag bit 11: file name is utf-8 encoded
+_utf8_flag: int = 0x800
+
+# Flag bit 3: sizes and crc follow the data. We always know them beforehand.
+_descriptor_flag: int = 0x8
+
+# Offset of crc, compressed and uncompressed size in the local file header
+_header_crc_offset: int = 14
+
+# Largest size or offset without ZIP64 extensions, which write_archive does not write
+_zip32_limit: int = 0xFFFFFFFF
+
+
+class ArchiveTooLargeError(ValueError):
+    """Raised, if a member or the archive needs ZIP64 extensions, i.e. is larger than 4 GiB."""
+
+
+@dataclass
+class ZipMember:
+    name: str
+    compress_type: int
+    crc: int
+    compress_size: int
+    file_size: int
+    date_time: tuple[int, int, int, int, int, int]
+    flag_bits: int
+    external_attr: int
+
+    # Already compressed content
+    data: bytes
+
+
+@dataclass
+class StreamedMember:
+    name: str
+    level: int
+
+    # Uncompressed content, compressed while writing the archive
+    chunks: Iterable[bytes]
+
+    date_time: tuple[int, int, int, int, int, int] | None = None
+
+
+def compress_member(name: str, content: bytes, level: int,
+                    date_time: tuple[int, int, int, int, int, int] | None = None) -> ZipMember:
+    """Compresses content into a ZipMember. A level of 0 stores the content uncompressed."""
+
+    if level > 0:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        data: bytes = compressor.compress(content) + compressor.flush()
+    else:
+        data = content
+
+    return ZipMember(name, ZIP_DEFLATED if level > 0 else ZIP_STORED,
+                     zlib.crc32(content), len(data), len(content),
+                     date_time or datetime.now().timetuple()[0:6],
+                     0, 0o644 << 16, data)
+
+
+class DocxSkeleton:
+    """Keeps the members of the docx template in memory, already compressed. Output files are assembled by writing
+    the skeleton members and the generated members into a new archive in a single pass."""
+
+    def __init__(self, docx_template_path: Path, compress_levels: dict[str, int] | None = None):
+        """Read all members of docx_template_path without decompressing them.
+        :param docx_template_path: Path to the docx template
+        :param compress_levels: Maps member names onto zlib compression levels (0 - 9). Skeleton members with a
+                                configured level are recompressed once, when the skeleton is loaded.
+        """
+
+        self.compress_levels: dict[str, int] = compress_levels or {}
+        self.members: list[ZipMember] = []
+
+        with ZipFile(docx_template_path, "r") as zip_file, open(docx_template_path, "rb") as raw_file:
+            for info in zip_file.infolist():
+
+                # Skip local file header to get to the compressed data
+                raw_file.seek(info.header_offset)
+                header: bytes = raw_file.read(30)
+                name_length, extra_length = struct.unpack("<2H", header[26:30])
+                raw_file.seek(name_length + extra_length, os.SEEK_CUR)
+
+                member: ZipMember = ZipMember(info.filename, info.compress_type, info.CRC,
+                                              info.compress_size, info.file_size, info.date_time,
+                                              info.flag_bits & ~_descriptor_flag, info.external_attr,
+                                              raw_file.read(info.compress_size))
+
+                if info.filename in self.compress_levels:
+                    member = compress_member(info.filename, zip_file.read(info),
+                                             self.compress_levels[info.filename], info.date_time)
+
+                self.members.append(member)
+
+    def write(self, output_path: Path, contents: dict[str, bytes | Iterable[bytes]],
+              date_time: tuple[int, int, int, int, int, int] | None = None):
+        """Write skeleton and contents as new docx file to output_path. The file is written under a temporary name
+        and renamed afterward, so output_path never contains a partially written file.
+        :param output_path: Path of the docx file to create
+        :param contents: Maps member names onto their uncompressed content. Content may also be an iterable of byte
+                         chunks, which are compressed into the archive one by one as they are produced.
+        :param date_time: Modification time of the members in contents, defaults to now
+        """
+
+        members: list[ZipMember | StreamedMember] = self.members + [
+            compress_member(name, content, self.compress_levels.get(name, default_compress_level), date_time)
+            if isinstance(content, bytes) else
+            StreamedMember(name, self.compress_levels.get(name, default_compress_level), content, date_time)
+            for name, content in contents.items()]
+
+        # Requests of the server and batch workers may write the same file at the same time
+        temp_path: Path = output_path.with_name(f"~{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        try:
+            with open(temp_path, "wb") as output_file:
+                write_archive(output_file, members)
+
+            os.replace(temp_path, output_path)
+
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+
+def _check_zip32(name: str, *sizes: int):
+    """Raises ArchiveTooLargeError, if any of sizes does not fit into the 32-bit fields of a zip archive."""
+
+    if any(size > _zip32_limit for size in sizes):
+        raise ArchiveTooLargeError(f"'{name}' ist größer als 4 GiB, ZIP64 wird nicht unterstützt")
+
+
+def _headers(member: ZipMember, offset: int = 0) -> tuple[bytes, bytes]:
+    """Returns local file header and central directory entry of member, whose local header starts at offset.
+    :raises ArchiveTooLargeError: if member or offset need ZIP64 extensions
+    """
+
+    _check_zip32(member.name, member.compress_size, member.file_size, offset)
+
+    name: bytes = member.name.encode("utf-8")
+    flag_bits: int = member.flag_bits | (_utf8_flag if not member.name.isascii() else 0)
+
+    year, month, day, hour, minute, second = member.date_time
+    dos_time: int = hour << 11 | minute << 5 | second // 2
+    dos_date: int = (year - 1980) << 9 | month << 5 | day
+
+    # Fields shared by local header and central directory
+    fields: tuple = (flag_bits, member.compress_type, dos_time, dos_date,
+                     member.crc, member.compress_size, member.file_size, len(name))
+
+    return (struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, *fields, 0) + name,
+            struct.pack("<4s6H3L5H2L", b"PK\x01\x02", 20, 20, *fields, 0, 0, 0, 0,
+                        member.external_attr, offset) + name)
+
+
+def stream_member(output_file: BinaryIO, member: StreamedMember) -> ZipMember:
+    """Compresses the chunks of member into output_file. The local header is written with empty crc and sizes
+    first, they are filled in once all chunks are written. output_file must be seekable.
+    :return: ZipMember with the final crc and sizes, but without data
+    :raises ArchiveTooLargeError: if the member is larger than 4 GiB
+    """
+
+    result: ZipMember = ZipMember(member.name, ZIP_DEFLATED if member.level > 0 else ZIP_STORED, 0, 0, 0,
+                                  member.date_time or datetime.now().timetuple()[0:6], 0, 0o644 << 16, b"")
+
+    header_offset: int = output_file.tell()
+    output_file.write(_headers(result)[0])
+
+    compressor = zlib.compressobj(member.level, zlib.DEFLATED, -15) if member.level > 0 else None
+
+    for chunk in member.chunks:
+        result.crc = zlib.crc32(chunk, result.crc)
+        result.file_size += len(chunk)
+
+        data: bytes = compressor.compress(chunk) if compressor is not None else chunk
+        result.compress_size += len(data)
+        output_file.write(data)
+
+        # Stop early, the header can not take the sizes anyway
+        _check_zip32(member.name, result.compress_size, result.file_size)
+
+    if compressor is not None:
+        data = compressor.flush()
+        result.compress_size += len(data)
+        output_file.write(data)
+
+    end_offset: int = output_file.tell()
+    output_file.seek(header_offset + _header_crc_offset)
+    output_file.write(struct.pack("<3L", result.crc, result.compress_size, result.file_size))
+    output_file.seek(end_offset)
+
+    return result
+
+
+def write_archive(output_file: BinaryIO, members: list[ZipMember | StreamedMember]):
+    """Writes members as zip archive into output_file. StreamedMembers are compressed while writing, which needs
+    output_file to be seekable. ZIP64 extensions are not written, skeleton members are copied with their original
+    headers and docx files stay far below 4 GiB.
+    :raises ArchiveTooLargeError: if a member or the archive is larger than 4 GiB, or has more than 65535 members
+    """
+
+    if len(members) > 0xFFFF:
+        raise ArchiveTooLargeError(f"{len(members)} Dateien im Archiv, ZIP64 wird nicht unterstützt")
+
+    central_directory: list[bytes] = []
+    start: int = output_file.tell()
+
+    for member in members:
+        offset: int = output_file.tell() - start
+
+        if isinstance(member, StreamedMember):
+            member = stream_member(output_file, member)
+
+        else:
+            output_file.write(_headers(member)[0])
+            output_file.write(member.data)
+
+        central_directory.append(_headers(member, offset)[1])
+
+    directory_offset: int = output_file.tell() - start
+    directory: bytes = b"".join(central_directory)
+    _check_zip32("Inhaltsverzeichnis", directory_offset, directory_offset + len(directory))
+    output_file.write(directory)
+    output_file.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0,
+                                  len(members), len(members), len(directory), directory_offset, 0))
+
+
+# Maps docx template path onto (mtime, size, compress levels, skeleton)
+_skeletons: dict[Path, tuple[int, int, dict[str, int], DocxSkeleton]] = {}
+
+
+def load_skeleton(docx_template_path: Path, compress_levels: dict[str, int] | None = None) -> DocxSkeleton:
+    """Returns the skeleton of docx_template_path. It is only read again, if the file or compress_levels changed."""
+
+    stat = docx_template_path.stat()
+    compress_levels = compress_levels or {}
+    cached = _skeletons.get(docx_template_path)
+
+    if cached is not None and cached[0:3] == (stat.st_mtime_ns, stat.st_size, compress_levels):
+        return cached[3]
+
+    skeleton: DocxSkeleton = DocxSkeleton(docx_template_path, compress_levels)
+    _skeletons[docx_template_path] = (stat.st_mtime_ns, stat.st_size, compress_levels, skeleton)
+
+    return skeleton
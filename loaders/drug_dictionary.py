@@ -0,0 +1,165 @@
+from loaders.medication import Medication
+
+from pathlib import Path
+from collections import deque
+import functools
+import threading
+import os
+
+
+def canonical_text(text: str) -> str:
+    """Returns text in lower case with every run of whitespace replaced by a single space."""
+
+    return " ".join(text.casefold().split())
+
+
+class DrugDictionary:
+    """Maps free-text medication onto canonical substances. Substances and their brand names are read from a local
+    dictionary file and compiled into an Aho-Corasick automaton, so every text is normalized in a single pass over
+    its characters, no matter how many names the dictionary contains. The automaton needs memory proportional to
+    the total length of all names.
+
+    Every line of the dictionary file lists a substance followed by its names, e.g.
+        Sumatriptan: Imigran, Sumatriptan-ratiopharm
+    The substance is always one of its own names. Names of combination products can be listed for each of their
+    substances. Lines starting with # are ignored."""
+
+    def __init__(self, text: str):
+        """
+        :param text: Content of the dictionary file
+        :raises ValueError: if a line does not contain a substance
+        """
+
+        # Maps casefolded name onto the substances it stands for, in declaration order
+        self.names: dict[str, tuple[str, ...]] = {}
+
+        for line_nr, line in enumerate(text.splitlines(), 1):
+            if not (line := line.strip()) or line.startswith("#"):
+                continue
+
+            substance, _, aliases = line.partition(":")
+            if not (substance := substance.strip()):
+                raise ValueError(f"Zeile {line_nr} des Medikamentenverzeichnisses enthält keine Substanz: {line}")
+
+            for name in [substance, *aliases.split(",")]:
+                if (key := canonical_text(name)) and substance not in self.names.get(key, ()):
+                    self.names[key] = self.names.get(key, ()) + (substance,)
+
+        # Nodes of the automaton: trie edges by character, failure link and the names ending at the node as
+        # (length, substances), longest first
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[tuple[int, tuple[str, ...]], ...]] = [()]
+
+        self._build()
+
+        # Free text repeats a lot across admission files, every distinct text is only scanned once
+        self.normalize = functools.lru_cache(maxsize=16384)(self._normalize)
+
+    def _build(self):
+        """Builds the trie of all names, then the failure links breadth first."""
+
+        for name, substances in self.names.items():
+            node: int = 0
+
+            for char in name:
+                if (child := self._goto[node].get(char)) is None:
+                    child = self._goto[node][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+
+                node = child
+
+            self._out[node] = ((len(name), substances),)
+
+        queue: deque[int] = deque(self._goto[0].values())
+
+        while queue:
+            node: int = queue.popleft()
+
+            for char, child in self._goto[node].items():
+                # Children of the root fail to the root, failure nodes are closer to the root and already linked
+                if node:
+                    self._fail[child] = self._step(self._fail[node], char)
+
+                # Names ending at the failure node are suffixes of the names ending here, so they are shorter
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def _step(self, node: int, char: str) -> int:
+        """Returns the node reached from node by char. Failure links are followed, until a node has an edge for
+        char, or the root is reached. Every link leads closer to the root, so the steps over a whole text take
+        linear time."""
+
+        while node and char not in self._goto[node]:
+            node = self._fail[node]
+
+        return self._goto[node].get(char, 0)
+
+    def matches(self, text: str) -> list[tuple[int, int, tuple[str, ...]]]:
+        """Finds all names in text, which are neither preceded nor followed by a letter or digit.
+        :return: (start, end, substances) of every name in canonical_text(text), leftmost first. Of overlapping
+            names the longest is kept.
+        """
+
+        text = canonical_text(text)
+        found: list[tuple[int, int, tuple[str, ...]]] = []
+        node: int = 0
+
+        for i, char in enumerate(text):
+            node = self._step(node, char)
+
+            if not self._out[node] or (i + 1 < len(text) and text[i + 1].isalnum()):
+                continue
+
+            for length, substances in self._out[node]:
+                start: int = i + 1 - length
+
+                if start == 0 or not text[start - 1].isalnum():
+                    # Names are found by their end, earlier names overlapping this one are replaced if shorter
+                    overlapping: int = len(found)
+                    while overlapping and found[overlapping - 1][1] > start:
+                        overlapping -= 1
+
+                    if all(end - begin < length for begin, end, _ in found[overlapping:]):
+                        del found[overlapping:]
+                        found.append((start, i + 1, substances))
+
+                    break
+
+        return found
+
+    def _normalize(self, text: str) -> tuple[str, ...]:
+        """Returns the substances named in text in order of their first occurrence, an empty tuple if the text
+        does not contain a known name."""
+
+        return tuple(dict.fromkeys(substance for _, _, substances in self.matches(text) for substance in substances))
+
+    def normalize_medication(self, medication: list[Medication] | list[str]) -> list[tuple[str, ...]]:
+        """Returns the substances of every entry of medication, as read by extract_medication_objects or
+        extract_medication_strings."""
+
+        return [self.normalize(entry if isinstance(entry, str) else entry.name) for entry in medication]
+
+
+# Maps dictionary path onto (mtime, size, dictionary)
+_dictionaries: dict[Path, tuple[int, int, DrugDictionary]] = {}
+_dictionaries_lock: threading.Lock = threading.Lock()
+
+
+def load_drug_dictionary(dictionary_path: Path) -> DrugDictionary:
+    """Returns the dictionary from dictionary_path. It is only compiled again, if its file changed."""
+
+    stat: os.stat_result = dictionary_path.stat()
+
+    with _dictionaries_lock:
+        cached = _dictionaries.get(dictionary_path)
+
+        if cached is not None and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        dictionary: DrugDictionary = DrugDictionary(dictionary_path.read_text(encoding="utf-8-sig"))
+        _dictionaries[dictionary_path] = (stat.st_mtime_ns, stat.st_size, dictionary)
+
+    return dictionary
@@ -0,0 +1,281 @@
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field
+import threading
+import sqlite3
+import hashlib
+import json
+import zlib
+import time
+import os
+
+
+@dataclass
+class Generation:
+    # File name of the generated file in the output folder
+    output: str
+
+    # "brief", "arbeitgeber", "patch", or "vorhanden" for files generated before the ledger existed
+    kind: str
+
+    # Last name, first name, birth date and admission date of the patient
+    patient: str = ""
+
+    gender: int = 0
+
+    # Values of the rendered templates, e.g. {"document": {...}, "header": {...}}, or {"inserts": {...}} for patches
+    values: dict[str, dict[str, str]] = field(default_factory=dict)
+
+    # Maps template role ("document", "header", "docx") onto the hash of the template file
+    templates: dict[str, str] = field(default_factory=dict)
+
+    compress_levels: dict[str, int] = field(default_factory=dict)
+
+    # Generation a patch was applied to
+    source: int | None = None
+
+    # Timestamp of the members in the docx file
+    date_time: tuple[int, int, int, int, int, int] = (1980, 1, 1, 0, 0, 0)
+
+    # Hash of kind, gender, values and source
+    input_hash: str = ""
+
+    # Hash of the generated members, header1.xml followed by document.xml
+    output_hash: str = ""
+
+    created: float = 0.0
+    id: int | None = None
+
+    def compute_input_hash(self) -> str:
+        self.input_hash = hashlib.sha256(json.dumps([self.kind, self.gender, self.values, self.source],
+                                                    sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return self.input_hash
+
+
+_schema: str = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    content BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    output TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    patient TEXT NOT NULL,
+    gender INTEGER NOT NULL,
+    input_values BLOB NOT NULL,
+    templates TEXT NOT NULL,
+    compress_levels TEXT NOT NULL,
+    source INTEGER REFERENCES generations (id),
+    date_time TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    output_hash TEXT NOT NULL,
+    created REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS generations_output ON generations (output, id);
+"""
+
+_columns: str = ("output, kind, patient, gender, input_values, templates, compress_levels, source, date_time, "
+                 "input_hash, output_hash, created, id")
+
+
+def file_hash(path: Path) -> str:
+    """Returns the sha256 hash of the file at path. Hashes are cached, while mtime and size are unchanged."""
+
+    stat: os.stat_result = path.stat()
+    cached = _file_hashes.get(path)
+
+    if cached is not None and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    digest: str = hashlib.sha256(path.read_bytes()).hexdigest()
+    _file_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+
+    return digest
+
+
+# Maps path onto (mtime, size, hash)
+_file_hashes: dict[Path, tuple[int, int, str]] = {}
+
+
+class GenerationLedger:
+    """SQLite database recording every generated file: patient, the values the templates were rendered with, the
+    template files and a hash of the generated content. Template files are kept once per hash, so every recorded
+    letter can be written again exactly as it was generated. Lookups only touch the local database, not the
+    output folder."""
+
+    # Increase, if the schema changes. Ledgers of other versions can not be read.
+    version: int = 1
+
+    def __init__(self, database_path: Path, output_folder: Path | None = None):
+        """
+        :param database_path: Path of the SQLite database, created if it does not exist
+        :param output_folder: Files in this folder are recorded as "vorhanden", when the database is created
+        """
+
+        self.database_path: Path = database_path
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared by the threads of the server, every access holds the lock
+        self._lock: threading.Lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(database_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+
+        version: int = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, GenerationLedger.version):
+            raise ValueError(f"{database_path} hat die Version {version}, erwartet {GenerationLedger.version}")
+
+        self.connection.executescript(_schema)
+        self.connection.execute(f"PRAGMA user_version = {GenerationLedger.version}")
+
+        if version == 0 and output_folder is not None:
+            self.adopt(output_folder)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "GenerationLedger":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def adopt(self, output_folder: Path):
+        """Records every docx file in output_folder, which is not recorded yet, as "vorhanden". Their inputs are
+        unknown, they can not be written again."""
+
+        if not output_folder.is_dir():
+            return
+
+        with os.scandir(output_folder) as scan:
+            files: list[tuple[str, float]] = [(entry.name, entry.stat().st_mtime) for entry in scan
+                                              if entry.name.endswith(".docx") and not entry.name.startswith("~")]
+
+        with self._lock, self.connection:
+            known: set[str] = {row[0] for row in self.connection.execute("SELECT DISTINCT output FROM generations")}
+
+            for name, mtime in files:
+                if name not in known:
+                    self._insert(Generation(name, "vorhanden", date_time=datetime.fromtimestamp(mtime).timetuple()[0:6],
+                                            created=mtime))
+
+    def template_hashes(self, paths: dict[str, Path]) -> dict[str, str]:
+        """Returns the hash of every template file in paths. Files, which are not stored yet, are added."""
+
+        hashes: dict[str, str] = {role: file_hash(path) for role, path in paths.items()}
+
+        with self._lock, self.connection:
+            for role, digest in hashes.items():
+                if not self.connection.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+                    self.connection.execute("INSERT OR IGNORE INTO blobs (hash, content) VALUES (?, ?)",
+                                            (digest, zlib.compress(paths[role].read_bytes(), 9)))
+
+        return hashes
+
+    def blob(self, digest: str) -> bytes:
+        """Returns the content of the stored file with hash digest.
+        :raises KeyError: if no such file is stored
+        """
+
+        with self._lock:
+            row = self.connection.execute("SELECT content FROM blobs WHERE hash = ?", (digest,)).fetchone()
+
+        if row is None:
+            raise KeyError(f"Schablone {digest} ist nicht gespeichert")
+
+        return zlib.decompress(row[0])
+
+    def latest(self, output: str) -> Generation | None:
+        """Returns the last recorded generation of the file named output, None if it was never generated."""
+
+        with self._lock:
+            row = self.connection.execute(f"SELECT {_columns} FROM generations WHERE output = ? "
+                                          f"ORDER BY id DESC LIMIT 1", (output,)).fetchone()
+
+        return self._generation(row) if row is not None else None
+
+    def get(self, generation_id: int) -> Generation | None:
+        with self._lock:
+            row = self.connection.execute(f"SELECT {_columns} FROM generations WHERE id = ?",
+                                          (generation_id,)).fetchone()
+
+        return self._generation(row) if row is not None else None
+
+    def history(self, text: str = "") -> list[Generation]:
+        """Returns all generations of files, whose name contains text, newest first."""
+
+        with self._lock:
+            rows = self.connection.execute(f"SELECT {_columns} FROM generations WHERE output LIKE ? ESCAPE '\\' "
+                                           f"ORDER BY id DESC",
+                                           ("%" + text.replace("\\", "\\\\").replace("%", "\\%")
+                                            .replace("_", "\\_") + "%",)).fetchall()
+
+        return [self._generation(row) for row in rows]
+
+    def known_gender(self, outputs: list[str]) -> int | None:
+        """Returns the gender of the last generation of any file in outputs, None if none of them was generated.
+        Files recorded as "vorhanden" are ignored, their gender is unknown."""
+
+        with self._lock:
+            row = self.connection.execute(f"SELECT gender FROM generations WHERE output IN "
+                                          f"({', '.join('?' * len(outputs))}) AND kind != 'vorhanden' "
+                                          f"ORDER BY id DESC LIMIT 1", outputs).fetchone()
+
+        return row[0] if row is not None else None
+
+    def unchanged(self, generation: Generation) -> Generation | None:
+        """Returns the last generation of the same file, if it was generated from the same inputs and templates."""
+
+        latest: Generation | None = self.latest(generation.output)
+
+        if latest is not None and (latest.kind, latest.input_hash, latest.templates, latest.compress_levels) == (
+                generation.kind, generation.input_hash, generation.templates, generation.compress_levels):
+            return latest
+
+        return None
+
+    def record(self, generation: Generation) -> int:
+        """Adds generation to the ledger and returns its id."""
+
+        generation.created = generation.created or time.time()
+
+        with self._lock, self.connection:
+            generation.id = self._insert(generation)
+
+        return generation.id
+
+    def _insert(self, generation: Generation) -> int:
+        return self.connection.execute(
+            "INSERT INTO generations (output, kind, patient, gender, input_values, templates, compress_levels, "
+            "source, date_time, input_hash, output_hash, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (generation.output, generation.kind, generation.patient, generation.gender,
+             zlib.compress(json.dumps(generation.values, ensure_ascii=False).encode("utf-8")),
+             json.dumps(generation.templates), json.dumps(generation.compress_levels), generation.source,
+             datetime(*generation.date_time).isoformat(), generation.input_hash, generation.output_hash,
+             generation.created)).lastrowid
+
+    @staticmethod
+    def _generation(row: tuple) -> Generation:
+        (output, kind, patient, gender, values, templates, compress_levels, source, date_time,
+         input_hash, output_hash, created, generation_id) = row
+
+        return Generation(output, kind, patient, gender, json.loads(zlib.decompress(values)), json.loads(templates),
+                          json.loads(compress_levels), source, datetime.fromisoformat(date_time).timetuple()[0:6],
+                          input_hash, output_hash, created, generation_id)
+
+
+# Maps database path onto the ledger opened by this process
+_ledgers: dict[Path, GenerationLedger] = {}
+_ledgers_lock: threading.Lock = threading.Lock()
+
+
+def open_ledger(database_path: Path, output_folder: Path | None = None) -> GenerationLedger:
+    """Returns the ledger at database_path. It is opened once per process and shared by all threads."""
+
+    with _ledgers_lock:
+        if (ledger := _ledgers.get(database_path)) is None:
+            ledger = _ledgers[database_path] = GenerationLedger(database_path, output_folder)
+
+    return ledger
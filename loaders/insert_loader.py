@@ -1,25 +1,182 @@
 import re
+import os
+import pickle
+import hashlib
+import functools
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from collections import OrderedDict
+from typing import Mapping
 
 
-def glob_str(pattern: str, text: str) -> bool:
+def glob_regex(pattern: str) -> re.Pattern:
     """
-    Simulates glob pattern matching using regex.
-    :param pattern: The pattern to match.
-    :param text: The text to match.
-    :return: True if the pattern matches, False otherwise.
+    Compiles a glob pattern into a regex matching at the start of a code. "?" matches at most one character,
+    "*" matches any number of characters, every other character matches itself.
+    :param pattern: The glob pattern to compile.
+    :return: The compiled regex.
     """
 
-    return re.search(pattern.replace('.', '\\.')
-                            .replace('?', '.?')
-                            .replace('*', '.*?'),
-                     text) is not None
+    return re.compile("".join(".?" if char == "?" else ".*?" if char == "*" else re.escape(char)
+                              for char in pattern))
+
+
+class GlobMatcher:
+    """Matches ICD10 codes against glob patterns. Patterns are stored in a trie by their literal prefix (the part
+    before the first wildcard), so a lookup only walks the characters of the code and tests the few patterns
+    whose prefix it passes. If several patterns match a code, they are returned in declaration order."""
+
+    def __init__(self, patterns: list[str]):
+        """
+        :param patterns: Glob patterns in declaration order, duplicates are ignored
+        """
+
+        # Unique patterns in declaration order
+        self.patterns: list[str] = list(dict.fromkeys(patterns))
+        self._regexes: list[re.Pattern] = [glob_regex(pattern) for pattern in self.patterns]
+
+        # Trie nodes map the next character onto their child, the key None onto indices of patterns ending there
+        self._trie: dict = {}
+
+        for index, pattern in enumerate(self.patterns):
+            node: dict = self._trie
+            for char in re.split(r"[*?]", pattern, maxsplit=1)[0]:
+                node = node.setdefault(char, {})
+
+            node.setdefault(None, []).append(index)
+
+        self.matches = functools.lru_cache(maxsize=4096)(self._matches)
+
+    def _matches(self, code: str) -> tuple[str, ...]:
+        """Returns all patterns matching code, in declaration order."""
+
+        candidates: list[int] = list(self._trie.get(None, ()))
+        node: dict = self._trie
+
+        for char in code:
+            if (node := node.get(char)) is None:
+                break
+
+            candidates.extend(node.get(None, ()))
+
+        return tuple(self.patterns[index] for index in sorted(candidates) if self._regexes[index].match(code))
 
 
 class XmlTemplateLoader:
-    """Loads xml templates from ./templates/insert_template.xml."""
+    """Loads xml templates from ./templates/insert_template.xml. The parsed templates are cached in a file next to
+    the xml file and only parsed again, if the xml file was changed.
+
+    The loaded data is read-only, get_inserts and apply_template never change it. One loader can be shared by
+    any number of threads."""
+
+    # Increase, if the cached attributes change
+    cache_version: int = 1
+
+    # Number of diagnosis combinations, whose inserts are kept by get_inserts
+    max_cached_inserts: int = 256
+
+    def __init__(self, insert_template_file: Path, cache_file: Path | None = None):
+        """Load templates from insert_template_file.
+        :param insert_template_file: Path to the insert template xml file
+        :param cache_file: Path to the cache file, defaults to the template path with suffix .cache
+        """
+
+        # Maps template name to text
+        self.templates: Mapping[str, str] = {}
+
+        # Maps collection_name to (insert_id, text)
+        self.collections: Mapping[str, tuple[str, str]] = {}
+
+        # Maps ICD10-number to (insert_id, text) or (collection_name, text)
+        self.inserts: Mapping[str, Mapping[str, str]] = {}
+
+        # Saves names of inserts to preprocess
+        self.preprocess_names: frozenset[str] | list[str] = []
+
+        # Save glob keys for later
+        self.pattern_keys: tuple[str, ...] | list[str] = []
+
+        self._load_cached(insert_template_file,
+                          cache_file if cache_file is not None else insert_template_file.with_suffix(".cache"))
+
+        # Freeze the loaded data, only after it was written to the cache file, as read-only views can not be pickled
+        self.templates = MappingProxyType(dict(self.templates))
+        self.collections = MappingProxyType(dict(self.collections))
+        self.inserts = MappingProxyType({for_id: MappingProxyType(dict(insert))
+                                         for for_id, insert in self.inserts.items()})
+        self.preprocess_names = frozenset(self.preprocess_names)
+        self.pattern_keys = tuple(self.pattern_keys)
+
+        # Compiled once, the matcher is not cached with the parsed templates
+        self.pattern_matcher: GlobMatcher = GlobMatcher(self.pattern_keys)
+
+        # Maps frozenset of ICD10 codes (or their tuple, if the result depends on their order) onto the result of
+        # get_inserts, least recently used first
+        self._cached_inserts: OrderedDict[frozenset[str] | tuple[str, ...], Mapping[str, str]] = OrderedDict()
+        self._cached_inserts_lock: threading.Lock = threading.Lock()
+
+        self.insert_hits: int = 0
+        self.insert_misses: int = 0
+
+    def _load_cached(self, insert_template_file: Path, cache_file: Path):
+        """Restores parsed templates from cache_file, if it matches insert_template_file. Otherwise, the xml file
+        is parsed and the cache file is rewritten."""
+
+        stat: os.stat_result = insert_template_file.stat()
+        cache: dict = {}
+
+        try:
+            with open(cache_file, "rb") as cache_stream:
+                cache = pickle.load(cache_stream)
+
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            pass
+
+        if cache.get("version") != XmlTemplateLoader.cache_version:
+            cache = {}
+
+        # Unchanged modification time and size: don't even read the xml file
+        if cache and (cache["mtime"], cache["size"]) == (stat.st_mtime_ns, stat.st_size):
+            self.__dict__.update(cache["data"])
+            return
+
+        raw_text: bytes = insert_template_file.read_bytes()
+        digest: str = hashlib.sha256(raw_text).hexdigest()
+
+        # File was touched, but not changed
+        if cache and cache["hash"] == digest:
+            self.__dict__.update(cache["data"])
+
+        else:
+            self._parse(raw_text.decode("utf-8"))
+
+        # Loaders of several threads or processes may write the cache at the same time
+        temp_file: Path = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        try:
+            with open(temp_file, "wb") as cache_stream:
+                pickle.dump({
+                    "version": XmlTemplateLoader.cache_version,
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "hash": digest,
+                    "data": {name: getattr(self, name) for name in
+                             ("templates", "collections", "inserts", "preprocess_names", "pattern_keys")}
+                }, cache_stream, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_file, cache_file)
+
+        # Caching is optional, e.g. if the templates folder is read only
+        except OSError:
+            pass
+
+        finally:
+            temp_file.unlink(missing_ok=True)
+
+    def _parse(self, full_text: str):
+        """Parse templates, collections and inserts from the text of an insert template file."""
 
-    def __init__(self, insert_template_file: Path):
         # Load templates for inserts
         insert_pattern: re.Pattern = re.compile(
             r'<insert for="(?P<for>.*?)" name="(?P<name>.*?)"(?P<prep> preprocess="true")?>(?P<text>.*?)</insert>',
@@ -32,78 +189,104 @@ class XmlTemplateLoader:
         collection_pattern: re.Pattern = re.compile(
             r'<collection for="(?P<for>.*?)" name="(?P<name>.*?)">(?P<text>.*?)</collection>', re.DOTALL)
 
-        full_text: str = insert_template_file.read_text(encoding='utf-8')
-
         # Get all templates from the file
-        self.templates: dict[str, str] = {m.group('name'): m.group('text')
-                                          for m in template_pattern.finditer(full_text)}
+        self.templates = {m.group('name'): m.group('text')
+                          for m in template_pattern.finditer(full_text)}
 
-        # Maps collection_name to (insert_id, text)
-        self.collections: dict[str, tuple[str, str]] = {m.group('for'): (m.group('name'), m.group('text'))
-                                                        for m in collection_pattern.finditer(full_text)}
+        self.collections = {m.group('for'): (m.group('name'), m.group('text'))
+                            for m in collection_pattern.finditer(full_text)}
 
-        # Maps ICD10-number to (insert_id, text) or (collection_name, text)
-        self.inserts: dict[str, dict[str, str]] = {}
-
-        # Saves names of inserts to preprocess
-        self.preprocess_names: list[str] = []
-
-        # Save glob keys for later
-        self.pattern_keys: list[str] = []
+        inserts: dict[str, dict[str, str]] = {}
+        preprocess_names: list[str] = []
+        pattern_keys: list[str] = []
 
         # Add Inserts from matches
         for m in insert_pattern.finditer(full_text):
             for_id: str = m.group('for')
-            if for_id not in self.inserts:
-                self.inserts[for_id] = {}
+            if for_id not in inserts:
+                inserts[for_id] = {}
 
-            self.inserts[for_id][m.group('name')] = m.group('text')
+            inserts[for_id][m.group('name')] = m.group('text')
 
             # Test if this match should be preprocessed
             if m.group('prep'):
-                self.preprocess_names.append(m.group('name'))
+                preprocess_names.append(m.group('name'))
 
             # Test if key is a glob pattern
-            if '*' in for_id or '?' in for_id:
-                self.pattern_keys.append(for_id)
+            if ('*' in for_id or '?' in for_id) and for_id not in pattern_keys:
+                pattern_keys.append(for_id)
 
-    def get_inserts(self, for_ids: list[str]) -> dict[str, str]:
-        """Looks for the keys for_ids in inserts and returns them as a dict mapping the template name
+        self.inserts, self.preprocess_names, self.pattern_keys = inserts, preprocess_names, pattern_keys
+
+    def get_inserts(self, for_ids: list[str]) -> Mapping[str, str]:
+        """Looks for the keys for_ids in inserts and returns them as a read-only mapping of the template name
         onto the insert string. If an insert is defined but not present in for_ids its name will also be
-        keyes in the result, but will be mapped onto an empty string."""
+        keyes in the result, but will be mapped onto an empty string.
+
+        Results are cached by the set of for_ids, most patients share a few combinations of diagnoses. If the
+        result depends on the order of for_ids, e.g. because several of them are joined into a collection, it is
+        cached by their order instead."""
+
+        codes: tuple[str, ...] = tuple(for_ids)
+        code_set: frozenset[str] = frozenset(codes)
+
+        with self._cached_inserts_lock:
+            for key in (code_set, codes):
+                if (result := self._cached_inserts.get(key)) is not None:
+                    self._cached_inserts.move_to_end(key)
+                    self.insert_hits += 1
+                    return result
+
+            self.insert_misses += 1
+
+        inserts, order_dependent = self._resolve_inserts(codes)
+        result = MappingProxyType(inserts)
+
+        with self._cached_inserts_lock:
+            self._cached_inserts[codes if order_dependent or len(code_set) != len(codes) else code_set] = result
+
+            while len(self._cached_inserts) > XmlTemplateLoader.max_cached_inserts:
+                self._cached_inserts.popitem(last=False)
+
+        return result
+
+    def _resolve_inserts(self, for_ids: tuple[str, ...]) -> tuple[dict[str, str], bool]:
+        """Computes the result of get_inserts.
+        :return: The inserts and True, if another order of for_ids might lead to a different result
+        """
 
         # Maps insert_key to text
         result: dict[str, str] = {}
 
-        # Do not change object
-        buffer: dict[str, dict[str, str]] = self.inserts.copy()
-        pattern_buffer: list[str] = self.pattern_keys.copy()
+        # Ids are removed from the buffer, once their inserts are filled in. The loaded inserts are never changed.
+        buffer: dict[str, Mapping[str, str]] = dict(self.inserts)
 
         # Maps insert_text to list of text
         collection_list: dict[str, list[str]] = {}
 
+        # Set, if an id matches a glob pattern already taken by another id, or an insert name is filled in twice
+        order_dependent: bool = False
+
         # Insert every block with a corresponding id in ids.
         for n in for_ids:
 
             # If we don't find the id in our buffer
             if n not in buffer:
 
-                # Test, if id matches a glob pattern
-                for id_i, insert_id in enumerate(pattern_buffer):
-
-                    # If id matches a pattern, add key id to buffer and remove pattern
-                    if glob_str(insert_id, n):
-                        buffer[n] = buffer.pop(insert_id)
+                # Test, if id matches a glob pattern, which was not filled in yet. The first declared pattern wins.
+                for pattern in self.pattern_matcher.matches(n):
+                    if pattern in buffer:
+                        buffer[n] = buffer.pop(pattern)
                         break
 
+                    order_dependent = True
+
                 # If id didn't match a glob pattern, continue
                 else:
                     continue
 
-                # Remove glob pattern as we filled it in
-                pattern_buffer.pop(id_i)
-
-            insert: dict[str, str] = buffer.pop(n)
+            # Copy the insert, as collection ids are removed from it
+            insert: dict[str, str] = dict(buffer.pop(n))
             insert_keys: list[str] = list(insert.keys())
 
             # Look for collection ids
@@ -113,8 +296,12 @@ class XmlTemplateLoader:
                         collection_list[k] = []
                     collection_list[k].append(insert.pop(k))
 
+            order_dependent = order_dependent or not result.keys().isdisjoint(insert)
             result.update(insert)
 
+        # Collections are joined in the order of for_ids
+        order_dependent = order_dependent or any(len(texts) > 1 for texts in collection_list.values())
+
         # For every other key only insert a comment for later patching
         result.update({key: f"<!-- insert_id: [{key}] !-->" for d in buffer.values() for key in d.keys()})
 
@@ -128,7 +315,15 @@ class XmlTemplateLoader:
             if k in self.preprocess_names:
                 result[k] = result[k].format(**result)
 
-        return result
+        return result, order_dependent
+
+    def insert_names(self) -> set[str]:
+        """Returns the names of all keys in the result of get_inserts."""
+
+        return ({name for insert in self.inserts.values() for name in insert}
+                | {insert_id for insert_id, _ in self.collections.values()})
 
     def apply_template(self, template_name: str, **kwargs) -> str:
+        """Returns the template template_name filled in with kwargs, an empty string for unknown templates."""
+
         return self.templates[template_name].format(**kwargs) if template_name in self.templates else ""
@@ -1,6 +1,3 @@
-import re
-
-
 class Medication:
     def __init__(self, name: str, amount: str = "", unit: str = "", taken: list[str] | None = None):
         self.name: str = name
@@ -25,6 +22,114 @@ class Medication:
         return f"{self.name} {self.amount}[{self.unit}]\t{'\t-\t'.join(self.taken) if self.taken else ''}"
 
 
+# Characters of names besides letters, digits and whitespace
+name_characters: frozenset[str] = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ()-")
+
+
+def is_name(char: str) -> bool:
+    return char in name_characters or char.isdecimal() or char.isspace()
+
+
+def is_dosage(char: str) -> bool:
+    return char in ",./" or char.isdecimal()
+
+
+def is_taken(char: str) -> bool:
+    return char in ",./" or char.isdecimal() or char.isspace()
+
+
+def parse_medication_line(line: str) -> tuple[str, str, str, str] | None:
+    r"""
+    Splits a line of the form
+        <name> <dosage> <unit> <0-1-1(-0)>
+    into name, dosage, unit and times taken. Finds the same parts as a search with the regex
+        ([a-zA-Z)(\d\s\-]*?)\s+([\d,./]+)\s*(.*?)\s+([\d\s,./]+(?:-[\d\s,./]+)+)
+    did, but in linear time: the line is scanned a fixed number of times, instead of backtracking over every way
+    to split it.
+    :return: name, dosage, unit and times taken, None if the line does not contain all of them
+    """
+
+    n: int = len(line)
+
+    # End of the run of whitespace, dosage or times taken characters starting at each position, n + 1 entries
+    space_end: list[int] = list(range(n + 1))
+    dosage_end: list[int] = list(range(n + 1))
+    taken_end: list[int] = list(range(n + 1))
+
+    for i in range(n - 1, -1, -1):
+        char: str = line[i]
+
+        if char.isspace():
+            space_end[i] = space_end[i + 1]
+        if is_dosage(char):
+            dosage_end[i] = dosage_end[i + 1]
+        if is_taken(char):
+            taken_end[i] = taken_end[i + 1]
+
+    # End of the times taken continuing with "-" at each position, -1 if the position does not continue them
+    taken_continued: list[int] = [-1] * (n + 1)
+
+    for i in range(n - 2, -1, -1):
+        if line[i] == "-" and is_taken(line[i + 1]):
+            end: int = taken_end[i + 1]
+            taken_continued[i] = taken_continued[end] if taken_continued[end] >= 0 else end
+
+    def taken_start(space: int) -> int:
+        """Returns the start of the times taken, which follow the whitespace at position space, -1 if there are
+        none. The whitespace is matched greedily, but may give back one character to the times taken."""
+
+        end: int = space_end[space]
+
+        if end < n and is_taken(line[end]):
+            return end if taken_continued[taken_end[end]] >= 0 else -1
+
+        return end - 1 if end - space >= 2 and taken_continued[end] >= 0 else -1
+
+    # Whitespace positions, which can precede the times taken, and the first of them at or after each position
+    next_taken: list[int] = [-1] * (n + 1)
+
+    for i in range(n - 1, -1, -1):
+        next_taken[i] = i if line[i].isspace() and taken_start(i) >= 0 else next_taken[i + 1]
+
+    last_taken: int = max((i for i in range(n) if next_taken[i] == i), default=-1)
+
+    # The name is the shortest prefix of the first run of name characters, followed by whitespace and a dosage, which
+    # is followed by times taken
+    name_start: int = 0
+
+    for space in range(n):
+        if not is_name(line[space]):
+            name_start = space + 1
+            continue
+
+        if not line[space].isspace() or (space > name_start and line[space - 1].isspace()):
+            continue
+
+        dosage_start: int = space_end[space]
+        if dosage_start < n and is_dosage(line[dosage_start]) and last_taken >= dosage_end[dosage_start]:
+            break
+
+    else:
+        return None
+
+    # The unit is as short as possible, after as much whitespace as possible
+    unit_start: int = space_end[dosage_end[dosage_start]]
+    unit_end: int = next_taken[unit_start]
+
+    if unit_end < 0:
+        unit_end = unit_start - 1
+        while next_taken[unit_end] != unit_end:
+            unit_end -= 1
+
+        unit_start = unit_end
+
+    taken: int = taken_start(unit_end)
+    end: int = taken_continued[taken_end[taken]]
+
+    return (line[name_start:space], line[dosage_start:dosage_end[dosage_start]], line[unit_start:unit_end],
+            line[taken:end])
+
+
 def extract_medication_strings(pre_match: str) -> list[str]:
     """Finds a comma separated list in lines of pre_match, ignores first line."""
 
@@ -40,14 +145,12 @@ def extract_medication_objects(pre_match: str) -> list[Medication]:
     If no match for the pattern could be matched, the whole string is saved as the name property of Medication.
     """
 
-    medication_pattern: re.Pattern = re.compile(
-        r"([a-zA-Z)(\d\s\-]*?)\s+([\d,./]+)\s*(.*?)\s+([\d\s,./]+(?:-[\d\s,./]+)+)")
     medication: list[Medication] = []
 
     for line in pre_match.splitlines()[1:]:
-        if meds := medication_pattern.search(line):
-            medication.append(Medication(meds.group(1), meds.group(2), meds.group(3),
-                                         list(map(lambda s: s.strip(), meds.group(4).split("-")))))
+        if meds := parse_medication_line(line):
+            medication.append(Medication(meds[0], meds[1], meds[2],
+                                         list(map(lambda s: s.strip(), meds[3].split("-")))))
             continue
 
         medication.append(Medication(line))
@@ -1,11 +1,11 @@
 from datetime import datetime
 import re
 from pathlib import Path
-from zipfile import ZipFile
 
 from generators.gender import Gender
 
 from .medication import Medication, extract_medication_objects, extract_medication_strings
+from .admission_parser import read_cells
 
 
 def extract_text(text: str) -> str:
@@ -62,88 +62,93 @@ class Patient:
         self.admission: datetime = datetime.now()
         self.discharge: datetime = datetime.now()
 
+    # Indices of the admission file's table cells read by load_from_file
+    admission_cells: frozenset[int] = frozenset({0, 1, 4, 8, 19, 20, 23, 25, 31, 36, 39, 42, 45, 52, 55, 58, 59})
+
     def load_from_file(self, admission_file: Path):
         """Parses admission file for information on patient. The file should be a *.docx with pre-defined
         content structure."""
 
-        # Look for table cells
-        pattern: re.Pattern = re.compile(r"<w:tc>(.*?)</w:tc>")
+        # Parse the admission file for information, reading stops after the last needed table cell
+        for i, text in sorted(read_cells(admission_file, set(Patient.admission_cells)).items()):
+            match i:
+                # First name, last Name
+                case 0:
+                    self.last_name, self.first_name = text.split(", ")[0:2]
 
-        # Parse the admission file for information
-        with ZipFile(admission_file, "r") as zip_file:
-            with zip_file.open("word/document.xml") as docx_file:
-                for i, m in enumerate(pattern.finditer(docx_file.read().decode("utf-8"))):
-                    match i:
-                        # First name, last Name
-                        case 0:
-                            self.last_name, self.first_name = extract_text(m.group(1)).split(", ")[0:2]
+                # Birth Date
+                case 1:
+                    self.birth_date = datetime.strptime(text.splitlines()[0], "%d.%m.%Y")
+                    self.update_age()
 
-                        # Birth Date
-                        case 1:
-                            self.birth_date = datetime.strptime(extract_text(m.group(1)).splitlines()[0], "%d.%m.%Y")
-                            self.age = int((datetime.now() - self.birth_date).days / 365.25)
+                # Address
+                case 4:
+                    self.address = text
 
-                        # Address
-                        case 4:
-                            self.address = extract_text(m.group(1))
+                # Occupation
+                case 8:
+                    self.occupation = text
 
-                        # Occupation
-                        case 8:
-                            self.occupation = extract_text(m.group(1))
+                # Assigned Doctor
+                case 19:
+                    self.doctor = text.replace("Arzt: ", "")
 
-                        # Assigned Doctor
-                        case 19:
-                            self.doctor = extract_text(m.group(1)).replace("Arzt: ", "")
+                # Assigned Psychologist
+                case 20:
+                    self.psychologist = text.replace("Psych.: ", "")
 
-                        # Assigned Psychologist
-                        case 20:
-                            self.psychologist = extract_text(m.group(1)).replace("Psych.: ", "")
+                # Admission Date
+                case 23:
+                    self.admission = datetime.strptime(text, "%d.%m.%Y")
 
-                        # Admission Date
-                        case 23:
-                            self.admission = datetime.strptime(extract_text(m.group(1)), "%d.%m.%Y")
+                # Discharge Date
+                case 25:
+                    self.discharge = datetime.strptime(text, "%d.%m.%Y")
 
-                        # Discharge Date
-                        case 25:
-                            self.discharge = datetime.strptime(extract_text(m.group(1)), "%d.%m.%Y")
+                # Allergies
+                case 31:
+                    self.allergies = text
 
-                        # Allergies
-                        case 31:
-                            self.allergies = extract_text(m.group(1))
+                # Pain Diagnosis, Misuse Diagnosis, Psych. Diagnosis, Phys. Diagnosis
+                case 36 | 39 | 42 | 45:
+                    self.diagnosis |= extract_diagnosis(text)
 
-                        # Pain Diagnosis, Misuse Diagnosis, Psych. Diagnosis, Phys. Diagnosis
-                        case 36 | 39 | 42 | 45:
-                            self.diagnosis |= extract_diagnosis(extract_text(m.group(1)))
+                # Current Base Medication
+                case 52:
+                    self.current_basis_medication = extract_medication_objects(text)
 
-                        # Current Base Medication
-                        case 52:
-                            self.current_basis_medication = extract_medication_objects(extract_text(m.group(1)))
+                # Current Other Medication
+                case 55:
+                    self.current_other_medication = extract_medication_objects(text)
 
-                        # Current Other Medication
-                        case 55:
-                            self.current_other_medication = extract_medication_objects(extract_text(m.group(1)))
+                # Former Acute Medication
+                case 58:
+                    self.former_acute_medication = extract_medication_strings(text)
 
-                        # Former Acute Medication
-                        case 58:
-                            self.former_acute_medication = extract_medication_strings(extract_text(m.group(1)))
+                # Former Base Medication
+                case 59:
+                    self.former_basis_medication = extract_medication_strings(text)
 
-                        # Former Base Medication
-                        case 59:
-                            self.former_basis_medication = extract_medication_strings(extract_text(m.group(1)))
+    def update_age(self):
+        """Computes the age of the patient from the birth date, as of today."""
 
-                            # We don't need anything else
-                            break
+        self.age = int((datetime.now() - self.birth_date).days / 365.25)
 
     def file_name(self) -> str:
         """Return filename from patient data"""
 
         return f"A-{self.last_name}, {self.first_name} {self.admission.strftime('%d%m%Y')}.docx"
 
+    def employer_file_name(self) -> str:
+        """Return filename of the employer note from patient data"""
+
+        return f"A-{self.last_name}, {self.first_name} Arbeitgebervorlage.docx"
+
     def get_data(self) -> dict[str, str]:
         """Return data as dictionary, used for format-strings"""
 
         return {
-            "patient_appellation": self.gender.apply(f"{{pat_appell}} {self.last_name}"),
+            "patient_appellation": f"{self.gender.gender_dict['pat_appell']} {self.last_name}",
             "patient_discharge": self.discharge.strftime('%d.%m.%Y'),
             "patient_name": f"{self.first_name} {self.last_name}",
             "patient_birthdate": self.birth_date.strftime("%d.%m.%Y"),
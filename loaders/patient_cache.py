@@ -0,0 +1,158 @@
+from loaders.patient import Patient
+from generators.gender import Gender
+
+from pathlib import Path
+from collections import OrderedDict
+import threading
+import pickle
+import hashlib
+import copy
+import os
+
+
+class PatientCache:
+    """Keeps patients parsed from admission files, so generating a letter, the employer note and a patch only parses
+    each admission file once. Entries are keyed by the path of the admission file and are only used, while its
+    modification time and size are unchanged. The least recently used entries are evicted first.
+
+    Optionally, every entry is also written to its own file in a cache folder. Entries are read from there on a
+    miss, so later runs only load the patients they need."""
+
+    # Increase, if the attributes of Patient change
+    version: int = 1
+
+    def __init__(self, max_entries: int = 256, cache_path: Path | None = None):
+        """
+        :param max_entries: Number of patients kept in memory and in the cache folder
+        :param cache_path: Folder to persist entries to, the cache is only kept in memory if omitted
+        """
+
+        self.max_entries: int = max_entries
+        self.cache_path: Path | None = cache_path
+
+        # Maps absolute admission file path onto (mtime, size, patient), least recently used first
+        self.entries: OrderedDict[str, tuple[int, int, Patient]] = OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._lock: threading.Lock = threading.Lock()
+
+    def entry_path(self, key: str) -> Path:
+        """Returns the file in the cache folder, which stores the entry of key."""
+
+        return self.cache_path / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.pickle"
+
+    def load(self, key: str) -> tuple[int, int, Patient] | None:
+        """Reads the entry of key from the cache folder. Missing or outdated files are ignored."""
+
+        if self.cache_path is None:
+            return None
+
+        try:
+            with open(self.entry_path(key), "rb") as entry_stream:
+                entry: dict = pickle.load(entry_stream)
+
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, ImportError):
+            return None
+
+        if entry.get("version") != PatientCache.version or entry.get("key") != key:
+            return None
+
+        return entry["mtime"], entry["size"], entry["patient"]
+
+    def save(self, key: str, entry: tuple[int, int, Patient]):
+        """Writes entry into the cache folder. The file is written under a temporary name and renamed afterward.
+        If the folder contains twice as many entries as kept in memory, the least recently written are removed."""
+
+        if self.cache_path is None:
+            return
+
+        entry_path: Path = self.entry_path(key)
+
+        # Worker processes of a batch may save at the same time
+        temp_path: Path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+        try:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+
+            with open(temp_path, "wb") as entry_stream:
+                pickle.dump({"version": PatientCache.version, "key": key,
+                             "mtime": entry[0], "size": entry[1], "patient": entry[2]},
+                            entry_stream, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_path, entry_path)
+
+            with os.scandir(self.cache_path) as scan:
+                files: list[os.DirEntry] = [file for file in scan if file.name.endswith(".pickle")]
+
+            if len(files) > 2 * self.max_entries:
+                files.sort(key=lambda file: file.stat().st_mtime_ns)
+
+                for file in files[0:len(files) - self.max_entries]:
+                    Path(file.path).unlink(missing_ok=True)
+
+        # Caching is optional, e.g. if the folder is read only
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+
+    def get(self, admission_file: Path, gender: Gender) -> Patient:
+        """Returns the patient parsed from admission_file. The file is only parsed, if it is not cached or changed
+        since it was cached. Every call returns a new copy, which may be changed by the caller.
+        :param admission_file: Path to the *.docx admission file
+        :param gender: Gender of the returned patient, it is not part of the admission file
+        """
+
+        stat: os.stat_result = admission_file.stat()
+        key: str = str(admission_file.absolute())
+
+        with self._lock:
+            entry: tuple[int, int, Patient] | None = self.entries.get(key)
+
+        if entry is None:
+            entry = self.load(key)
+
+        if entry is not None and entry[0:2] == (stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                self.hits += 1
+
+        else:
+            with self._lock:
+                self.misses += 1
+
+            patient: Patient = Patient(gender)
+            patient.load_from_file(admission_file)
+
+            entry = (stat.st_mtime_ns, stat.st_size, patient)
+            self.save(key, entry)
+
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        # The entry may have been parsed long before, e.g. by watch mode at admission
+        patient = copy.deepcopy(entry[2])
+        patient.gender = gender
+        patient.update_age()
+
+        return patient
+
+
+# Maps cache folder onto its PatientCache, shared by every caller in this process
+_caches: dict[Path | None, PatientCache] = {}
+
+
+def cached_patient(admission_file: Path, gender: Gender, cache_path: Path | None = None) -> Patient:
+    """Returns the patient parsed from admission_file, using the PatientCache persisted to cache_path.
+    :param admission_file: Path to the *.docx admission file
+    :param gender: Gender of the patient
+    :param cache_path: Folder of the persisted cache, usually configs.paths["patients"]
+    """
+
+    if (cache := _caches.get(cache_path)) is None:
+        cache = _caches[cache_path] = PatientCache(cache_path=cache_path)
+
+    return cache.get(admission_file, gender)
@@ -0,0 +1,181 @@
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+from operator import attrgetter
+from bisect import bisect_left
+import threading
+import json
+import os
+import re
+
+
+@dataclass
+class PatientData:
+    last_name: str
+    first_name: str
+    admission: datetime
+    docx_path: Path
+    mtime: float = 0.0
+    size: int = 0
+
+
+# Admission files are named "<last name>, <first name> <ddmmyyyy>..."
+file_name_pattern: re.Pattern = re.compile(r"(.*?), (.*?) (\d{8})")
+
+# Last names are split into their parts, so "Müller-Lüdenscheidt" can be found by "lüdenscheidt"
+name_part_pattern: re.Pattern = re.compile(r"[\s\-]+")
+
+
+def parse_file_name(file_name: str) -> tuple[str, str, datetime] | None:
+    """Extract last name, first name and admission date from the name of an admission file."""
+
+    if not (found_match := file_name_pattern.match(file_name)):
+        return None
+
+    last_name, first_name, admission = found_match.groups()
+
+    try:
+        return last_name, first_name, datetime.strptime(admission, "%d%m%Y")
+
+    except ValueError:
+        return None
+
+
+class PatientIndex:
+    """Persistent index of all admission files in a folder. The index is refreshed incrementally: Every refresh lists
+    the folder once to update modification times and sizes, but file names are only parsed for new entries.
+    Lookups are done by binary search over the sorted parts of the last names."""
+
+    version: int = 2
+
+    def __init__(self, index_path: Path, search_path: Path):
+        self.index_path: Path = index_path
+        self.search_path: Path = search_path
+
+        # Maps file name to [last name, first name, admission date ordinal, mtime, size]. PatientData objects
+        # are only created for search results, as creating paths for large folders is expensive.
+        self.entries: dict[str, list] = {}
+
+        # Sorted list of (lower case name part, file name)
+        self._keys: list[tuple[str, str]] = []
+
+    @classmethod
+    def open(cls, index_path: Path, search_path: Path, refresh: bool = True) -> "PatientIndex":
+        """Load the index from index_path, optionally bring it up-to-date with search_path and save it."""
+
+        index: PatientIndex = cls(index_path, search_path)
+        index.load()
+
+        if refresh and index.refresh():
+            index.save()
+
+        return index
+
+    def load(self):
+        """Read the index file. Indices of other versions or folders are ignored and rebuilt on refresh."""
+
+        try:
+            data: dict = json.loads(self.index_path.read_text(encoding="utf-8"))
+
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") != PatientIndex.version or data.get("folder") != str(self.search_path.absolute()):
+            return
+
+        self.entries = data["entries"]
+        self._keys = list(map(tuple, data["keys"]))
+
+    def save(self):
+        """Write the index file. A temporary file is replaced, so readers never see a partial index."""
+
+        # Watch mode and interactive sessions may save at the same time
+        temp_path: Path = self.index_path.with_name(
+            f"{self.index_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            temp_path.write_text(json.dumps({
+                "version": PatientIndex.version,
+                "folder": str(self.search_path.absolute()),
+                "entries": self.entries,
+                "keys": self._keys
+            }, ensure_ascii=False), encoding="utf-8")
+
+            os.replace(temp_path, self.index_path)
+
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def refresh(self) -> bool:
+        """Bring index up-to-date with the folder content.
+        :return: True, if the index was changed
+        """
+
+        # The folder's mtime is not used to skip the listing: Files rewritten in place do not change it, and network
+        # shares do not update it reliably
+        seen: set[str] = set()
+        added: bool = False
+        changed: bool = False
+
+        with os.scandir(self.search_path) as directory:
+            for entry in directory:
+                if not entry.name.lower().endswith(".docx") or not entry.is_file():
+                    continue
+
+                seen.add(entry.name)
+
+                # On Windows the stat result is part of the directory listing and does not need extra requests
+                stat: os.stat_result = entry.stat()
+
+                if known := self.entries.get(entry.name):
+                    if known[3:5] != [stat.st_mtime, stat.st_size]:
+                        known[3:5] = stat.st_mtime, stat.st_size
+                        changed = True
+                    continue
+
+                # Only parse new file names
+                if parsed := parse_file_name(entry.name):
+                    last_name, first_name, admission = parsed
+                    self.entries[entry.name] = [last_name, first_name, admission.toordinal(),
+                                                stat.st_mtime, stat.st_size]
+                    added = True
+
+        # Remove deleted files
+        removed: set[str] = self.entries.keys() - seen
+        for name in removed:
+            del self.entries[name]
+
+        if added or removed:
+            self._rebuild_keys()
+
+        return added or changed or bool(removed)
+
+    def search(self, patient_surname: str) -> list[PatientData]:
+        """Returns all admission files, whose last name (or a part of it) starts with patient_surname.
+        :param patient_surname: The (lower case) surname of the patient to search
+        :return: A sorted list of PatientData objects"""
+
+        patient_surname = patient_surname.strip().lower()
+        found: set[str] = set()
+
+        # All keys starting with patient_surname are consecutive in the sorted key list
+        for i in range(bisect_left(self._keys, (patient_surname, "")), len(self._keys)):
+            key, name = self._keys[i]
+            if not key.startswith(patient_surname):
+                break
+            found.add(name)
+
+        matches: list[PatientData] = [
+            PatientData(last_name, first_name, datetime.fromordinal(admission), self.search_path / name, mtime, size)
+            for name in found
+            for last_name, first_name, admission, mtime, size in (self.entries[name],)]
+        matches.sort(key=attrgetter('last_name', 'first_name', 'admission'), reverse=True)
+
+        return matches
+
+    def _rebuild_keys(self):
+        self._keys = sorted((part, name)
+                            for name, (last_name, *_) in self.entries.items()
+                            for part in {last_name.lower(), *name_part_pattern.split(last_name.lower())}
+                            if part)
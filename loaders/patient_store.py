@@ -0,0 +1,349 @@
+from loaders.patient import Patient
+from loaders.medication import Medication
+from loaders.patient_index import PatientData, parse_file_name
+from loaders.patient_cache import cached_patient
+from generators.gender import Gender
+
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+import sqlite3
+import os
+import re
+
+
+@dataclass
+class ImportResult:
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+
+    # Maps file name onto error message
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+_schema: str = """
+CREATE TABLE IF NOT EXISTS folder (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_name TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    birth_date TEXT,
+    admission TEXT,
+    discharge TEXT,
+    address TEXT,
+    occupation TEXT,
+    doctor TEXT,
+    psychologist TEXT,
+    allergies TEXT
+);
+
+CREATE INDEX IF NOT EXISTS patients_name ON patients (last_name COLLATE NOCASE, first_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS patients_admission ON patients (admission);
+CREATE INDEX IF NOT EXISTS patients_discharge ON patients (discharge);
+CREATE INDEX IF NOT EXISTS patients_doctor ON patients (doctor COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS diagnoses (
+    patient_id INTEGER NOT NULL REFERENCES patients (id) ON DELETE CASCADE,
+    icd10 TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS diagnoses_icd10 ON diagnoses (icd10, patient_id);
+CREATE INDEX IF NOT EXISTS diagnoses_patient ON diagnoses (patient_id);
+
+CREATE TABLE IF NOT EXISTS medications (
+    patient_id INTEGER NOT NULL REFERENCES patients (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    amount TEXT NOT NULL DEFAULT '',
+    unit TEXT NOT NULL DEFAULT '',
+    taken TEXT NOT NULL DEFAULT ''
+);
+
+CREATE INDEX IF NOT EXISTS medications_name ON medications (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS medications_patient ON medications (patient_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5 (
+    last_name, first_name, doctor, psychologist, diagnoses, medications,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Characters, which are not part of a search word. Everything else is quoted, so FTS5 syntax is never interpreted.
+_word_pattern: re.Pattern = re.compile(r"[^\s\-,.;:\"'()*^]+")
+
+
+def _read_patient(admission_file: Path, cache_path: Path | None) -> Patient:
+    """Parses a single admission file, runs inside a worker process. The patient is shared with letters and watch
+    mode through the patient cache in cache_path."""
+
+    return cached_patient(admission_file, Gender(Gender.Female), cache_path)
+
+
+class PatientStore:
+    """SQLite database of all admission files in a folder. Names, dates, diagnoses and medications are read with
+    Patient.load_from_file once per file and updated incrementally. Names, doctors, diagnoses and medications are
+    indexed for full text search with FTS5, dates and ICD10 codes by regular indices."""
+
+    # Increase, if the schema changes. Stores of other versions are rebuilt.
+    version: int = 1
+
+    def __init__(self, database_path: Path, cache_path: Path | None = None):
+        """
+        :param database_path: Path to the SQLite database
+        :param cache_path: Folder of the persisted patient cache, usually configs.paths["patients"]
+        """
+
+        self.database_path: Path = database_path
+        self.cache_path: Path | None = cache_path
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection: sqlite3.Connection = sqlite3.connect(database_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != PatientStore.version:
+            with self.connection:
+                for table in ("patients_fts", "medications", "diagnoses", "patients", "folder"):
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+
+        self.connection.executescript(_schema)
+        self.connection.execute(f"PRAGMA user_version = {PatientStore.version}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "PatientStore":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def import_folder(self, folder: Path, workers: int | None = None, force: bool = False) -> ImportResult:
+        """Brings the store up-to-date with the admission files in folder. Only new and changed files are parsed,
+        using a pool of worker processes. Entries of deleted files are removed.
+        :param folder: Folder containing the admission files
+        :param workers: Number of worker processes, defaults to the number of cores
+        :param force: Check every file, even if the folder was not changed since the last import
+        """
+
+        result: ImportResult = ImportResult()
+        folder_key: str = str(folder.absolute())
+        folder_mtime: float = folder.stat().st_mtime
+
+        known_mtime = self.connection.execute("SELECT mtime FROM folder WHERE path = ?", (folder_key,)).fetchone()
+
+        # Adding, removing or renaming files changes the folder's mtime. Files changed in place are found on the next
+        # import after the folder changed, or with force. The mtime is only stored, if no file failed, so failed
+        # files are retried on every import.
+        if not force and known_mtime is not None and known_mtime[0] == folder_mtime:
+            return result
+
+        known: dict[str, tuple[int, int, int]] = {
+            file: (patient_id, mtime_ns, size)
+            for patient_id, file, mtime_ns, size in self.connection.execute(
+                "SELECT id, file, mtime_ns, size FROM patients WHERE file LIKE ? ESCAPE '\\'",
+                (_like_prefix(folder_key + os.sep),))}
+
+        changed: list[tuple[Path, os.stat_result]] = []
+        seen: set[str] = set()
+
+        with os.scandir(folder) as directory:
+            for entry in directory:
+                if not entry.name.lower().endswith(".docx") or not entry.is_file() or entry.name.startswith("~$"):
+                    continue
+
+                # Only files named like admission files are imported
+                if parse_file_name(entry.name) is None:
+                    continue
+
+                file: str = os.path.join(folder_key, entry.name)
+                stat: os.stat_result = entry.stat()
+                seen.add(file)
+
+                if (stored := known.get(file)) is None or stored[1:3] != (stat.st_mtime_ns, stat.st_size):
+                    changed.append((Path(file), stat))
+
+        removed: list[str] = [file for file in known if file not in seen]
+
+        patients: list[Patient | Exception] = []
+        if changed:
+            workers = min(workers or os.cpu_count() or 1, len(changed))
+            paths: list[Path] = [path for path, _ in changed]
+
+            # Parsing a few files is faster than starting worker processes
+            if workers == 1 or len(changed) < 8:
+                patients = [_safe(_read_patient, path, self.cache_path) for path in paths]
+
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    patients = list(executor.map(_safe, [_read_patient] * len(paths), paths,
+                                                 [self.cache_path] * len(paths),
+                                                 chunksize=max(1, len(paths) // (workers * 4))))
+
+        with self.connection:
+            for file in removed:
+                self._delete(known[file][0])
+                result.removed += 1
+
+            for (path, stat), patient in zip(changed, patients):
+                if isinstance(patient, Exception):
+                    result.failed[path.name] = f"{type(patient).__name__}: {patient}"
+                    continue
+
+                if (stored := known.get(str(path))) is not None:
+                    self._delete(stored[0])
+                    result.updated += 1
+                else:
+                    result.added += 1
+
+                self._insert(path, stat, patient)
+
+            if not result.failed:
+                self.connection.execute("INSERT OR REPLACE INTO folder (path, mtime) VALUES (?, ?)",
+                                        (folder_key, folder_mtime))
+
+        return result
+
+    def _delete(self, patient_id: int):
+        self.connection.execute("DELETE FROM patients_fts WHERE rowid = ?", (patient_id,))
+        self.connection.execute("DELETE FROM patients WHERE id = ?", (patient_id,))
+
+    def _insert(self, path: Path, stat: os.stat_result, patient: Patient):
+        patient_id: int = self.connection.execute(
+            "INSERT INTO patients (file, mtime_ns, size, last_name, first_name, birth_date, admission, discharge, "
+            "address, occupation, doctor, psychologist, allergies) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(path), stat.st_mtime_ns, stat.st_size, patient.last_name, patient.first_name,
+             patient.birth_date.date().isoformat(), patient.admission.date().isoformat(),
+             patient.discharge.date().isoformat(), patient.address, patient.occupation, patient.doctor,
+             patient.psychologist, patient.allergies)).lastrowid
+
+        self.connection.executemany("INSERT INTO diagnoses (patient_id, icd10, name) VALUES (?, ?, ?)",
+                                    [(patient_id, icd10, name.strip()) for icd10, name in patient.diagnosis.items()])
+
+        medications: list[tuple[str, Medication]] = (
+            [("basis", medication) for medication in patient.current_basis_medication]
+            + [("other", medication) for medication in patient.current_other_medication]
+            + [("former_acute", Medication(name)) for name in patient.former_acute_medication]
+            + [("former_basis", Medication(name)) for name in patient.former_basis_medication])
+
+        self.connection.executemany(
+            "INSERT INTO medications (patient_id, kind, name, amount, unit, taken) VALUES (?, ?, ?, ?, ?, ?)",
+            [(patient_id, kind, medication.name.strip(), medication.amount, medication.unit,
+              "-".join(medication.taken or [])) for kind, medication in medications])
+
+        self.connection.execute(
+            "INSERT INTO patients_fts (rowid, last_name, first_name, doctor, psychologist, diagnoses, medications) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (patient_id, patient.last_name, patient.first_name, patient.doctor, patient.psychologist,
+             " ".join(f"{icd10} {name}" for icd10, name in patient.diagnosis.items()),
+             " ".join(medication.name for _, medication in medications)))
+
+    def search(self, last_name: str | None = None, name: str | None = None, text: str | None = None,
+               doctor: str | None = None,
+               icd10: str | None = None, admitted_from: datetime | None = None,
+               admitted_to: datetime | None = None, discharged_from: datetime | None = None,
+               discharged_to: datetime | None = None) -> list[PatientData]:
+        """Returns all admission files matching every given criterion, sorted like PatientIndex.search.
+        :param last_name: Words, which must start a word of the last name
+        :param name: Words, which must start a word of the last or first name
+        :param text: Words, which must start a word of the names, doctors, diagnoses or medications
+        :param doctor: Words, which must start a word of the assigned doctor or psychologist
+        :param icd10: ICD10 code of a diagnosis. A trailing * matches every code starting with the code before it.
+        :param admitted_from: First admission date to include
+        :param admitted_to: Last admission date to include
+        :param discharged_from: First discharge date to include
+        :param discharged_to: Last discharge date to include
+        """
+
+        conditions: list[str] = []
+        parameters: list = []
+
+        fts_queries: list[str] = [query for query in (
+            _fts_query(last_name, "last_name"),
+            _fts_query(name, "{last_name first_name}"),
+            _fts_query(text, ""),
+            _fts_query(doctor, "{doctor psychologist}")) if query]
+
+        if fts_queries:
+            conditions.append("patients.id IN (SELECT rowid FROM patients_fts WHERE patients_fts MATCH ?)")
+            parameters.append(" AND ".join(fts_queries))
+
+        if icd10:
+            # Prefixes are searched as range, so the index on icd10 is used
+            if icd10.endswith("*") and (prefix := icd10[:-1]):
+                conditions.append("patients.id IN (SELECT patient_id FROM diagnoses WHERE icd10 >= ? AND icd10 < ?)")
+                parameters += [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+            else:
+                conditions.append("patients.id IN (SELECT patient_id FROM diagnoses WHERE icd10 = ?)")
+                parameters.append(icd10)
+
+        if admitted_from is not None:
+            conditions.append("admission >= ?")
+            parameters.append(admitted_from.date().isoformat())
+
+        if admitted_to is not None:
+            conditions.append("admission <= ?")
+            parameters.append(admitted_to.date().isoformat())
+
+        if discharged_from is not None:
+            conditions.append("discharge >= ?")
+            parameters.append(discharged_from.date().isoformat())
+
+        if discharged_to is not None:
+            conditions.append("discharge <= ?")
+            parameters.append(discharged_to.date().isoformat())
+
+        rows = self.connection.execute(
+            "SELECT last_name, first_name, admission, file, mtime_ns, size FROM patients"
+            + (" WHERE " + " AND ".join(conditions) if conditions else "")
+            + " ORDER BY last_name DESC, first_name DESC, admission DESC", parameters)
+
+        return [PatientData(last_name, first_name, datetime.fromisoformat(admission), Path(file), mtime_ns / 1e9, size)
+                for last_name, first_name, admission, file, mtime_ns, size in rows]
+
+    def medications(self) -> list[tuple[int, str, str]]:
+        """Returns (patient id, kind, name) of every medication of every patient. Kind is "basis", "other",
+        "former_acute" or "former_basis"."""
+
+        return self.connection.execute("SELECT patient_id, kind, name FROM medications ORDER BY patient_id").fetchall()
+
+    def search_name(self, patient_surname: str) -> list[PatientData]:
+        """Returns all admission files, whose last name (or a part of it) starts with patient_surname. Replaces
+        PatientIndex.search, if the store is configured."""
+
+        return self.search(last_name=patient_surname)
+
+
+def _safe(fn, *args):
+    """Returns fn(*args), or the raised exception."""
+
+    try:
+        return fn(*args)
+
+    except Exception as error:
+        return error
+
+
+def _fts_query(words: str | None, columns: str) -> str:
+    """Builds an FTS5 query, which requires every word of words as prefix of a word in columns."""
+
+    if not words or not (tokens := _word_pattern.findall(words)):
+        return ""
+
+    return " AND ".join(f'{columns}{":" if columns else ""} "{token}"*' for token in tokens)
+
+
+def _like_prefix(prefix: str) -> str:
+    """Returns a LIKE pattern matching every string starting with prefix."""
+
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
@@ -1,10 +1,30 @@
 from loaders.config_loader import ConfigurationLoader
 from brief import generate_brief, generate_employer_note
+from batch import run_batch, run_employer_batch
+from server import serve
+from repatch import run_repatch
+from watch import watch
+from build_templates import build_templates
+from medication_report import medication_report, write_medication_report
+from template_writer import generation_ledger, reproduce_generation
+from loaders.patient_store import PatientStore
+import profiler
 
 from pathlib import Path
+from datetime import datetime
 import argparse
 
 
+def parse_date(text: str) -> datetime:
+    """Parses a date entered as dd.mm.yyyy."""
+
+    try:
+        return datetime.strptime(text, "%d.%m.%Y")
+
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ungültiges Datum '{text}', erwartet TT.MM.JJJJ")
+
+
 def log_configs(loaded_configuration: ConfigurationLoader):
     path_names: dict[str, str] = {
         "db": "Datenbank (Ordner mit Aufnahmebögen)",
@@ -13,7 +33,12 @@ def log_configs(loaded_configuration: ConfigurationLoader):
         "header": "Seiten-Header Schablone",
         "document": "Dokument-Inhalt Schablone",
         "inserts": "Einzufügende Blöcke",
-        "employer": "Schablone für Arbeitgebervorlage"
+        "employer": "Schablone für Arbeitgebervorlage",
+        "index": "Index der Aufnahmebögen",
+        "patients": "Zwischenspeicher der Aufnahmebögen",
+        "drugs": "Medikamentenverzeichnis",
+        "store": "Patientendatenbank",
+        "ledger": "Protokoll der generierten Dateien"
     }
 
     block_names: dict[str, str] = {
@@ -60,15 +85,65 @@ if __name__ == '__main__':
                         help="definiert Absätze, die beim Generieren nicht abgefragt werden. Überschreibt Argumente"
                              "von --with")
 
+    parser.add_argument("--discharged", nargs=2, type=parse_date, metavar=("VON", "BIS"),
+                        help="Schreibe mit --employer Bescheinigungen für alle Patienten, die in diesem Zeitraum "
+                             "entlassen wurden (TT.MM.JJJJ)")
+    parser.add_argument("--admitted", nargs=2, type=parse_date, metavar=("VON", "BIS"),
+                        help="Schreibe mit --employer Bescheinigungen für alle Patienten, die in diesem Zeitraum "
+                             "aufgenommen wurden (TT.MM.JJJJ)")
+    parser.add_argument("--genders", type=Path, metavar="MANIFEST",
+                        help="CSV- oder JSON-Lines-Datei mit den Spalten file oder name und gender für --discharged "
+                             "und --admitted. Sonst wird das Geschlecht aus dem Protokoll (ledger) übernommen")
+    parser.add_argument("-b", "--batch", type=Path, metavar="MANIFEST",
+                        help="Generiere Briefe ohne Abfragen für alle Zeilen einer CSV- oder JSON-Lines-Datei")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Überschreibe mit --batch bereits generierte Briefe")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Anzahl paralleler Prozesse für --batch, --employer, --repatch, --medication-report und "
+                             "--watch bzw. gleichzeitiger Anfragen für --serve (Standard: Anzahl der Prozessorkerne)")
+    parser.add_argument("--repatch", action="store_true",
+                        help="Patche alle generierten Briefe, für die neue oder veränderte Inserts vorliegen")
+    parser.add_argument("--import-store", action="store_true",
+                        help="Lies alle neuen und veränderten Aufnahmebögen in die Patientendatenbank (store) ein")
+    parser.add_argument("--build-templates", type=Path, nargs="?", const=Path("./templates/build"), metavar="ORDNER",
+                        help="Schreibe verkleinerte Kopien aller Schablonen in ORDNER (Standard: ./templates/build)")
+    parser.add_argument("--medication-report", type=Path, nargs="?",
+                        const=configs.paths["output"] / "medication_report.csv", metavar="DATEI",
+                        help="Ordne die Medikation aller Aufnahmebögen den Substanzen des Medikamentenverzeichnisses "
+                             "(drugs) zu und schreibe die Anzahl der Patienten je Substanz nach DATEI (Standard: "
+                             "medication_report.csv im Ausgabe-Ordner)")
+    parser.add_argument("--history", nargs="?", const="", metavar="NAME",
+                        help="Liste alle generierten Dateien aus dem Protokoll (ledger), deren Name NAME enthält")
+    parser.add_argument("--reproduce", type=int, metavar="ID",
+                        help="Schreibe die Datei mit der Nummer ID aus dem Protokoll erneut, exakt wie sie generiert "
+                             "wurde")
+    parser.add_argument("--profile", action="store_true",
+                        help="Schreibe die Dauer jedes Arbeitsschritts als JSON neben die generierte Datei (nur "
+                             "beim Generieren eines einzelnen Briefs oder einer Bescheinigung)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Starte einen Server, der Briefe über eine JSON-Schnittstelle generiert")
+    parser.add_argument("--watch", action="store_true",
+                        help="Überwache den db-Ordner und lies neue oder veränderte Aufnahmebögen vorab ein")
+    parser.add_argument("--interval", type=float, default=10.0,
+                        help="Sekunden zwischen zwei Durchsuchungen des db-Ordners für --watch")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Adresse des Servers. Ist sie von anderen Rechnern erreichbar, muss in config.txt ein "
+                             "Token (token=...) angegeben sein")
+    parser.add_argument("--port", type=int, default=8750, help="Port des Servers")
+
     # Parse arguments
     args = parser.parse_args()
 
-    # Generate letter to employer
-    if args.employer:
-        generate_employer_note(configs)
-        exit(0)
+    if args.profile:
+        # Only interactively generated files get a trace, the other modes would silently ignore --profile
+        if (args.batch or args.serve or args.repatch or args.watch or args.import_store or args.build_templates
+                or args.medication_report or args.history is not None or args.reproduce is not None
+                or (args.employer and (args.discharged or args.admitted))):
+            parser.error("--profile ist nur beim Generieren eines einzelnen Briefs oder einer Bescheinigung möglich")
+
+        profiler.start()
 
-    # Set Include Blocks
+    # Set Include Blocks, before dispatching, so batch runs use them as well
     if args.with_blocks:
         configs.set_blocks(args.with_blocks, [True] * len(args.with_blocks))
 
@@ -76,5 +151,135 @@ if __name__ == '__main__':
     if args.omit_blocks:
         configs.set_blocks(args.omit_blocks, [False] * len(args.omit_blocks))
 
+    # Generate letters to employer for everyone discharged or admitted in a date range
+    if args.employer and (args.discharged or args.admitted):
+        try:
+            results = run_employer_batch(configs, args.discharged, args.admitted, args.genders, args.jobs)
+
+        except ValueError as error:
+            print(error)
+            exit(1)
+
+        for result in results:
+            if not result.success:
+                print(f"\t* {result.patient}: {result.message}")
+
+        failed: int = sum(not result.success for result in results)
+        skipped: int = sum(result.success and result.message == "unverändert" for result in results)
+        print(f"{len(results) - failed - skipped} Bescheinigungen generiert, {skipped} unverändert, "
+              f"{failed} fehlgeschlagen.")
+        exit(0 if not failed else 1)
+
+    # Generate letter to employer
+    if args.employer:
+        generate_employer_note(configs)
+        exit(0)
+
+    # Keep templates loaded and generate letters on request
+    if args.serve:
+        try:
+            serve(configs, args.host, args.port, args.jobs)
+
+        except ValueError as error:
+            print(error)
+            exit(1)
+
+        exit(0)
+
+    # Pre-parse admission files, as soon as they are added to the db folder
+    if args.watch:
+        watch(configs, args.interval, args.jobs)
+        exit(0)
+
+    # Patch every letter affected by changed inserts
+    if args.repatch:
+        results = run_repatch(configs, args.jobs)
+        for result in results:
+            if result.status in ("fehler", "übersprungen"):
+                print(f"\t* {result.letter}: {result.message}")
+
+        print(f"{sum(r.status == 'gepatcht' for r in results)} Briefe gepatcht, "
+              f"{sum(r.status == 'unverändert' for r in results)} unverändert, "
+              f"{sum(r.status == 'übersprungen' for r in results)} übersprungen, "
+              f"{sum(r.status == 'fehler' for r in results)} fehlgeschlagen.")
+        exit(0)
+
+    # Write minified copies of the templates
+    if args.build_templates:
+        for result in build_templates(configs, args.build_templates):
+            print(f"\t* {result.target}: {result.source_size / 1024:.0f} KB -> {result.target_size / 1024:.0f} KB")
+
+        print("Um die verkleinerten Schablonen zu verwenden, die Pfade in config.txt anpassen.")
+        exit(0)
+
+    # Count patients per substance over all admission files
+    if args.medication_report:
+        report = medication_report(configs, args.jobs)
+        write_medication_report(args.medication_report, report)
+
+        for file_name, message in report.failed.items():
+            print(f"\t* {file_name}: {message}")
+
+        print(f"{report.patients} Patienten, {len(report.substances)} Substanzen, {sum(report.unknown.values())} "
+              f"Angaben ohne bekannte Substanz, {len(report.failed)} Aufnahmebögen fehlgeschlagen.")
+        print(f"Bericht: {args.medication_report}")
+        exit(0)
+
+    # List or reproduce recorded files
+    if args.history is not None or args.reproduce is not None:
+        if (ledger := generation_ledger(configs)) is None:
+            print("In config.txt ist kein Protokoll (ledger=...) angegeben.")
+            exit(1)
+
+        if args.reproduce is not None:
+            try:
+                print(f"Wiederhergestellt: {reproduce_generation(configs, args.reproduce)}")
+
+            except LookupError as error:
+                print(error)
+                exit(1)
+
+        else:
+            for generation in ledger.history(args.history):
+                print(f"[{generation.id}] {datetime(*generation.date_time).strftime('%d.%m.%Y %H:%M:%S')} "
+                      f"{generation.kind:<12} {generation.output}")
+
+        exit(0)
+
+    # Read every new or changed admission file into the patient store
+    if args.import_store:
+        if "store" not in configs.paths:
+            print("In config.txt ist keine Patientendatenbank (store=...) angegeben.")
+            exit(1)
+
+        with PatientStore(configs.paths["store"], configs.paths["patients"]) as store:
+            result = store.import_folder(configs.paths["db"], args.jobs, force=True)
+
+        for file_name, message in result.failed.items():
+            print(f"\t* {file_name}: {message}")
+
+        print(f"{result.added} Aufnahmebögen neu, {result.updated} aktualisiert, {result.removed} entfernt, "
+              f"{len(result.failed)} fehlgeschlagen.")
+        exit(0 if not result.failed else 1)
+
+    # Generate letters for every row of a manifest
+    if args.batch:
+        try:
+            results = run_batch(configs, args.batch, args.jobs, overwrite=args.overwrite)
+
+        except ValueError as error:
+            print(error)
+            exit(1)
+
+        for result in results:
+            if not result.success:
+                print(f"\t* {result.patient}: {result.message}")
+
+        failed: int = sum(not result.success for result in results)
+        print(f"{len(results) - failed} Briefe generiert, {failed} fehlgeschlagen.")
+        print(f"Inserts: {sum(result.inserts_cached is True for result in results)} aus dem Zwischenspeicher, "
+              f"{sum(result.inserts_cached is False for result in results)} neu zusammengestellt.")
+        exit(0 if not failed else 1)
+
     # Generate Letter
     generate_brief(configs)
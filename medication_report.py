@@ -0,0 +1,153 @@
+from loaders.config_loader import ConfigurationLoader
+from loaders.patient import Patient
+from loaders.patient_index import PatientIndex
+from loaders.patient_cache import cached_patient
+from loaders.patient_store import PatientStore
+from loaders.drug_dictionary import DrugDictionary, load_drug_dictionary
+from generators.gender import Gender
+
+from pathlib import Path
+from dataclasses import dataclass, field
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+import csv
+import os
+
+
+# Kinds of medication, as stored in the patient store, and their column names in the report
+medication_kinds: dict[str, str] = {
+    "basis": "basismedikation",
+    "other": "weitere_medikation",
+    "former_acute": "fruehere_akutmedikation",
+    "former_basis": "fruehere_basismedikation",
+}
+
+
+@dataclass
+class MedicationReport:
+    patients: int = 0
+
+    # Maps substance onto the number of patients taking it, of any kind
+    substances: Counter[str] = field(default_factory=Counter)
+
+    # Maps substance onto the number of patients taking it, per kind of medication
+    kinds: dict[str, Counter[str]] = field(default_factory=dict)
+
+    # Maps medication text without a known substance onto the number of its mentions
+    unknown: Counter[str] = field(default_factory=Counter)
+
+    # Maps file name onto error message
+    failed: dict[str, str] = field(default_factory=dict)
+
+    def add(self, dictionary: DrugDictionary, medication: list[tuple[str, str]]):
+        """Adds the (kind, text) medication of a single patient."""
+
+        self.patients += 1
+        taken: set[tuple[str, str]] = set()
+
+        for kind, text in medication:
+            if not (text := text.strip()):
+                continue
+
+            if not (substances := dictionary.normalize(text)):
+                self.unknown[text] += 1
+
+            taken.update((substance, kind) for substance in substances)
+
+        for substance, kind in taken:
+            self.kinds.setdefault(substance, Counter())[kind] += 1
+
+        self.substances.update({substance for substance, _ in taken})
+
+
+def patient_medication(patient: Patient) -> list[tuple[str, str]]:
+    """Returns (kind, text) of every current and former medication of patient."""
+
+    return ([("basis", medication.name) for medication in patient.current_basis_medication]
+            + [("other", medication.name) for medication in patient.current_other_medication]
+            + [("former_acute", name) for name in patient.former_acute_medication]
+            + [("former_basis", name) for name in patient.former_basis_medication])
+
+
+# Folder of the patient cache, set once for every worker process
+_worker_cache_path: Path | None = None
+
+
+def _init_worker(cache_path: Path):
+    global _worker_cache_path
+    _worker_cache_path = cache_path
+
+
+def read_medication(admission_file: Path) -> list[tuple[str, str]] | str:
+    """Returns the medication of an admission file, or the error message if it can not be read. Runs inside a
+    worker process."""
+
+    try:
+        return patient_medication(cached_patient(admission_file, Gender(Gender.Female), _worker_cache_path))
+
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+
+
+def medication_report(configs: ConfigurationLoader, workers: int | None = None) -> MedicationReport:
+    """
+    Normalize the medication of every admission file in the db folder to substances of the drug dictionary.
+    With a patient store, the store is brought up-to-date and the medication is read from it. Otherwise, the
+    admission files are read by a pool of worker processes through the patient cache.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param workers: Number of worker processes, defaults to the number of cores
+    :return: Number of patients per substance and medication without known substance
+    """
+
+    dictionary: DrugDictionary = load_drug_dictionary(configs.paths["drugs"])
+    report: MedicationReport = MedicationReport()
+
+    if "store" in configs.paths:
+        with PatientStore(configs.paths["store"], configs.paths["patients"]) as store:
+            report.failed = store.import_folder(configs.paths["db"], workers).failed
+
+            for _, rows in groupby(store.medications(), key=itemgetter(0)):
+                report.add(dictionary, [(kind, name) for _, kind, name in rows])
+
+            # Patients without any medication have no rows
+            report.patients = len(store.search())
+
+        return report
+
+    index: PatientIndex = PatientIndex.open(configs.paths["index"], configs.paths["db"])
+    admission_files: list[Path] = sorted(index.search_path / name for name in index.entries)
+    workers = min(workers or os.cpu_count() or 1, max(len(admission_files), 1))
+
+    # Substances are looked up in this process, so every distinct text is only normalized once
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(configs.paths["patients"],)) as executor:
+        for admission_file, medication in zip(admission_files, executor.map(
+                read_medication, admission_files, chunksize=max(1, len(admission_files) // (workers * 4)))):
+            if isinstance(medication, str):
+                report.failed[admission_file.name] = medication
+            else:
+                report.add(dictionary, medication)
+
+    return report
+
+
+def write_medication_report(report_path: Path, report: MedicationReport):
+    """Writes the substances of report as CSV file, most frequent first. Medication without a known substance is
+    written next to it, into <report>_unbekannt.csv."""
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(report_path, "w", encoding="utf-8", newline="") as report_file:
+        writer = csv.writer(report_file, delimiter=";")
+        writer.writerow(["substanz", "patienten", *medication_kinds.values()])
+
+        for substance, patients in sorted(report.substances.items(), key=lambda item: (-item[1], item[0])):
+            writer.writerow([substance, patients, *(report.kinds[substance][kind] for kind in medication_kinds)])
+
+    with open(report_path.with_stem(f"{report_path.stem}_unbekannt"), "w", encoding="utf-8",
+              newline="") as unknown_file:
+        writer = csv.writer(unknown_file, delimiter=";")
+        writer.writerow(["medikation", "nennungen"])
+        writer.writerows(report.unknown.most_common())
@@ -0,0 +1,96 @@
+from pathlib import Path
+from contextlib import nullcontext
+import json
+import time
+
+
+class _StageTimer:
+    """Context manager recording the duration of one stage into its Profiler."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler: Profiler = profiler
+        self.name: str = name
+        self.start: float = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_):
+        end: float = time.perf_counter()
+        self.profiler.stages.append({
+            "stage": self.name,
+            "start_ms": (self.start - self.profiler.start) * 1000,
+            "duration_ms": (end - self.start) * 1000
+        })
+
+
+class Profiler:
+    """Records start and duration of the stages of one letter."""
+
+    def __init__(self):
+        self.start: float = time.perf_counter()
+        self.stages: list[dict[str, str | float]] = []
+
+    def stage(self, name: str) -> _StageTimer:
+        return _StageTimer(self, name)
+
+    def total_ms(self) -> float:
+        """Returns the time spent in any stage. Nested stages and stages running at the same time, e.g. while the user
+        types, are only counted once, time between stages is not counted."""
+
+        total: float = 0.0
+        end: float = 0.0
+
+        for entry in sorted(self.stages, key=lambda stage_entry: stage_entry["start_ms"]):
+            stage_end: float = entry["start_ms"] + entry["duration_ms"]
+            total += max(0.0, stage_end - max(entry["start_ms"], end))
+            end = max(end, stage_end)
+
+        return total
+
+    def write(self, trace_path: Path):
+        """Write all recorded stages as JSON trace to trace_path, including the sum of each stage."""
+
+        totals: dict[str, float] = {}
+        for entry in self.stages:
+            totals[entry["stage"]] = totals.get(entry["stage"], 0.0) + entry["duration_ms"]
+
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        trace_path.write_text(json.dumps({
+            "total_ms": self.total_ms(),
+            "stage_totals_ms": totals,
+            "stages": self.stages
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+# Profiler of the current letter, None if profiling is disabled
+_active: Profiler | None = None
+
+# Returned by stage(), if profiling is disabled
+_disabled = nullcontext()
+
+
+def start():
+    """Enable profiling, all following stages are recorded."""
+
+    global _active
+    _active = Profiler()
+
+
+def stage(name: str) -> _StageTimer | nullcontext:
+    """Returns a context manager timing the stage name, if profiling is enabled. Otherwise, a shared no-op context
+    manager is returned."""
+
+    return _active.stage(name) if _active is not None else _disabled
+
+
+def write_trace(output_path: Path):
+    """Write the trace of the recorded stages next to output_path and start recording the next letter."""
+
+    if _active is None:
+        return
+
+    _active.write(output_path.with_suffix(".profile.json"))
+    start()
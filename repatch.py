@@ -0,0 +1,175 @@
+from loaders.patient import Patient
+from loaders.config_loader import ConfigurationLoader
+from loaders.insert_loader import XmlTemplateLoader
+from loaders.patient_index import PatientIndex, PatientData, parse_file_name
+from loaders.patient_cache import cached_patient
+from generators.gender import Gender
+from template_writer import patch_data, hook_pattern, generation_ledger
+
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import ZipFile
+from typing import Mapping
+import hashlib
+import json
+import os
+
+# Name of the file in the output folder, which stores the insert hashes of the last run
+state_file_name: str = ".insert_state.json"
+
+
+@dataclass
+class RepatchResult:
+    letter: str
+    status: str
+    message: str = ""
+
+
+def insert_hashes(templates: XmlTemplateLoader) -> dict[str, str]:
+    """Returns a hash for every insert name, covering the insert texts and the diagnoses they are defined for."""
+
+    contents: dict[str, list[str]] = {}
+
+    for for_id, insert in templates.inserts.items():
+        for name, text in insert.items():
+            contents.setdefault(name, []).append(f"{for_id}\0{text}")
+
+    for name, (insert_id, text) in templates.collections.items():
+        contents.setdefault(insert_id, []).append(f"{name}\0{text}")
+
+    return {name: hashlib.sha256("\0".join(sorted(texts)).encode("utf-8")).hexdigest()
+            for name, texts in contents.items()}
+
+
+def changed_inserts(templates: XmlTemplateLoader, state_path: Path) -> set[str]:
+    """Returns the names of all inserts, which were added or changed since the state in state_path was saved."""
+
+    try:
+        previous: dict[str, str] = json.loads(state_path.read_text(encoding="utf-8"))
+
+    except (OSError, ValueError):
+        previous = {}
+
+    return {name for name, digest in insert_hashes(templates).items() if previous.get(name) != digest}
+
+
+def generated_letters(output_path: Path) -> list[Path]:
+    """Returns all letters generated by generate_brief in output_path, without patches and employer notes."""
+
+    return sorted(path for path in output_path.glob("A-*.docx")
+                  if not path.stem.endswith(" patch") and not path.stem.endswith("Arbeitgebervorlage"))
+
+
+def letter_hooks(letter_path: Path) -> set[str]:
+    """Returns the names of all unapplied inserts in a generated letter."""
+
+    with ZipFile(letter_path, "r") as zip_file:
+        return set(hook_pattern.findall(zip_file.read("word/document.xml").decode("utf-8")))
+
+
+def find_letter_admission_file(index: PatientIndex, letter_path: Path) -> PatientData:
+    """Finds the admission file a letter was generated from. Letters are named "A-<admission file name>"."""
+
+    if not (parsed := parse_file_name(letter_path.name.removeprefix("A-"))):
+        raise ValueError("Dateiname entspricht nicht dem Format generierter Briefe")
+
+    last_name, first_name, admission = parsed
+
+    for patient_data in index.search(last_name):
+        if (patient_data.last_name, patient_data.first_name, patient_data.admission) == parsed:
+            return patient_data
+
+    raise FileNotFoundError(f"Kein Aufnahmebogen für {last_name}, {first_name} "
+                            f"{admission.strftime('%d.%m.%Y')} gefunden")
+
+
+# Loaded once for every worker process
+_worker_configs: ConfigurationLoader | None = None
+_worker_templates: XmlTemplateLoader | None = None
+_worker_index: PatientIndex | None = None
+
+
+def _init_worker(configs: ConfigurationLoader):
+    """Loads configurations, templates and the admission file index once per worker process."""
+
+    global _worker_configs, _worker_templates, _worker_index
+
+    _worker_configs = configs
+    _worker_templates = XmlTemplateLoader(configs.paths["inserts"])
+    _worker_index = PatientIndex.open(configs.paths["index"], configs.paths["db"], refresh=False)
+
+
+def repatch_letter(letter_path: Path, changed: set[str]) -> RepatchResult:
+    """Patches a single letter, if one of its hooks belongs to a changed insert which applies to the patient.
+    Letters, whose patch file already exists, are skipped, it may have been edited by hand. Runs inside a worker
+    process."""
+
+    try:
+        hooks: set[str] = letter_hooks(letter_path)
+
+        # Do not even read the admission file, if no hook can be filled in
+        if not hooks & changed:
+            return RepatchResult(letter_path.name, "unverändert")
+
+        admission_file: Path = find_letter_admission_file(_worker_index, letter_path).docx_path
+        gender: int | None = Gender.Female
+
+        # The gender is not part of the admission file, the ledger records the one of the letter. Without a ledger
+        # it is not needed, patches do not contain gendered text.
+        if (ledger := generation_ledger(_worker_configs)) is not None:
+            if (gender := ledger.known_gender([letter_path.name])) is None:
+                raise LookupError("Geschlecht unbekannt, der Brief ist nicht im Protokoll (ledger) verzeichnet")
+
+        patient: Patient = cached_patient(admission_file, Gender(gender), _worker_configs.paths["patients"])
+
+        # Only patch, if at least one changed insert is applied instead of being left as hook again
+        inserts: Mapping[str, str] = _worker_templates.get_inserts(list(patient.diagnosis.keys()))
+        if not any(hook in inserts and not hook_pattern.fullmatch(inserts[hook]) for hook in hooks & changed):
+            return RepatchResult(letter_path.name, "unverändert", "Keine neuen Inserts für die Diagnosen")
+
+        if (patch_path := letter_path.with_stem(f"{letter_path.stem} patch")).exists():
+            return RepatchResult(letter_path.name, "übersprungen",
+                                 f"'{patch_path.name}' existiert bereits und wird nicht überschrieben")
+
+        patch_data(_worker_configs, patient, _worker_templates)
+        return RepatchResult(letter_path.name, "gepatcht")
+
+    except Exception as error:
+        return RepatchResult(letter_path.name, "fehler", f"{type(error).__name__}: {error}")
+
+
+def run_repatch(configs: ConfigurationLoader, workers: int | None = None) -> list[RepatchResult]:
+    """Patches every generated letter in the output folder, which has hooks for inserts added or changed since the
+    last run, using a pool of worker processes.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param workers: Number of worker processes, defaults to the number of cores
+    :return: List of results, one per generated letter, with status "gepatcht", "unverändert", "übersprungen"
+        (patch file exists) or "fehler"
+    """
+
+    templates: XmlTemplateLoader = XmlTemplateLoader(configs.paths["inserts"])
+    state_path: Path = configs.paths["output"] / state_file_name
+    changed: set[str] = changed_inserts(templates, state_path)
+    letters: list[Path] = generated_letters(configs.paths["output"])
+
+    results: list[RepatchResult] = []
+
+    if changed and letters:
+        # Refresh the index once, before it is loaded by the workers
+        PatientIndex.open(configs.paths["index"], configs.paths["db"])
+
+        workers = min(workers or os.cpu_count() or 1, len(letters))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(configs,)) as executor:
+            results = list(executor.map(repatch_letter, letters, [changed] * len(letters),
+                                        chunksize=max(1, len(letters) // (workers * 4))))
+
+    else:
+        results = [RepatchResult(letter.name, "unverändert") for letter in letters]
+
+    # Failed and skipped letters are retried on the next run
+    if not any(result.status in ("fehler", "übersprungen") for result in results):
+        configs.paths["output"].mkdir(parents=True, exist_ok=True)
+        state_path.write_text(json.dumps(insert_hashes(templates), indent=2), encoding="utf-8")
+
+    return results
@@ -0,0 +1,243 @@
+from loaders.config_loader import ConfigurationLoader
+from loaders.insert_loader import XmlTemplateLoader
+from loaders.patient_index import PatientIndex
+from loaders.document_template import load_template, TemplateError
+from loaders.docx_skeleton import load_skeleton
+from template_writer import patch_data, write_employer_note
+from batch import load_patient, generate_letter
+
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import hmac
+import json
+import os
+
+
+class BriefService:
+    """Keeps configurations, templates, the docx skeleton and the admission file index loaded between requests.
+    Templates are reloaded, when their files change."""
+
+    def __init__(self, configs: ConfigurationLoader, max_requests: int):
+        """
+        :param configs: ConfigurationLoader containing all needed paths
+        :param max_requests: Number of requests processed at the same time
+        """
+
+        self.configs: ConfigurationLoader = configs
+        self.slots: threading.BoundedSemaphore = threading.BoundedSemaphore(max_requests)
+        self.max_requests: int = max_requests
+
+        self._lock: threading.Lock = threading.Lock()
+        self._templates: XmlTemplateLoader | None = None
+        self._templates_mtime: int = 0
+        self._index: PatientIndex | None = None
+
+        self.reload()
+
+    def reload(self):
+        """Load (or reload) all templates and the admission file index."""
+
+        with self._lock:
+            self._templates_mtime = self.configs.paths["inserts"].stat().st_mtime_ns
+            self._templates = XmlTemplateLoader(self.configs.paths["inserts"])
+            self._index = PatientIndex.open(self.configs.paths["index"], self.configs.paths["db"])
+
+        # Document templates and skeleton are cached by their modules, loading them once compiles them
+        for name in ("document", "employer", "header"):
+            load_template(self.configs.paths[name])
+
+        load_skeleton(self.configs.paths["docx"], self.configs.compress_levels)
+
+    def templates(self) -> XmlTemplateLoader:
+        """Returns the insert templates, reloaded if insert_template.xml changed."""
+
+        with self._lock:
+            if (mtime := self.configs.paths["inserts"].stat().st_mtime_ns) != self._templates_mtime:
+                self._templates = XmlTemplateLoader(self.configs.paths["inserts"])
+                self._templates_mtime = mtime
+
+            return self._templates
+
+    def index(self) -> PatientIndex:
+        """Returns the admission file index, refreshed if the db folder changed."""
+
+        with self._lock:
+            if self._index.refresh():
+                self._index.save()
+
+            return self._index
+
+    def generate(self, request: dict[str, str]) -> Path:
+        return generate_letter(self.configs, self.templates(), load_patient(self.configs, self.index(), request),
+                               request, request.get("overwrite") == "true")[0]
+
+    def patch(self, request: dict[str, str]) -> Path:
+        patch_path: Path | None = patch_data(self.configs, load_patient(self.configs, self.index(), request),
+                                             self.templates())
+
+        if patch_path is None:
+            raise FileNotFoundError("Für diesen Patienten wurde noch kein Brief generiert")
+
+        return patch_path
+
+    def employer(self, request: dict[str, str]) -> Path:
+        return write_employer_note(self.configs, load_patient(self.configs, self.index(), request))[0]
+
+
+# Addresses, which are only reachable from the same computer
+local_hosts: frozenset[str] = frozenset({"127.0.0.1", "localhost", "::1"})
+
+
+class BriefRequestHandler(BaseHTTPRequestHandler):
+    """JSON API of BriefService:
+        POST /generate, /patch, /employer: body is a JSON object with the columns of a batch manifest row. Existing
+            letters are only overwritten by /generate, if "overwrite" is true.
+        POST /reload: reload all templates
+        GET /status: number of processed requests, configured limits and hits of the insert cache
+    If the server has a token, every request has to send it as "Authorization: Bearer <token>".
+    """
+
+    server: "BriefServer"
+
+    def send_json(self, status: int, content: dict):
+        body: bytes = json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self) -> bool:
+        """Tests the token of the request and answers with 401, if it is missing or wrong."""
+
+        if self.server.token is None:
+            return True
+
+        scheme, _, token = self.headers.get("Authorization", "").partition(" ")
+
+        # Compare in constant time, so the token cannot be guessed by timing
+        if scheme == "Bearer" and hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            return True
+
+        self.send_json(401, {"error": "Anmeldung fehlgeschlagen, Token fehlt oder ist falsch"})
+        return False
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+
+        if self.path != "/status":
+            self.send_json(404, {"error": f"Unbekannter Pfad {self.path}"})
+            return
+
+        templates: XmlTemplateLoader = self.server.service.templates()
+        self.send_json(200, {"requests": self.server.request_count,
+                             "max_requests": self.server.service.max_requests,
+                             "insert_hits": templates.insert_hits,
+                             "insert_misses": templates.insert_misses})
+
+    def do_POST(self):
+        service: BriefService = self.server.service
+        actions: dict = {"/generate": service.generate, "/patch": service.patch, "/employer": service.employer}
+
+        if not self.authorized():
+            return
+
+        if self.path != "/reload" and self.path not in actions:
+            self.send_json(404, {"error": f"Unbekannter Pfad {self.path}"})
+            return
+
+        try:
+            request: dict = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("JSON-Objekt erwartet")
+
+            request = {key: "" if value is None else json.dumps(value) if isinstance(value, bool) else str(value)
+                       for key, value in request.items()}
+
+        except ValueError as error:
+            self.send_json(400, {"error": f"Ungültige Anfrage: {error}"})
+            return
+
+        # Limit the number of concurrently processed requests
+        if not service.slots.acquire(timeout=self.server.queue_timeout):
+            self.send_json(503, {"error": "Zu viele gleichzeitige Anfragen"})
+            return
+
+        try:
+            self.server.count_request()
+
+            if self.path == "/reload":
+                service.reload()
+                self.send_json(200, {"reloaded": True})
+            else:
+                self.send_json(200, {"output": str(actions[self.path](request))})
+
+        except FileExistsError as error:
+            self.send_json(409, {"error": str(error)})
+
+        except (FileNotFoundError, LookupError) as error:
+            self.send_json(404, {"error": str(error)})
+
+        except (ValueError, TemplateError) as error:
+            self.send_json(400, {"error": f"{type(error).__name__}: {error}"})
+
+        except Exception as error:
+            self.send_json(500, {"error": f"{type(error).__name__}: {error}"})
+
+        finally:
+            service.slots.release()
+
+
+class BriefServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: BriefService, queue_timeout: float = 30.0,
+                 token: str | None = None):
+        """
+        :param address: Host and port to listen on
+        :param service: Service processing the requests
+        :param queue_timeout: Seconds a request waits for a free slot, before it is answered with 503
+        :param token: Shared secret, which every request has to send. Requests are not authenticated, if None.
+        """
+
+        super().__init__(address, BriefRequestHandler)
+
+        self.service: BriefService = service
+        self.queue_timeout: float = queue_timeout
+        self.token: str | None = token
+        self.request_count: int = 0
+
+        # Requests are counted by the threads handling them
+        self._count_lock: threading.Lock = threading.Lock()
+
+    def count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+
+def serve(configs: ConfigurationLoader, host: str = "127.0.0.1", port: int = 8750, max_requests: int | None = None):
+    """Run the resident server until interrupted.
+    :param configs: ConfigurationLoader containing all needed paths and the token of the server
+    :param host: Address to listen on. Addresses reachable from other computers require a token in configs.
+    :param port: Port to listen on
+    :param max_requests: Number of requests processed at the same time, defaults to the number of cores
+    :raises ValueError: if host is not local and no token is configured
+    """
+
+    # Letters contain patient data, they must not be available to everyone in the network
+    if host not in local_hosts and configs.token is None:
+        raise ValueError(f"Für die Adresse {host} ist ein Token nötig (token=... in config.txt)")
+
+    service: BriefService = BriefService(configs, max_requests or os.cpu_count() or 1)
+
+    with BriefServer((host, port), service, token=configs.token) as server:
+        print(f"Brief-Server läuft auf http://{host}:{port} (Beenden mit Strg+C)")
+
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
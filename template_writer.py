@@ -2,11 +2,44 @@ from loaders.patient import Patient
 from loaders.medication import Medication
 from loaders.insert_loader import XmlTemplateLoader
 from loaders.config_loader import ConfigurationLoader
-from shutil import copy
+from loaders.document_template import load_template, CompiledTemplate
+from loaders.docx_skeleton import load_skeleton, DocxSkeleton
+from loaders.generation_ledger import GenerationLedger, Generation, open_ledger
+from generators.gender import Gender
 from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
 from zipfile import ZipFile
+from tempfile import TemporaryDirectory
+from typing import Iterable, Iterator, BinaryIO, Mapping
+import hashlib
+import codecs
 import re
 
+import profiler
+
+
+# Placeholders available in every document template
+patient_fields: frozenset[str] = (frozenset(Patient(Gender(Gender.Male)).get_data())
+                                  | frozenset(Gender(Gender.Male).gender_dict))
+
+# Placeholders generated from user input and admission data
+document_fields: frozenset[str] = frozenset({"midas", "whodas", "prev_treatments", "self_evaluation",
+                                             "insert_diagnoses", "base_medication", "other_medication"})
+
+# Placeholders filled in from user input, they are left open when a document is prepared
+input_fields: frozenset[str] = frozenset({"midas", "whodas", "prev_treatments", "self_evaluation",
+                                          "patient_height", "patient_weight", "patient_bloodpressure", "patient_pulse"})
+
+# Placeholders of the header template
+header_fields: frozenset[str] = frozenset({"patient_data"})
+
+# Hooks left in generated letters for inserts, which were not applied
+hook_pattern: re.Pattern = re.compile(r"<!-- insert_id: \[(.*?)] !-->")
+
+# Rendered text is encoded and compressed in chunks of about this many characters
+chunk_size: int = 64 * 1024
+
 
 def get_medication(templates: XmlTemplateLoader, medication: list[Medication]) -> str:
     """
@@ -37,27 +70,80 @@ def get_diagnoses(templates: XmlTemplateLoader, diagnoses: dict[str, str]) -> st
                     for icd10, name in diagnoses.items()])
 
 
-def create_output_file(output_path: Path, docx_template_path: Path, document_text: str, header_text: str):
+def encode_chunks(chunks: Iterable[str], size: int = chunk_size) -> Iterator[bytes]:
+    """Joins chunks into pieces of at least size characters and yields them utf-8 encoded. Only one piece is held
+    in memory at a time."""
+
+    buffer: list[str] = []
+    length: int = 0
+
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+
+        if length >= size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, length = [], 0
+
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def write_members(skeleton: DocxSkeleton, output_path: Path, document_text: str | Iterable[str], header_text: str,
+                  date_time: tuple[int, int, int, int, int, int] | None = None) -> str:
+    """
+    Write skeleton together with document.xml and header1.xml into output_path.
+    :return: sha256 hash of the generated members, header1.xml followed by document.xml
+    """
+
+    header_bytes: bytes = header_text.encode("utf-8")
+    digest = hashlib.sha256(header_bytes)
+
+    def hashed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            digest.update(chunk)
+            yield chunk
+
+    skeleton.write(output_path, {
+        "word/document.xml": hashed(encode_chunks([document_text] if isinstance(document_text, str)
+                                                  else document_text)),
+        "word/header1.xml": header_bytes,
+    }, date_time)
+
+    return digest.hexdigest()
+
+
+def create_output_file(output_path: Path, docx_template_path: Path, document_text: str | Iterable[str],
+                       header_text: str, compress_levels: dict[str, int] | None = None,
+                       date_time: tuple[int, int, int, int, int, int] | None = None) -> str:
     """
     Generate DOCX-File from templates.
     :param output_path: Path to output file
     :param docx_template_path: Path to docx template file
-    :param document_text: Text to write into word/document.xml
+    :param document_text: Text to write into word/document.xml, or its chunks as produced by
+                          CompiledTemplate.render_chunks. Chunks are compressed as they are rendered.
     :param header_text: Text to write into word/header1.xml
+    :param compress_levels: Maps member names of the docx file onto zlib compression levels
+    :param date_time: Modification time of the generated members, defaults to now
+    :return: sha256 hash of the generated members, header1.xml followed by document.xml
     """
 
     # If Output path does not exist, create it
     if not output_path.parent.exists():
         output_path.parent.mkdir()
 
-    # Copy ZIP file to output location
-    patch_path: Path = copy(docx_template_path,
-                            output_path)
+    # Write skeleton together with missing document.xml and header1.xml files in one pass
+    with profiler.stage("zip write"):
+        return write_members(load_skeleton(docx_template_path, compress_levels), output_path,
+                             document_text, header_text, date_time)
+
+
+def header_values(patient: Patient) -> dict[str, str]:
+    """Returns the values of all text fields in header1_template.xml."""
 
-    # Write missing document.xml and header1.xml files to ZIP archive
-    with ZipFile(patch_path, "a") as zip_file:
-        zip_file.writestr("word/document.xml", document_text.encode("utf-8"))
-        zip_file.writestr("word/header1.xml", header_text.encode("utf-8"))
+    return {
+        "patient_data": f"{patient.last_name}, {patient.first_name}, *{patient.birth_date.strftime('%d.%m.%Y')}",
+    }
 
 
 def generate_header(configs: ConfigurationLoader, patient: Patient) -> str:
@@ -67,16 +153,256 @@ def generate_header(configs: ConfigurationLoader, patient: Patient) -> str:
     :return: String containing xml data for docx header
     """
 
-    with open(configs.paths["header"], "rb") as xml_file:
-        return xml_file.read().decode("utf-8").format(**{
-            "patient_data": f"{patient.last_name}, {patient.first_name}, *{patient.birth_date.strftime('%d.%m.%Y')}",
-        })
+    with profiler.stage("header render"):
+        return load_template(configs.paths["header"], header_fields).render(header_values(patient))
+
+
+def generation_ledger(configs: ConfigurationLoader) -> GenerationLedger | None:
+    """Returns the ledger configured in configs, None if no ledger is configured."""
+
+    if "ledger" not in configs.paths:
+        return None
+
+    return open_ledger(configs.paths["ledger"], configs.paths["output"])
+
+
+def already_generated(configs: ConfigurationLoader, file_name: str) -> bool:
+    """Tests, if file_name was already generated. The ledger is asked first, so known letters do not need a request
+    to the (network) output folder. Only if the ledger has no entry, the output folder is checked, the file may have
+    been written by another workstation. Recorded files, which were deleted since, still count as generated."""
+
+    if (ledger := generation_ledger(configs)) is not None and ledger.latest(file_name) is not None:
+        return True
+
+    return (configs.paths["output"] / file_name).exists()
+
+
+def write_generation(configs: ConfigurationLoader, kind: str, patient: Patient, output_name: str,
+                     template_paths: dict[str, Path], values: dict[str, Mapping[str, object]],
+                     document_text: str | Iterable[str], header_text: str, source: int | None = None) -> bool:
+    """
+    Write a generated file into the output folder and record it in the ledger, if one is configured. If the ledger
+    shows the file was already generated from the same values and templates, and it still exists, nothing is
+    written. document_text is not even rendered then, if it is passed as chunks.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param kind: Kind of the file recorded in the ledger, e.g. "brief"
+    :param patient: Patient the file was generated for
+    :param output_name: File name in the output folder
+    :param template_paths: Maps "document", "header" and "docx" onto the template files used
+    :param values: Maps template roles onto the values they were rendered with, so the file can be reproduced
+    :param document_text: Text of word/document.xml or its chunks
+    :param header_text: Text of word/header1.xml
+    :param source: Id of the generation a patch was applied to
+    :return: False, if writing was skipped, because nothing changed
+    """
+
+    output_path: Path = configs.paths["output"] / output_name
+    ledger: GenerationLedger | None = generation_ledger(configs)
+    generation: Generation | None = None
+
+    if ledger is not None:
+        with profiler.stage("ledger"):
+            generation = Generation(output_name, kind,
+                                    f"{patient.last_name}, {patient.first_name}, "
+                                    f"{patient.birth_date.strftime('%d.%m.%Y')}, "
+                                    f"{patient.admission.strftime('%d.%m.%Y')}",
+                                    patient.gender.gender,
+                                    {role: {name: str(value) for name, value in role_values.items()}
+                                     for role, role_values in values.items()},
+                                    ledger.template_hashes(template_paths), configs.compress_levels, source,
+                                    datetime.now().timetuple()[0:6])
+            generation.compute_input_hash()
+
+            if ledger.unchanged(generation) and output_path.exists():
+                return False
+
+    output_hash: str = create_output_file(output_path=output_path,
+                                          docx_template_path=configs.paths["docx"],
+                                          document_text=document_text,
+                                          header_text=header_text,
+                                          compress_levels=configs.compress_levels,
+                                          date_time=generation.date_time if generation is not None else None)
+
+    if generation is not None:
+        with profiler.stage("ledger"):
+            generation.output_hash = output_hash
+            ledger.record(generation)
+
+    return True
+
+
+def reproduce_generation(configs: ConfigurationLoader, generation_id: int, output_path: Path | None = None) -> Path:
+    """
+    Write a recorded generation again, from the templates and values stored in the ledger. Letters and employer
+    notes are identical to the original file, patches are applied to the reproduced letter.
+    :param configs: ConfigurationLoader containing the path of the ledger
+    :param generation_id: Id of the generation in the ledger
+    :param output_path: Path of the reproduced file, defaults to "<name> wiederhergestellt <id>.docx" in the output
+                        folder
+    :return: Path of the reproduced file
+    :raises LookupError: if there is no ledger, or the generation can not be reproduced
+    """
+
+    if (ledger := generation_ledger(configs)) is None:
+        raise LookupError("In config.txt ist kein Protokoll (ledger=...) angegeben")
+
+    if (generation := ledger.get(generation_id)) is None:
+        raise LookupError(f"Eintrag {generation_id} existiert nicht")
+
+    if generation.kind == "patch" and generation.source is None:
+        raise LookupError(f"Eintrag {generation_id} wurde auf einen Brief ohne Eintrag angewendet")
+
+    if not generation.values:
+        raise LookupError(f"Für Eintrag {generation_id} ({generation.kind}) sind keine Eingaben gespeichert")
+
+    if output_path is None:
+        output_path = configs.paths["output"] / f"{Path(generation.output).stem} wiederhergestellt {generation_id}.docx"
+
+    with TemporaryDirectory() as temp_folder:
+        docx_path: Path = Path(temp_folder) / "template.docx"
+        docx_path.write_bytes(ledger.blob(generation.templates["docx"]))
+        skeleton: DocxSkeleton = DocxSkeleton(docx_path, generation.compress_levels)
+
+        if generation.kind == "patch":
+            letter_path: Path = reproduce_generation(configs, generation.source, Path(temp_folder) / "letter.docx")
+
+            with ZipFile(letter_path, "r") as zip_file, zip_file.open("word/document.xml") as document_xml:
+                output_hash: str = write_members(skeleton, output_path,
+                                                 fill_hooks(document_xml, generation.values["inserts"]),
+                                                 zip_file.read("word/header1.xml").decode("utf-8"),
+                                                 generation.date_time)
+
+        else:
+            document_template: CompiledTemplate = CompiledTemplate(
+                ledger.blob(generation.templates["document"]).decode("utf-8"), generation.output)
+            header_template: CompiledTemplate = CompiledTemplate(
+                ledger.blob(generation.templates["header"]).decode("utf-8"), generation.output)
+
+            output_hash = write_members(skeleton, output_path,
+                                        document_template.for_gender(Gender(generation.gender)).render_chunks(
+                                            generation.values["document"]),
+                                        header_template.render(generation.values["header"]),
+                                        generation.date_time)
+
+    if output_hash != generation.output_hash:
+        raise LookupError(f"Eintrag {generation_id} konnte nicht identisch wiederhergestellt werden")
+
+    return output_path
+
+
+def input_values(patient: Patient, midas_text: str, whodas_text: str, treatments: str,
+                 self_eval_text: str) -> dict[str, object]:
+    """Returns the values of all text fields in input_fields."""
+
+    data: dict[str, object] = patient.get_data()
+
+    return {
+        **{name: data[name] for name in input_fields if name in data},
+
+        "midas": patient.gender.apply(midas_text),
+        "whodas": patient.gender.apply(whodas_text),
+        "prev_treatments": patient.gender.apply(treatments),
+        "self_evaluation": patient.gender.apply(self_eval_text),
+    }
+
+
+def document_values(templates: XmlTemplateLoader, patient: Patient,
+                    midas_text: str, whodas_text: str,
+                    treatments: str,
+                    self_eval_text: str) -> dict[str, object]:
+    """Returns the values of all text fields in document_template.xml, except the gender placeholders. Those are
+    filled in by CompiledTemplate.for_gender."""
+
+    return {
+        **patient.get_data(),
+
+        **input_values(patient, midas_text, whodas_text, treatments, self_eval_text),
+
+        "insert_diagnoses": get_diagnoses(templates, patient.diagnosis),
+
+        **templates.get_inserts(list(patient.diagnosis.keys())),
+
+        'base_medication': get_medication(templates, patient.current_basis_medication),
+        'other_medication': get_medication(templates, patient.current_other_medication)
+    }
+
+
+@dataclass
+class PreparedDocument:
+    output_path: Path
+
+    # Document template with every placeholder filled in, except input_fields
+    template: CompiledTemplate
+
+    # Values bound into template
+    values: dict[str, object]
+
+    header_text: str
+
+
+def prepare_document(configs: ConfigurationLoader, patient: Patient,
+                     templates: XmlTemplateLoader | None = None) -> PreparedDocument:
+    """
+    Load templates and render everything, which only depends on the admission file: inserts, diagnoses, medication,
+    patient data and the header. Only the placeholders in input_fields are left to fill in by finish_document.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param patient: Patient object with loaded data
+    :param templates: Already loaded XmlTemplateLoader, will be loaded from configs if omitted
+    """
+
+    with profiler.stage("template load"):
+        # Load templates and inserts, if they were not provided
+        if templates is None:
+            templates = XmlTemplateLoader(configs.paths["inserts"])
+
+        # Compiling the template makes sure, every text field is known before rendering
+        document_template = load_template(configs.paths["document"],
+                                          patient_fields | document_fields | templates.insert_names())
+
+        # Read the docx template now, so writing the file only compresses the generated parts
+        load_skeleton(configs.paths["docx"], configs.compress_levels)
+
+    with profiler.stage("prepare"):
+        values: dict[str, object] = document_values(templates, patient, "", "", "", "")
+        template: CompiledTemplate = document_template.for_gender(patient.gender).bind(
+            {name: value for name, value in values.items() if name not in input_fields})
+
+    return PreparedDocument(configs.paths["output"] / patient.file_name(), template, values,
+                            generate_header(configs, patient))
+
+
+def finish_document(configs: ConfigurationLoader, prepared: PreparedDocument, patient: Patient,
+                    midas_text: str, whodas_text: str,
+                    treatments: str,
+                    self_eval_text: str) -> bool:
+    """
+    Fill in the user input and write the prepared document.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param prepared: Result of prepare_document for patient
+    :param patient: Patient object, including the body data entered by the user
+    :param midas_text: Text to write into {midas} block
+    :param whodas_text: Text to write into {whodas} block
+    :param treatments: Text to write into {prev_treatments} block
+    :param self_eval_text: Text to write into {self_eval_text} block
+    :return: False, if the ledger shows the letter was already generated from the same values
+    """
+
+    with profiler.stage("format"):
+        values: dict[str, object] = input_values(patient, midas_text, whodas_text, treatments, self_eval_text)
+
+    # Write data, the document is rendered while it is compressed
+    return write_generation(configs, "brief", patient, prepared.output_path.name,
+                            {"document": configs.paths["document"], "header": configs.paths["header"],
+                             "docx": configs.paths["docx"]},
+                            {"document": {**prepared.values, **values}, "header": header_values(patient)},
+                            prepared.template.render_chunks(values), prepared.header_text)
 
 
 def write_data(configs: ConfigurationLoader, patient: Patient,
                midas_text: str, whodas_text: str,
                treatments: str,
-               self_eval_text: str):
+               self_eval_text: str,
+               templates: XmlTemplateLoader | None = None) -> bool:
     """
     Insert template string into document_template.xml, generate docx
     :param configs: ConfigurationLoader containing all needed paths
@@ -85,94 +411,129 @@ def write_data(configs: ConfigurationLoader, patient: Patient,
     :param whodas_text: Text to write into {whodas} block
     :param treatments: Text to write into {prev_treatments} block
     :param self_eval_text: Text to write into {self_eval_text} block
+    :param templates: Already loaded XmlTemplateLoader, will be loaded from configs if omitted
+    :return: False, if the ledger shows the letter was already generated from the same values
     """
 
-    # Load templates and inserts
-    templates: XmlTemplateLoader = XmlTemplateLoader(configs.paths["inserts"])
+    with profiler.stage("template load"):
+        # Load templates and inserts, if they were not provided
+        if templates is None:
+            templates = XmlTemplateLoader(configs.paths["inserts"])
+
+        # Compiling the template makes sure, every text field is known before rendering
+        document_template = load_template(configs.paths["document"],
+                                          patient_fields | document_fields | templates.insert_names())
+
+    with profiler.stage("format"):
+        values: dict[str, object] = document_values(templates, patient, midas_text, whodas_text, treatments,
+                                                    self_eval_text)
+
+    # Write data, the document is rendered while it is compressed
+    return write_generation(configs, "brief", patient, patient.file_name(),
+                            {"document": configs.paths["document"], "header": configs.paths["header"],
+                             "docx": configs.paths["docx"]},
+                            {"document": values, "header": header_values(patient)},
+                            document_template.for_gender(patient.gender).render_chunks(values),
+                            generate_header(configs, patient))
 
-    # Read the document text from document template, insert text fields
-    with open(configs.paths["document"], "rb") as xml_file:
-        document_text: str = xml_file.read().decode("utf-8").format(**{
-            **patient.get_data(),
 
-            "midas": patient.gender.apply(midas_text),
-            "whodas": patient.gender.apply(whodas_text),
-            "prev_treatments": patient.gender.apply(treatments),
-            "self_evaluation": patient.gender.apply(self_eval_text),
+def fill_hooks(document_xml: BinaryIO, inserts: Mapping[str, str], size: int = chunk_size) -> Iterator[str]:
+    """
+    Reads document_xml in chunks and yields its text with every insert hook replaced by its insert.
+    Hooks without an insert are kept.
+    :param document_xml: Stream of utf-8 encoded xml
+    :param inserts: Maps insert names onto their text, as returned by XmlTemplateLoader.get_inserts
+    :param size: Number of bytes read at once
+    """
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    rest: str = ""
+
+    def replace(match: re.Match) -> str:
+        return inserts.get(match.group(1), match.group(0))
 
-            "insert_diagnoses": get_diagnoses(templates, patient.diagnosis),
+    while data := document_xml.read(size):
+        text: str = rest + decoder.decode(data)
 
-            **templates.get_inserts(list(patient.diagnosis.keys())),
+        # A hook may be split between two chunks, keep an unclosed comment or its beginning for the next one
+        start: int = text.rfind("<!--")
+        if start == -1 or "!-->" in text[start:]:
+            start = next((len(text) - k for k in (3, 2, 1) if text.endswith("<!--"[0:k])), len(text))
 
-            'base_medication': get_medication(templates, patient.current_basis_medication),
-            'other_medication': get_medication(templates, patient.current_other_medication),
+        text, rest = text[0:start], text[start:]
 
-            **patient.gender.gender_dict
-        })
+        yield hook_pattern.sub(replace, text)
 
-    # Write data
-    create_output_file(output_path=configs.paths["output"] / patient.file_name(),
-                       docx_template_path=configs.paths["docx"],
-                       document_text=document_text,
-                       header_text=generate_header(configs, patient))
+    yield hook_pattern.sub(replace, rest + decoder.decode(b"", final=True))
 
 
-def patch_data(configs: ConfigurationLoader, patient: Patient):
+def patch_data(configs: ConfigurationLoader, patient: Patient,
+               templates: XmlTemplateLoader | None = None) -> Path | None:
     """
     Reload an already generated docx-file and re process its content, adding text blocks which were omitted before.
     This only works for inserting new insert templates depending on diagnoses read from patient.
     :param configs: ConfigurationLoader containing all needed paths
     :param patient: Patient object with loaded data
+    :param templates: Already loaded XmlTemplateLoader, will be loaded from configs if omitted
+    :return: Path of the patched file, None if no file was generated for patient
     """
 
-    # Load Templates
-    templates: XmlTemplateLoader = XmlTemplateLoader(configs.paths["inserts"])
+    # Load Templates, if they were not provided
+    if templates is None:
+        with profiler.stage("template load"):
+            templates = XmlTemplateLoader(configs.paths["inserts"])
 
     # Get generated file path
     file_path: Path = configs.paths["output"] / patient.file_name()
 
     # Do not proceed if file was not created
     if not file_path.exists():
-        return
-
-    with ZipFile(file_path, 'r') as zip_file:
-        with zip_file.open('word/document.xml') as document_xml:
-            # Replace commented insert hooks with working ones
-            full_document_text: str = (re.sub(
-                r"<!-- insert_id: \[(.*?)] !-->",
-                r"{\1}",
+        return None
 
-                # In the text read from the loaded docx file
-                document_xml.read().decode('utf-8'))
+    with profiler.stage("format"):
+        inserts: Mapping[str, str] = templates.get_inserts(list(patient.diagnosis.keys()))
 
-                # Then reformat string
-                .format(**templates.get_inserts(list(patient.diagnosis.keys()))))
+    # Letter the patch is applied to, if it was recorded
+    ledger: GenerationLedger | None = generation_ledger(configs)
+    source: Generation | None = ledger.latest(file_path.name) if ledger is not None else None
 
+    with ZipFile(file_path, 'r') as zip_file:
         # Load already generated header from docx-file
         with zip_file.open('word/header1.xml') as header_xml:
             full_header_text: str = header_xml.read().decode('utf-8')
 
-    # Write everything into new file
-    create_output_file(output_path=file_path.with_stem(f"{file_path.stem} patch"),
-                       docx_template_path=configs.paths["docx"],
-                       document_text=full_document_text,
-                       header_text=full_header_text)
+        # The letter may have been edited since it was generated
+        letter: dict[str, int] = {name: zip_file.getinfo(name).CRC
+                                  for name in ('word/document.xml', 'word/header1.xml')}
+
+        # Write everything into new file, hooks are replaced while the document is read from the loaded docx file
+        patch_path: Path = file_path.with_stem(f"{file_path.stem} patch")
+        with zip_file.open('word/document.xml') as document_xml:
+            write_generation(configs, "patch", patient, patch_path.name, {"docx": configs.paths["docx"]},
+                             {"inserts": inserts, "letter": letter},
+                             fill_hooks(document_xml, inserts), full_header_text,
+                             source.id if source is not None and source.kind == "brief" else None)
+
+    return patch_path
 
 
-def write_employer_note(configs: ConfigurationLoader, patient: Patient):
+def write_employer_note(configs: ConfigurationLoader, patient: Patient) -> tuple[Path, bool]:
     """Create a document with a recommendation for the employer
+    :return: Path of the generated document and False, if it was already generated from the same data
     """
 
-    # Read the document text from employer note template
-    with open(configs.paths["employer"], "rb") as xml_file:
-        document_text: str = xml_file.read().decode("utf-8").format(**{
-            **patient.get_data(),
-            **patient.gender.gender_dict
-        })
+    with profiler.stage("template load"):
+        employer_template = load_template(configs.paths["employer"], patient_fields)
+
+    # Write data, the document text is rendered from employer note template while it is compressed
+    output_name: str = patient.employer_file_name()
+    values: dict[str, object] = patient.get_data()
+
+    written: bool = write_generation(configs, "arbeitgeber", patient, output_name,
+                                     {"document": configs.paths["employer"], "header": configs.paths["header"],
+                                      "docx": configs.paths["docx"]},
+                                     {"document": values, "header": header_values(patient)},
+                                     employer_template.for_gender(patient.gender).render_chunks(values),
+                                     generate_header(configs, patient))
 
-    # Write data
-    create_output_file(
-        output_path=configs.paths["output"] / f"A-{patient.last_name}, {patient.first_name} Arbeitgebervorlage.docx",
-        docx_template_path=configs.paths["docx"],
-        document_text=document_text,
-        header_text=generate_header(configs, patient))
+    return configs.paths["output"] / output_name, written
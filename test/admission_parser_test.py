@@ -0,0 +1,29 @@
+import random
+
+from loaders.admission_parser import read_cells
+from loaders.patient import Patient
+from generators.gender import Gender
+from bench.synthetic import write_admission_file
+from bench.admission_parser import read_cells_regex
+
+
+def test_read_cells_matches_regex(tmp_path):
+    rng = random.Random(1)
+
+    for filler_rows, tracked_changes in [(0, False), (50, True)]:
+        admission_file = write_admission_file(tmp_path, rng, filler_rows, tracked_changes)
+        wanted = set(Patient.admission_cells)
+
+        assert read_cells(admission_file, wanted) == read_cells_regex(admission_file, wanted)
+
+
+def test_load_from_file(tmp_path):
+    admission_file = write_admission_file(tmp_path, random.Random(2))
+
+    patient = Patient(Gender(Gender.Female))
+    patient.load_from_file(admission_file)
+
+    assert admission_file.name.startswith(f"{patient.last_name}, {patient.first_name} "
+                                          f"{patient.admission.strftime('%d%m%Y')}")
+    assert patient.discharge > patient.admission
+    assert patient.current_basis_medication and patient.former_acute_medication
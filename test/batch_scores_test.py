@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from generators import scores
+from generators.batch_scores import (midas_scores, whodas_scores, affliction_scores, depression_scores,
+                                     personality_scores)
+
+
+def test_texts_match_single_patient():
+    rng = random.Random(0)
+
+    midas = [[rng.randint(0, 100) for _ in range(5)] for _ in range(200)]
+    whodas = [[rng.randint(0, 30) for _ in range(3)] for _ in range(200)]
+    checks = [[rng.random() < 0.2 for _ in range(len(scores.afflictions))] for _ in range(200)]
+    bdi = [[rng.randint(0, 8) for _ in range(len(scores.depression_options))] for _ in range(200)]
+    choices = [[rng.random() < 0.5 for _ in range(len(scores.personality_options))] for _ in range(200)]
+
+    assert midas_scores(np.array(midas)).texts == [scores.get_midas(row) for row in midas]
+    assert whodas_scores(np.array(whodas)).texts == [scores.get_whodas(row) for row in whodas]
+    assert depression_scores(np.array(bdi)).texts == [scores.get_depression_score(row) for row in bdi]
+    assert personality_scores(np.array(choices)).texts == [scores.get_personality_score(row) for row in choices]
+    assert affliction_scores(np.array(checks)).texts == [
+        scores.get_afflictions([i + 1 for i, checked in enumerate(row) if checked]) for row in checks]
+
+
+def test_midas_correction():
+    numbers = np.array([[1, 3, 5, 4, 10, 23], [90, 45, 45, 90, 95, 0], [46, 46, 0, 0, 0, 0]])
+
+    batch = midas_scores(numbers)
+
+    assert batch.values.tolist() == [[1, 3, 5, 4, 10], [90, 2, 45, 47, 92], [46, 46, 0, 0, 0]]
+    assert batch.scores.tolist() == [23, 276, 92]
+    assert batch.corrected.tolist() == [False, True, True]
+
+    # Input is not changed
+    assert numbers[1].tolist() == [90, 45, 45, 90, 95, 0]
+
+
+def test_depression_points():
+    numbers = np.ones((2, len(scores.depression_options)), dtype=int)
+    numbers[1, 15] = 5
+    numbers[1, 0] = 4
+    numbers[1, 1] = 9
+
+    assert depression_scores(numbers).scores.tolist() == [0, 5]
+
+
+def test_invalid_values():
+    with pytest.raises(ValueError):
+        midas_scores(np.array([[1, 2, 3]]))
+
+    with pytest.raises(ValueError):
+        whodas_scores(np.array([[1, -2, 3]]))
+
+    with pytest.raises(ValueError):
+        personality_scores(np.full((1, len(scores.personality_options)), 2))
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from loaders.insert_loader import XmlTemplateLoader
+from loaders.patient import Patient
+from generators.gender import Gender
+from batch import run_batch, generate_letter, read_manifest
+from bench.synthetic import write_admission_file
+
+
+def test_batch_does_not_overwrite(tmp_path, configs):
+    rng = random.Random(6)
+    files = [write_admission_file(configs.paths["db"], rng, number=i) for i in range(2)]
+
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("file;gender;midas\n" + "".join(f"{file.name};m;1 2 3 4 5\n" for file in files),
+                        encoding="utf-8")
+
+    assert [result.success for result in run_batch(configs, manifest, workers=1)] == [True, True]
+
+    # Existing letters fail, unless they may be overwritten
+    results = run_batch(configs, manifest, workers=1)
+    assert [result.success for result in results] == [False, False]
+    assert all(result.message.startswith("FileExistsError") for result in results)
+    assert [result.success for result in run_batch(configs, manifest, workers=1, overwrite=True)] == [True, True]
+
+    # Columns of omitted blocks are not read
+    patient = Patient(Gender(Gender.Male))
+    patient.load_from_file(files[0])
+    row = {"file": files[0].name, "midas": "keine Zahlen"}
+
+    with pytest.raises(ValueError):
+        generate_letter(configs, XmlTemplateLoader(configs.paths["inserts"]), patient, row, overwrite=True)
+
+    configs.set_blocks(["midas"], [False])
+    generate_letter(configs, XmlTemplateLoader(configs.paths["inserts"]), patient, row, overwrite=True)
+
+
+def test_batch_requires_gender(tmp_path, configs):
+    rng = random.Random(7)
+    files = [write_admission_file(configs.paths["db"], rng, number=i) for i in range(3)]
+
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("file;gender\n" + "".join(f"{file.name};{gender}\n"
+                                                    for file, gender in zip(files, ["W", "x", ""])), encoding="utf-8")
+
+    results = run_batch(configs, manifest, workers=1)
+    assert [result.success for result in results] == [True, False, False]
+    assert all("gender" in result.message for result in results[1:])
+
+    # Empty manifests are reported, instead of failing on the missing header
+
+    manifest.write_text("", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_manifest(manifest)
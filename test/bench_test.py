@@ -0,0 +1,21 @@
+from bench.run import prepare_db, run
+
+
+def test_bench_run(tmp_path, configs):
+    db_files = prepare_db(configs.paths["db"], 2, seed=0)
+    assert len(db_files) == 2
+
+    # The files of a previous run with the same count and seed are reused
+    assert prepare_db(configs.paths["db"], 2, seed=0) == db_files
+
+    stages = run(configs, db_files, samples=2, seed=0)
+
+    for stage in ("get_patient_file_matches", "patient_index_build", "patient_index_search",
+                  "xml_template_loader_cold", "xml_template_loader_warm", "document_template_compile",
+                  "load_from_file", "get_inserts", "document_values", "render_document", "generate_header",
+                  "create_output_file"):
+        assert stages[stage]["runs"] > 0
+        assert 0 <= stages[stage]["min_ms"] <= stages[stage]["median_ms"] <= stages[stage]["max_ms"]
+
+    assert stages["create_output_file"]["runs"] == 2
+    assert len(list(configs.paths["output"].glob("*.docx"))) == 2
@@ -0,0 +1,27 @@
+from build_templates import minify_xml, merge_runs
+from loaders.document_template import CompiledTemplate
+
+run = '<w:r w:rsidR="00A1"><w:rPr><w:b/></w:rPr><w:t{space}>{text}</w:t></w:r>'
+
+
+def test_minify_keeps_text_and_placeholders():
+    text = ('<w:p w:rsidR="00877D06"\n           w:rsidP="00E55B2E">\n    <w:proofErr w:type="spellStart"/>\n    '
+            + run.format(space=' xml:space="preserve"', text="  Hallo {pat_nom} ")
+            + "\n    " + run.format(space=' xml:space="preserve"', text="\n  Welt ")
+            + "\n    " + run.format(space="", text="A ")
+            + "\n    " + run.format(space="", text="B")
+            + "\n    " + run.format(space="", text="C")
+            + "\n    {insert}\n</w:p>")
+
+    assert minify_xml(text) == ('<w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">  Hallo {pat_nom} \n  Welt '
+                                '</w:t></w:r><w:r><w:rPr><w:b/></w:rPr><w:t>A </w:t></w:r>'
+                                '<w:r><w:rPr><w:b/></w:rPr><w:t>BC</w:t></w:r>{insert}</w:p>')
+
+    assert CompiledTemplate(minify_xml(text)).fields == CompiledTemplate(text).fields
+
+
+def test_merge_runs_keeps_different_formatting():
+    text = ('<w:r><w:rPr><w:b/></w:rPr><w:t>A</w:t></w:r><w:r><w:rPr><w:i/></w:rPr><w:t>B</w:t></w:r>'
+            '<w:r><w:t>C</w:t></w:r><w:r><w:tab/><w:t>D</w:t></w:r><w:r><w:t>E</w:t></w:r>')
+
+    assert merge_runs(text) == text
@@ -0,0 +1,27 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from loaders.config_loader import ConfigurationLoader
+
+templates = Path(__file__).parent.parent / "templates"
+
+
+@pytest.fixture
+def configs(tmp_path) -> ConfigurationLoader:
+    """Configurations using copies of the templates, with every other path inside tmp_path. The db folder exists
+    and is empty, the ledger is only created when it is first used."""
+
+    shutil.copytree(templates, tmp_path / "templates", ignore=shutil.ignore_patterns("*.cache", "build"))
+    (tmp_path / "db").mkdir()
+
+    config_path = tmp_path / "config.txt"
+    config_path.write_text("\n".join(f"{key}={tmp_path / 'templates' / name}" for key, name in [
+        ("docx", "template.docx"), ("header", "header1_template.xml"), ("document", "document_template.xml"),
+        ("inserts", "insert_template.xml"), ("employer", "employer_document_template.xml")])
+                           + f"\ndb={tmp_path / 'db'}\noutput={tmp_path / 'output'}\nindex={tmp_path / 'index.json'}"
+                           + f"\npatients={tmp_path / 'patients'}\nledger={tmp_path / 'ledger.sqlite'}",
+                           encoding="utf-8")
+
+    return ConfigurationLoader(config_path)
@@ -0,0 +1,40 @@
+import pytest
+
+from generators.gender import Gender
+from loaders.document_template import CompiledTemplate, TemplateError, load_template
+
+
+def test_render_matches_format():
+    text = "<w:t>{pat_nom} {{literal}} {patient_name}</w:t>{pat_nom}"
+    values = {"pat_nom": "der Patient", "patient_name": "Max Mustermann"}
+
+    template = CompiledTemplate(text)
+
+    assert template.fields == {"pat_nom", "patient_name"}
+    assert template.render(values) == text.format(**values)
+
+
+def test_unknown_placeholders(tmp_path):
+    template_path = tmp_path / "template.xml"
+    template_path.write_text("{midas} {unknown_insert}", encoding="utf-8")
+
+    with pytest.raises(TemplateError, match="unknown_insert"):
+        load_template(template_path, {"midas"})
+
+    with pytest.raises(TemplateError):
+        CompiledTemplate("{midas:>10}")
+
+    with pytest.raises(TemplateError):
+        CompiledTemplate("{midas")
+
+
+def test_gender_variants():
+    text = "{{x}} {pat_nom_cap} hat {pron_gen_sf} {patient_name} {pat_nom}"
+    template = CompiledTemplate(text)
+
+    for gender in (Gender(Gender.Male), Gender(Gender.Female)):
+        variant = template.for_gender(gender)
+
+        assert variant is template.for_gender(gender)
+        assert variant.fields == {"patient_name"}
+        assert variant.render({"patient_name": "{Max}"}) == text.format(patient_name="{Max}", **gender.gender_dict)
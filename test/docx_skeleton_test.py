@@ -0,0 +1,72 @@
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+import pytest
+
+from loaders import docx_skeleton
+from loaders.docx_skeleton import DocxSkeleton, ArchiveTooLargeError
+
+
+def test_skeleton_write(tmp_path):
+    template_path = tmp_path / "template.docx"
+    with ZipFile(template_path, "w", ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("[Content_Types].xml", "<Types/>")
+        zip_file.writestr("word/settings.xml", "<w:settings/>" * 100)
+
+    skeleton = DocxSkeleton(template_path, {"word/settings.xml": 0, "word/header1.xml": 0})
+
+    output_path = tmp_path / "Ä-output.docx"
+    skeleton.write(output_path, {"word/document.xml": "<w:document>ä</w:document>".encode("utf-8"),
+                                 "word/header1.xml": b"<w:hdr/>"})
+
+    with ZipFile(output_path) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == ["[Content_Types].xml", "word/settings.xml",
+                                       "word/document.xml", "word/header1.xml"]
+        assert zip_file.read("word/document.xml").decode("utf-8") == "<w:document>ä</w:document>"
+        assert zip_file.read("word/settings.xml") == b"<w:settings/>" * 100
+        assert zip_file.getinfo("word/settings.xml").compress_type == ZIP_STORED
+        assert zip_file.getinfo("word/document.xml").compress_type == ZIP_DEFLATED
+        assert zip_file.getinfo("word/header1.xml").compress_type == ZIP_STORED
+
+    # No temporary files are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["template.docx", "Ä-output.docx"]
+
+
+def test_skeleton_write_chunks(tmp_path):
+    template_path = tmp_path / "template.docx"
+    with ZipFile(template_path, "w", ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("[Content_Types].xml", "<Types/>")
+
+    skeleton = DocxSkeleton(template_path, {"word/header1.xml": 0})
+    chunks = [f"<w:p>{i} ä</w:p>".encode("utf-8") for i in range(5000)]
+
+    output_path = tmp_path / "output.docx"
+    skeleton.write(output_path, {"word/document.xml": iter(chunks), "word/header1.xml": iter([b"<w:hdr/>", b""])})
+
+    with ZipFile(output_path) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.read("word/document.xml") == b"".join(chunks)
+        assert zip_file.read("word/header1.xml") == b"<w:hdr/>"
+        assert zip_file.getinfo("word/header1.xml").compress_type == ZIP_STORED
+
+
+def test_skeleton_rejects_zip64(tmp_path, monkeypatch):
+    template_path = tmp_path / "template.docx"
+    with ZipFile(template_path, "w", ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("[Content_Types].xml", "<Types/>")
+
+    skeleton = DocxSkeleton(template_path, {"word/document.xml": 0})
+
+    # Stands in for 4 GiB, ZIP64 extensions are not written
+    monkeypatch.setattr(docx_skeleton, "_zip32_limit", 1000)
+
+    skeleton.write(tmp_path / "small.docx", {"word/document.xml": iter([b"x" * 400])})
+
+    with pytest.raises(ArchiveTooLargeError):
+        skeleton.write(tmp_path / "large.docx", {"word/document.xml": iter([b"x" * 400] * 3)})
+
+    with pytest.raises(ArchiveTooLargeError):
+        skeleton.write(tmp_path / "large.docx", {"word/document.xml": b"x" * 1001})
+
+    # Nothing is left of the rejected archives
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["small.docx", "template.docx"]
@@ -0,0 +1,55 @@
+import random
+from pathlib import Path
+
+from loaders.config_loader import ConfigurationLoader
+from loaders.drug_dictionary import DrugDictionary
+from loaders.patient import Patient
+from generators.gender import Gender
+from medication_report import medication_report, patient_medication
+from bench.synthetic import write_admission_file
+
+dictionary_path = Path(__file__).parent.parent / "templates" / "drug_dictionary.txt"
+
+
+def test_normalize():
+    dictionary = DrugDictionary(
+        "# Kommentar\n"
+        "Ibuprofen: Ibu, Nurofen\n"
+        "Colecalciferol: Vitamin D, Vitamin D3\n"
+        "Riboflavin: Vitamin B2\n"
+        "Acetylsalicylsäure: ASS, Thomapyrin\n"
+        "Paracetamol: Thomapyrin\n")
+
+    assert dictionary.normalize("Ibu 400 mg bei Bedarf") == ("Ibuprofen",)
+    assert dictionary.normalize("NUROFEN,  vitamin   d3") == ("Ibuprofen", "Colecalciferol")
+    assert dictionary.normalize("Thomapyrin (wirkungslos), ASS") == ("Acetylsalicylsäure", "Paracetamol")
+    assert dictionary.normalize("Vitamin B2 und Vitamin D") == ("Riboflavin", "Colecalciferol")
+
+    # Names are only found as whole words
+    assert dictionary.normalize("Ibuprofenol, Klasse") == ()
+    assert dictionary.matches("Vitamin D3") == [(0, 10, ("Colecalciferol",))]
+
+
+def test_medication_report(tmp_path):
+    db = tmp_path / "db"
+    db.mkdir()
+    files = [write_admission_file(db, random.Random(i), number=i) for i in range(6)]
+
+    config_path = tmp_path / "config.txt"
+    config_path.write_text(f"db={db}\nstore={tmp_path / 'patients.sqlite'}\ndrugs={dictionary_path}",
+                           encoding="utf-8")
+    report = medication_report(ConfigurationLoader(config_path))
+
+    dictionary = DrugDictionary(dictionary_path.read_text(encoding="utf-8"))
+    expected = {}
+    for admission_file in files:
+        patient = Patient(Gender(Gender.Female))
+        patient.load_from_file(admission_file)
+
+        for substance in {substance for _, text in patient_medication(patient)
+                          for substance in dictionary.normalize(text.strip())}:
+            expected[substance] = expected.get(substance, 0) + 1
+
+    assert report.patients == 6
+    assert dict(report.substances) == expected
+    assert not report.failed
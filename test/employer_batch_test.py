@@ -0,0 +1,43 @@
+import random
+from datetime import datetime
+
+from loaders.patient import Patient
+from generators.gender import Gender
+from template_writer import write_data
+from batch import run_employer_batch
+from bench.synthetic import write_admission_file
+
+
+def test_employer_notes_for_discharge_range(tmp_path, configs):
+    rng = random.Random(5)
+    files = [write_admission_file(configs.paths["db"], rng, number=i) for i in range(12)]
+
+    patients = {}
+    for admission_file in files:
+        patient = Patient(Gender(Gender.Male))
+        patient.load_from_file(admission_file)
+        patients[admission_file.name] = patient
+
+    start, end = sorted(patient.discharge for patient in patients.values())[2:10:7]
+    selected = {name for name, patient in patients.items() if start <= patient.discharge <= end}
+
+    # The first selected patient got a letter, its gender is in the ledger. The second one is listed in the manifest.
+    with_letter, in_manifest, *unknown = sorted(selected)
+    write_data(configs, patients[with_letter], "MIDAS", "WHODAS", "Vorbehandlungen", "Selbstauskunft")
+
+    manifest = tmp_path / "genders.csv"
+    manifest.write_text(f"file;gender\n{in_manifest};w\nfehlt.docx;m\n", encoding="utf-8")
+
+    results = run_employer_batch(configs, discharged=(start, end), manifest_path=manifest, workers=1)
+
+    # Manifest rows without admission file fail on their own, after all selected patients
+    assert {result.patient for result in results[:-1]} == {f"{patients[name].last_name}, {patients[name].first_name}"
+                                                           for name in selected}
+    assert [result.success for result in results] == [True, True] + [False] * len(unknown) + [False]
+    assert results[-1].patient == "fehlt.docx" and results[-1].message.startswith("FileNotFoundError")
+    assert (tmp_path / "output" / "employer_report.csv").exists()
+
+    # Same data again: nothing is written, the selection does not depend on admission dates
+    results = run_employer_batch(configs, discharged=(start, end), admitted=(datetime(2000, 1, 1), end),
+                                 manifest_path=manifest, workers=1)
+    assert [result.message for result in results if result.success] == ["unverändert", "unverändert"]
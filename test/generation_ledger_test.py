@@ -0,0 +1,56 @@
+import random
+
+from loaders.patient import Patient
+from generators.gender import Gender
+from template_writer import (write_data, write_employer_note, patch_data, already_generated, generation_ledger,
+                             reproduce_generation)
+from bench.synthetic import write_admission_file
+
+
+def test_ledger_skips_and_reproduces(tmp_path, configs):
+    # The ledger is created on first use, it adopts the files already in the output folder
+    (tmp_path / "output").mkdir()
+    (tmp_path / "output" / "A-Alt, Brief 01012024.docx").write_bytes(b"")
+
+    patient = Patient(Gender(Gender.Female))
+    patient.load_from_file(write_admission_file(tmp_path, random.Random(3)))
+    answers = ["MIDAS {pat_nom}", "WHODAS", "Vorbehandlungen", "Selbstauskunft"]
+
+    # Files of the output folder are adopted, when the ledger is created
+    assert already_generated(configs, "A-Alt, Brief 01012024.docx")
+    assert not already_generated(configs, patient.file_name())
+
+    # Files written after the ledger was created are found, even if they are not recorded
+    (tmp_path / "output" / "A-Neu, Brief 01012024.docx").write_bytes(b"")
+    assert already_generated(configs, "A-Neu, Brief 01012024.docx")
+
+    assert write_data(configs, patient, *answers)
+    assert already_generated(configs, patient.file_name())
+    letter = (configs.paths["output"] / patient.file_name()).read_bytes()
+
+    # Same answers and templates: nothing is written
+    assert not write_data(configs, patient, *answers)
+
+    employer_path = write_employer_note(configs, patient)[0]
+    patch_path = patch_data(configs, patient)
+
+    # Changed answers or templates are written again
+    assert write_data(configs, patient, *answers[0:3], "Andere Selbstauskunft")
+    with open(configs.paths["header"], "a", encoding="utf-8") as header:
+        header.write("\n")
+    assert write_data(configs, patient, *answers[0:3], "Andere Selbstauskunft")
+
+    ledger = generation_ledger(configs)
+    history = ledger.history(patient.last_name)
+    assert [generation.kind for generation in history] == ["brief", "brief", "patch", "arbeitgeber", "brief"]
+    assert history[2].source == history[4].id
+
+    # Every recorded file can be written again exactly, even after the templates changed
+    for generation, original in [(history[4], letter), (history[3], employer_path.read_bytes()),
+                                 (history[2], patch_path.read_bytes())]:
+        assert reproduce_generation(configs, generation.id, tmp_path / "reproduced.docx").read_bytes() == original
+
+    # Recorded files are known from the ledger, even if they were deleted, but they cannot be patched anymore
+    (configs.paths["output"] / patient.file_name()).unlink()
+    assert already_generated(configs, patient.file_name())
+    assert patch_data(configs, patient) is None
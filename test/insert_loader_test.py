@@ -0,0 +1,119 @@
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from loaders.insert_loader import GlobMatcher, XmlTemplateLoader
+
+
+def test_matcher_precedence():
+    matcher = GlobMatcher(["M54.*", "M5?.2", "*", "M54.*", "G4?.1"])
+
+    assert matcher.patterns == ["M54.*", "M5?.2", "*", "G4?.1"]
+    assert matcher.matches("M54.2") == ("M54.*", "M5?.2", "*")
+    assert matcher.matches("G43.1") == ("*", "G4?.1")
+    assert matcher.matches("G44.0") == ("*",)
+    assert GlobMatcher(["M54.*"]).matches("XM54.2") == ()
+
+
+def test_glob_inserts(tmp_path):
+    template_file = tmp_path / "insert_template.xml"
+    template_file.write_text(
+        '<insert for="M54.*" name="back">back</insert>'
+        '<insert for="M5?.?" name="other">other</insert>'
+        '<insert for="M54.2" name="neck">neck</insert>', encoding="utf-8")
+
+    templates = XmlTemplateLoader(template_file)
+
+    # The first declared pattern is filled in by the first matching code, the next one by the second code
+    assert templates.get_inserts(["M54.2", "M54.5", "M54.6"]) == {"back": "back", "other": "other", "neck": "neck"}
+    assert templates.get_inserts(["M51.1"]) == {"back": "<!-- insert_id: [back] !-->", "other": "other",
+                                                "neck": "<!-- insert_id: [neck] !-->"}
+
+
+def test_cached_inserts(tmp_path):
+    template_file = tmp_path / "insert_template.xml"
+    template_file.write_text(
+        '<collection for="pain" name="pain_text">Schmerzen: {collection}</collection>'
+        '<insert for="M54.2" name="pain">Nacken</insert>'
+        '<insert for="M54.5" name="pain">Rücken</insert>'
+        '<insert for="G43.1" name="aura">Aura</insert>', encoding="utf-8")
+
+    templates = XmlTemplateLoader(template_file)
+
+    first = templates.get_inserts(["G43.1", "M54.2"])
+    assert templates.get_inserts(["M54.2", "G43.1"]) is first
+    assert (templates.insert_hits, templates.insert_misses) == (1, 1)
+
+    with pytest.raises(TypeError):
+        first["aura"] = "changed"
+
+    # Collections are joined in the order of the codes, each order is cached on its own
+    assert templates.get_inserts(["M54.2", "M54.5"])["pain_text"] == "Schmerzen: Nacken, Rücken"
+    assert templates.get_inserts(["M54.5", "M54.2"])["pain_text"] == "Schmerzen: Rücken, Nacken"
+    assert templates.get_inserts(["M54.2", "M54.5"])["pain_text"] == "Schmerzen: Nacken, Rücken"
+    assert (templates.insert_hits, templates.insert_misses) == (2, 3)
+
+
+def test_concurrent_inserts(monkeypatch):
+    templates_path = Path(__file__).parent.parent / "templates" / "insert_template.xml"
+    shared = XmlTemplateLoader(templates_path)
+    single = XmlTemplateLoader(templates_path)
+
+    # Evictions happen all the time, while other threads read the cache
+    monkeypatch.setattr(XmlTemplateLoader, "max_cached_inserts", 8)
+
+    rng = random.Random(7)
+    codes = [code for code in shared.inserts if "*" not in code] + ["M54.1", "M54.9", "X00.0"]
+    requests = [rng.sample(codes, rng.randint(0, 5)) for _ in range(400)]
+    expected = [(dict(single.get_inserts(ids)), "".join(single.apply_template("diagnosis", icd10=code, name=code)
+                                                         for code in ids)) for ids in requests]
+
+    def render(ids):
+        return dict(shared.get_inserts(ids)), "".join(shared.apply_template("diagnosis", icd10=code, name=code)
+                                                      for code in ids)
+
+    # Switch threads as often as possible
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    try:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(render, requests * 10))
+
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert results == expected * 10
+    assert shared.insert_hits + shared.insert_misses == len(results)
+
+    # The loaded data is never changed and can not be changed
+    for name in ("templates", "collections", "inserts", "preprocess_names", "pattern_keys"):
+        assert getattr(shared, name) == getattr(single, name)
+
+    with pytest.raises(TypeError):
+        shared.inserts["G43.1"]["migraine_with_aura_acute_medication"] = ""
+
+
+def test_cache_file(tmp_path, monkeypatch):
+    template_file = tmp_path / "insert_template.xml"
+    cache_file = tmp_path / "insert_template.cache"
+    template_file.write_text('<insert for="M54.2" name="pain">Nacken</insert>', encoding="utf-8")
+
+    assert XmlTemplateLoader(template_file).get_inserts(["M54.2"])["pain"] == "Nacken"
+    assert cache_file.exists()
+
+    # Edited templates are parsed again
+    template_file.write_text('<insert for="M54.2" name="pain">Halswirbelsäule</insert>', encoding="utf-8")
+    assert XmlTemplateLoader(template_file).get_inserts(["M54.2"])["pain"] == "Halswirbelsäule"
+
+    # A truncated cache file is ignored and rebuilt
+    cache_file.write_bytes(cache_file.read_bytes()[0:20])
+    assert XmlTemplateLoader(template_file).get_inserts(["M54.2"])["pain"] == "Halswirbelsäule"
+
+    # The rebuilt cache is used without parsing the templates
+    monkeypatch.setattr(XmlTemplateLoader, "_parse", lambda *_: pytest.fail("Schablonen erneut gelesen"))
+    assert XmlTemplateLoader(template_file).get_inserts(["M54.2"])["pain"] == "Halswirbelsäule"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["insert_template.cache", "insert_template.xml"]
@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+
+from loaders import medication
+from loaders.medication import parse_medication_line, extract_medication_objects
+from bench.medication_parser import parse_medication_line_regex, random_line, adversarial_lines
+
+
+def test_parse_matches_regex():
+    rng = random.Random(3)
+
+    for _ in range(5000):
+        line = random_line(rng, rng.choice([4, 12, 40]))
+        assert parse_medication_line(line) == parse_medication_line_regex(line), line
+
+    for line in adversarial_lines(40).values():
+        assert parse_medication_line(line) == parse_medication_line_regex(line), line
+
+
+def test_extract_medication_objects():
+    medication = extract_medication_objects("Name Dosis Einheit Schema\nIbuprofen 400 mg 1-0-1\n"
+                                            "Sumatriptan (Imigran) 50 mg 1 - 0 - 0 - 1/2\nbei Bedarf")
+
+    assert [(m.name, m.amount, m.unit, m.taken) for m in medication] == [
+        ("Ibuprofen", "400", "mg", ["1", "0", "1"]),
+        ("Sumatriptan (Imigran)", "50", "mg", ["1", "0", "0", "1/2"]),
+        ("bei Bedarf", "", "", None),
+    ]
+
+
+def test_linear_time(monkeypatch):
+    # Counts the character class tests of the parser, instead of measuring its runtime
+    tests = Counter()
+
+    def counted(name, fn):
+        def test(char):
+            tests[name] += 1
+            return fn(char)
+
+        return test
+
+    for name in ("is_name", "is_dosage", "is_taken"):
+        monkeypatch.setattr(medication, name, counted(name, getattr(medication, name)))
+
+    def character_tests(line):
+        tests.clear()
+        assert parse_medication_line(line) is None
+        return sum(tests.values())
+
+    # The regex needs minutes for any of these lines, its steps grow with the fourth power of the length
+    for short, long in zip(adversarial_lines(2000).values(), adversarial_lines(4000).values()):
+        assert character_tests(long) <= 2 * character_tests(short) + 10
+        assert character_tests(long) <= 8 * len(long)
@@ -0,0 +1,40 @@
+import os
+import random
+
+from loaders.patient_cache import PatientCache
+from generators.gender import Gender
+from bench.synthetic import write_admission_file
+
+
+def test_cache_hits_and_invalidation(tmp_path):
+    rng = random.Random(3)
+    cache_path = tmp_path / "patient_cache"
+    files = [write_admission_file(tmp_path, rng, number=i) for i in range(3)]
+
+    cache = PatientCache(max_entries=2, cache_path=cache_path)
+    first = cache.get(files[0], Gender(Gender.Male))
+    first.diagnosis.clear()
+
+    # Copies are returned, changes by the caller do not reach the cache
+    second = cache.get(files[0], Gender(Gender.Female))
+    assert second.diagnosis and second.gender.gender == Gender.Female
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The age is computed when the patient is returned, not when the file was parsed
+    cache.entries[str(files[0].absolute())][2].age = -1
+    assert cache.get(files[0], Gender(Gender.Male)).age == second.age
+
+    # Least recently used entries are evicted from memory
+    cache.get(files[1], Gender(Gender.Male))
+    cache.get(files[2], Gender(Gender.Male))
+    assert list(cache.entries) == [str(files[1].absolute()), str(files[2].absolute())]
+
+    # Entries are restored from the cache folder, a changed file is parsed again
+    restored = PatientCache(cache_path=cache_path)
+
+    stat = files[1].stat()
+    os.utime(files[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert restored.get(files[0], Gender(Gender.Male)).last_name == second.last_name
+    restored.get(files[1], Gender(Gender.Male))
+    assert (restored.hits, restored.misses) == (1, 1)
@@ -0,0 +1,41 @@
+from loaders.patient_index import PatientIndex
+
+
+def test_patient_index(tmp_path):
+    db_path = tmp_path / "db"
+    db_path.mkdir()
+
+    for name in ["Müller-Lüdenscheidt, Hans 01022024.docx", "Müller, Anna 03042024.docx",
+                 "Meier, Paul 05062024.docx", "notes.txt", "Unbekannt.docx"]:
+        (db_path / name).write_bytes(b"")
+
+    index_path = tmp_path / "index.json"
+    index = PatientIndex.open(index_path, db_path)
+
+    assert len(index.entries) == 3
+    assert [m.first_name for m in index.search("müller")] == ["Hans", "Anna"]
+    assert [m.first_name for m in index.search("lüden")] == ["Hans"]
+    assert index.search("schmidt") == []
+
+    # Only the start of a last name part matches, not first names or the middle of a name
+    assert index.search("ller") == [] and index.search("hans") == []
+
+    # No temporary file is left behind
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["db", "index.json"]
+
+    # Unchanged folders do not change the index
+    assert not index.refresh()
+
+    # Files rewritten in place do not change the folder, but their size and mtime are updated
+    (db_path / "Müller, Anna 03042024.docx").write_bytes(b"changed")
+    assert index.refresh()
+    assert [m.size for m in index.search("müller")] == [0, 7]
+
+    # Changes are picked up by a freshly loaded index
+    (db_path / "Meier, Paul 05062024.docx").unlink()
+    (db_path / "Schmidt, Eva 07082024.docx").write_bytes(b"data")
+
+    index = PatientIndex.open(index_path, db_path)
+
+    assert index.search("meier") == []
+    assert [(m.first_name, m.size) for m in index.search("schmidt")] == [("Eva", 4)]
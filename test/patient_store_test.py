@@ -0,0 +1,77 @@
+import os
+import random
+from datetime import datetime
+
+from loaders.patient import Patient
+from loaders.patient_store import PatientStore
+from generators.gender import Gender
+from bench.synthetic import write_admission_file
+
+
+def test_import_and_search(tmp_path):
+    rng = random.Random(4)
+    db = tmp_path / "db"
+    db.mkdir()
+    files = [write_admission_file(db, rng, number=i) for i in range(20)]
+
+    patients = []
+    for admission_file in files:
+        patient = Patient(Gender(Gender.Female))
+        patient.load_from_file(admission_file)
+        patients.append((admission_file, patient))
+
+    with PatientStore(tmp_path / "patients.sqlite") as store:
+        result = store.import_folder(db)
+        assert (result.added, result.updated, result.removed, result.failed) == (20, 0, 0, {})
+
+        # Nothing changed, nothing is read again
+        assert store.import_folder(db).added == 0
+
+        admission_file, patient = patients[0]
+        surname = patient.last_name.split("-")[-1][0:3].lower()
+        expected = {f for f, p in patients if any(part.lower().startswith(surname)
+                                                  for part in p.last_name.replace("-", " ").split())}
+        assert {match.docx_path for match in store.search_name(surname)} == expected
+
+        icd10 = next(iter(patient.diagnosis))
+        assert {match.docx_path for match in store.search(icd10=icd10)} == {
+            f for f, p in patients if icd10 in p.diagnosis}
+        assert {match.docx_path for match in store.search(icd10=icd10[0:2] + "*")} == {
+            f for f, p in patients if any(code.startswith(icd10[0:2]) for code in p.diagnosis)}
+
+        start, end = datetime(2024, 6, 1), datetime(2025, 1, 31)
+        assert {match.docx_path for match in store.search(admitted_from=start, admitted_to=end)} == {
+            f for f, p in patients if start <= p.admission <= end}
+        assert {match.docx_path for match in store.search(discharged_from=start, discharged_to=end)} == {
+            f for f, p in patients if start <= p.discharge <= end}
+
+        assert admission_file in {match.docx_path for match in store.search(doctor=patient.doctor,
+                                                                             name=patient.first_name)}
+
+        # Deleted files are removed, changed files are read again
+        files[1].unlink()
+        stat = files[2].stat()
+        os.utime(files[2], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        result = store.import_folder(db, force=True)
+        assert (result.added, result.updated, result.removed) == (0, 1, 1)
+        assert files[1] not in {match.docx_path for match in store.search()}
+
+
+def test_failed_files_are_retried(tmp_path):
+    db = tmp_path / "db"
+    db.mkdir()
+    admission_file = write_admission_file(db, random.Random(5))
+    content = admission_file.read_bytes()
+    admission_file.write_bytes(b"kein docx")
+
+    with PatientStore(tmp_path / "patients.sqlite", tmp_path / "patient_cache") as store:
+        assert list(store.import_folder(db).failed) == [admission_file.name]
+
+        # The folder is unchanged, but the failed file is read again
+        admission_file.write_bytes(content)
+        result = store.import_folder(db)
+        assert (result.added, result.failed) == (1, {})
+
+    # The patient is shared with letters through the patient cache
+    assert len(list((tmp_path / "patient_cache").glob("*.pickle"))) == 1
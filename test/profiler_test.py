@@ -0,0 +1,54 @@
+import json
+import random
+from concurrent.futures import Future
+
+import pytest
+
+import profiler
+from brief import generate_from_input
+from loaders.patient import Patient
+from generators.gender import Gender
+from template_writer import prepare_document
+from bench.synthetic import write_admission_file
+
+
+def test_trace_of_letter(configs, monkeypatch):
+    # Restored after the test, so other tests are not profiled
+    monkeypatch.setattr(profiler, "_active", None)
+    profiler.start()
+
+    patient = Patient(Gender(Gender.Female))
+    patient.load_from_file(write_admission_file(configs.paths["db"], random.Random(3)))
+
+    # Every block gets its default value, nothing is prompted for
+    configs.set_blocks(list(configs.blocks), [False] * len(configs.blocks))
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail(f"Unerwartete Abfrage: {prompt}"))
+
+    preparation = Future()
+    preparation.set_result(prepare_document(configs, patient))
+
+    assert generate_from_input(configs, patient, preparation)
+
+    letter_path = configs.paths["output"] / patient.file_name()
+    profiler.write_trace(letter_path)
+    trace = json.loads(letter_path.with_suffix(".profile.json").read_text(encoding="utf-8"))
+
+    assert set(trace["stage_totals_ms"]) >= {"template load", "prepare", "score text generation", "format",
+                                             "header render", "zip write"}
+
+    # Default values of the five score blocks are timed like entered ones
+    assert sum(stage["stage"] == "score text generation" for stage in trace["stages"]) == 5
+
+    # Only the time spent in stages is counted, every stage at most once
+    assert max(stage["duration_ms"] for stage in trace["stages"]) <= trace["total_ms"]
+    assert trace["total_ms"] <= sum(trace["stage_totals_ms"].values())
+
+
+def test_total_counts_overlapping_stages_once():
+    trace = profiler.Profiler()
+    trace.stages = [{"stage": "prepare", "start_ms": 0.0, "duration_ms": 10.0},
+                    {"stage": "template load", "start_ms": 2.0, "duration_ms": 3.0},
+                    {"stage": "format", "start_ms": 100.0, "duration_ms": 5.0}]
+
+    assert trace.total_ms() == 15.0
+
@@ -0,0 +1,46 @@
+import random
+
+from loaders.patient import Patient
+from generators.gender import Gender
+from template_writer import write_data, generation_ledger
+from repatch import run_repatch, letter_hooks
+from bench.synthetic import write_admission_file
+
+
+def test_repatch_keeps_existing_patches(configs):
+    patient = Patient(Gender(Gender.Male))
+    patient.load_from_file(write_admission_file(configs.paths["db"], random.Random(3)))
+    write_data(configs, patient, "MIDAS", "WHODAS", "Vorbehandlungen", "Selbstauskunft")
+
+    letter_path = configs.paths["output"] / patient.file_name()
+    patch_path = letter_path.with_stem(f"{letter_path.stem} patch")
+    # G44.2 is not a diagnosis of the patient, so its hook is left in the letter
+    hook = "tth_letter_recommendations"
+    assert hook in letter_hooks(letter_path)
+
+    # First run: the state of the inserts is saved, letters without applicable new inserts are unchanged
+    assert [result.status for result in run_repatch(configs, workers=1)] == ["unverändert"]
+
+    inserts = configs.paths["inserts"].read_text(encoding="utf-8")
+
+    def add_insert(text):
+        # Hooks are only applied once they belong to one of the patient's diagnoses
+        configs.paths["inserts"].write_text(inserts.replace(
+            f'<insert for="G44.2" name="{hook}">',
+            f'<insert for="{next(iter(patient.diagnosis))}" name="{hook}"><w:p>{text}</w:p>'), encoding="utf-8")
+
+    add_insert("Neu")
+    assert [result.status for result in run_repatch(configs, workers=1)] == ["gepatcht"]
+
+    # The patch is recorded with the gender of the letter
+    history = generation_ledger(configs).history(patch_path.name)
+    assert [(generation.kind, generation.gender) for generation in history] == [("patch", Gender.Male)]
+
+    # Patches edited by hand are not overwritten, the letter is checked again on the next run
+    patch_path.write_bytes(b"von Hand bearbeitet")
+    add_insert("Neuer")
+
+    for _ in range(2):
+        results = run_repatch(configs, workers=1)
+        assert [result.status for result in results] == ["übersprungen"]
+        assert patch_path.read_bytes() == b"von Hand bearbeitet"
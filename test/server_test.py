@@ -0,0 +1,85 @@
+import json
+import random
+import threading
+import urllib.error
+import urllib.request
+from zipfile import ZipFile
+
+import pytest
+
+from bench.synthetic import write_admission_file
+from loaders.patient import Patient
+from generators.gender import Gender
+from server import BriefService, BriefServer, serve
+
+
+@pytest.fixture
+def server(configs):
+    """Server for configs on a free port, allowing a single request at a time."""
+
+    with BriefServer(("127.0.0.1", 0), BriefService(configs, 1), queue_timeout=0.1, token="geheim") as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        yield server
+
+        server.shutdown()
+        thread.join()
+
+
+def post(server, path, content, token="geheim"):
+    """Returns status and JSON answer of a request to server."""
+
+    request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}{path}",
+                                     json.dumps(content).encode("utf-8"), method="POST")
+    if token is not None:
+        request.add_header("Authorization", f"Bearer {token}")
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def test_server_requests(server, configs):
+    admission_file = write_admission_file(configs.paths["db"], random.Random(3))
+    patient = Patient(Gender(Gender.Male))
+    patient.load_from_file(admission_file)
+    request = {"file": admission_file.name, "gender": "m"}
+
+    # Requests without the token are rejected
+    assert post(server, "/generate", request, token=None)[0] == 401
+    assert post(server, "/generate", request, token="falsch")[0] == 401
+
+    status, answer = post(server, "/generate", request)
+    assert status == 200
+    assert answer["output"] == str(configs.paths["output"] / patient.file_name())
+
+    # Existing letters are not overwritten
+    assert post(server, "/generate", request)[0] == 409
+
+    # Requests wait for a free slot, until they time out
+    server.service.slots.acquire()
+    try:
+        assert post(server, "/generate", {**request, "overwrite": True})[0] == 503
+    finally:
+        server.service.slots.release()
+
+    # Changed inserts are used without an explicit reload
+    templates = server.service.templates()
+    insert = '<insert for="G44.0" name="cluster_letter_recommendations">'
+    configs.paths["inserts"].write_text(configs.paths["inserts"].read_text(encoding="utf-8").replace(
+        insert, insert + "<w:p><w:r><w:t>Neu geladen</w:t></w:r></w:p>"), encoding="utf-8")
+
+    assert post(server, "/generate", {**request, "overwrite": True})[0] == 200
+    assert server.service.templates() is not templates
+
+    with ZipFile(answer["output"]) as letter:
+        assert "Neu geladen" in letter.read("word/document.xml").decode("utf-8")
+
+
+def test_remote_server_requires_token(configs):
+    with pytest.raises(ValueError):
+        serve(configs, "0.0.0.0", 0)
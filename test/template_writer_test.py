@@ -0,0 +1,46 @@
+import io
+import random
+from zipfile import ZipFile
+
+from loaders.patient import Patient
+from generators.gender import Gender
+from template_writer import write_data, prepare_document, finish_document, fill_hooks, hook_pattern
+from bench.synthetic import write_admission_file
+
+
+def test_prepared_document_matches_write_data(tmp_path, configs):
+    admission_file = write_admission_file(tmp_path, random.Random(6))
+    answers = ("MIDAS {pat_nom}", "WHODAS {pron_nom}", "Vorbehandlungen", "Selbstauskunft")
+
+    documents = []
+    for prepared in (False, True):
+        configs.paths["output"] = tmp_path / f"output{prepared}"
+
+        patient = Patient(Gender(Gender.Male))
+        patient.load_from_file(admission_file)
+
+        if prepared:
+            preparation = prepare_document(configs, patient)
+
+            # Body data is entered after the document was prepared
+            patient.height, patient.pulse = "180", "{60}"
+            finish_document(configs, preparation, patient, *answers)
+
+        else:
+            patient.height, patient.pulse = "180", "{60}"
+            write_data(configs, patient, *answers)
+
+        with ZipFile(configs.paths["output"] / patient.file_name()) as zip_file:
+            documents.append((zip_file.read("word/document.xml"), zip_file.read("word/header1.xml")))
+
+    assert documents[0] == documents[1]
+
+
+def test_fill_hooks_split_between_chunks():
+    document = ("<w:p>ä{60}</w:p><!-- insert_id: [a] !--><!-- other --><!-- insert_id: [b] !-->ö"
+                "<!-- insert_id: [a] !-->")
+    inserts = {"a": "<w:p>A</w:p>"}
+    expected = hook_pattern.sub(lambda match: inserts.get(match.group(1), match.group(0)), document)
+
+    for size in range(1, len(document) + 2):
+        assert "".join(fill_hooks(io.BytesIO(document.encode("utf-8")), inserts, size)) == expected
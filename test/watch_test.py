@@ -0,0 +1,30 @@
+import random
+
+from loaders.config_loader import ConfigurationLoader
+from bench.synthetic import write_admission_file
+from watch import FolderWatcher
+
+
+def test_poll_parses_settled_files(tmp_path):
+    db = tmp_path / "db"
+    db.mkdir()
+    config_path = tmp_path / "config.txt"
+    config_path.write_text(f"db={db}\noutput={tmp_path / 'output'}\nindex={tmp_path / 'index.json'}\n"
+                           f"patients={tmp_path / 'patient_cache'}\n", encoding="utf-8")
+
+    with FolderWatcher(ConfigurationLoader(config_path), workers=1) as watcher:
+        admission_file = write_admission_file(db, random.Random(5))
+        (db / "Kaputt, Datei 01012024.docx").write_bytes(b"no zip file")
+
+        # New files are only parsed, once they did not change between two polls
+        assert watcher.poll() == []
+
+        results = {result.file: result for result in watcher.poll()}
+        assert results[admission_file.name].success
+        assert not results["Kaputt, Datei 01012024.docx"].success
+
+        assert watcher.poll() == []
+
+    assert list((tmp_path / "patient_cache").glob("*.pickle"))
+    assert "Kaputt, Datei 01012024.docx" in (tmp_path / "output" / "watch.log").read_text(encoding="utf-8")
+    assert (tmp_path / "index.json").exists()
@@ -0,0 +1,175 @@
+from loaders.config_loader import ConfigurationLoader
+from loaders.patient_index import PatientIndex, parse_file_name
+from loaders.patient_cache import cached_patient
+from loaders.patient_store import PatientStore
+from generators.gender import Gender
+
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import time
+import os
+
+
+# Name of the file in the output folder, which lists admission files that could not be parsed
+log_file_name: str = "watch.log"
+
+
+@dataclass
+class WatchResult:
+    file: str
+    success: bool
+    message: str = ""
+
+
+def scan_folder(folder: Path) -> dict[str, tuple[int, int]]:
+    """Returns (mtime, size) of every admission file in folder, keyed by file name."""
+
+    snapshot: dict[str, tuple[int, int]] = {}
+
+    with os.scandir(folder) as directory:
+        for entry in directory:
+            if (not entry.name.lower().endswith(".docx") or entry.name.startswith("~$")
+                    or parse_file_name(entry.name) is None or not entry.is_file()):
+                continue
+
+            stat: os.stat_result = entry.stat()
+            snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+    return snapshot
+
+
+# Folder of the patient cache, set once for every worker process
+_worker_cache_path: Path | None = None
+
+
+def _init_worker(cache_path: Path):
+    global _worker_cache_path
+    _worker_cache_path = cache_path
+
+
+def prepare_file(admission_file: Path) -> WatchResult:
+    """Parses an admission file into the patient cache. Runs inside a worker process."""
+
+    try:
+        cached_patient(admission_file, Gender(Gender.Female), _worker_cache_path)
+        return WatchResult(admission_file.name, True)
+
+    except Exception as error:
+        return WatchResult(admission_file.name, False, f"{type(error).__name__}: {error}")
+
+
+class FolderWatcher:
+    """Polls the db folder for new and changed admission files. Files are parsed into the patient cache as soon as
+    they stopped changing, so generating a letter starts from already extracted data. The admission file index and,
+    if configured, the patient store are updated as well."""
+
+    def __init__(self, configs: ConfigurationLoader, workers: int | None = None):
+        """
+        :param configs: ConfigurationLoader containing all needed paths
+        :param workers: Number of worker processes, defaults to the number of cores
+        """
+
+        self.configs: ConfigurationLoader = configs
+        self.workers: int = workers or os.cpu_count() or 1
+        self.log_path: Path = configs.paths["output"] / log_file_name
+
+        # Files already parsed (or failed) with their (mtime, size)
+        self.known: dict[str, tuple[int, int]] = scan_folder(configs.paths["db"])
+
+        # New or changed files with their (mtime, size) of the previous poll, they are parsed once it is unchanged
+        self.pending: dict[str, tuple[int, int]] = {}
+
+        self._executor: ProcessPoolExecutor | None = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "FolderWatcher":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def poll(self) -> list[WatchResult]:
+        """Scans the folder once and parses every new or changed file, which did not change since the last poll.
+        Files still being copied are parsed on a later poll.
+        :return: Results of the parsed files
+        """
+
+        snapshot: dict[str, tuple[int, int]] = scan_folder(self.configs.paths["db"])
+
+        ready: list[str] = [name for name, signature in snapshot.items()
+                            if self.known.get(name) != signature and self.pending.get(name) == signature]
+
+        self.pending = {name: signature for name, signature in snapshot.items()
+                        if self.known.get(name) != signature and name not in ready}
+
+        # Deleted files are forgotten, so they are parsed again if they reappear
+        removed: bool = not self.known.keys() <= snapshot.keys()
+        self.known = {name: signature for name, signature in self.known.items() if name in snapshot}
+
+        results: list[WatchResult] = []
+
+        if ready:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                     initargs=(self.configs.paths["patients"],))
+
+            results = list(self._executor.map(prepare_file, [self.configs.paths["db"] / name for name in ready]))
+
+            for name in ready:
+                self.known[name] = snapshot[name]
+
+            self.log(results)
+
+        if ready or removed:
+            PatientIndex.open(self.configs.paths["index"], self.configs.paths["db"])
+
+            if "store" in self.configs.paths:
+                with PatientStore(self.configs.paths["store"], self.configs.paths["patients"]) as store:
+                    store.import_folder(self.configs.paths["db"], self.workers, force=True)
+
+        return results
+
+    def log(self, results: list[WatchResult]):
+        """Prints every parsed file and appends files, which could not be parsed, to the log file."""
+
+        timestamp: str = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
+        failed: list[WatchResult] = [result for result in results if not result.success]
+
+        for result in results:
+            print(f"[{timestamp}] {result.file}: {'eingelesen' if result.success else result.message}")
+
+        if failed:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+
+            with open(self.log_path, "a", encoding="utf-8") as log_file:
+                log_file.writelines(f"{timestamp}\t{result.file}\t{result.message}\n" for result in failed)
+
+    def run(self, interval: float):
+        """Poll the folder every interval seconds until interrupted."""
+
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+
+def watch(configs: ConfigurationLoader, interval: float = 10.0, workers: int | None = None):
+    """Watch the db folder and pre-parse new admission files until interrupted.
+    :param configs: ConfigurationLoader containing all needed paths
+    :param interval: Seconds between two scans of the folder
+    :param workers: Number of worker processes, defaults to the number of cores
+    """
+
+    with FolderWatcher(configs, workers) as watcher:
+        print(f"Überwache {configs.paths['db'].absolute()} (Beenden mit Strg+C)")
+
+        try:
+            watcher.run(interval)
+
+        except KeyboardInterrupt:
+            pass